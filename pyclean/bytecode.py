@@ -2,7 +2,260 @@
 #
 # SPDX-License-Identifier: GPL-3.0-or-later
 
-"""Python bytecode file and directory constants."""
+"""Python bytecode file and directory constants, and staleness checks."""
+
+from __future__ import annotations
+
+import logging
+import os
+import sys
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from importlib.util import (
+    MAGIC_NUMBER,
+    cache_from_source,
+    source_from_cache,
+    source_hash,
+)
+from pathlib import Path
+
+from .runner import Runner
+from .traversal import BytecodeHandler
+
+log = logging.getLogger(__name__)
 
 BYTECODE_DIRS = ['__pycache__']
 BYTECODE_FILES = ['.pyc', '.pyo']
+
+PYC_HEADER_SIZE = 16  # magic, flags, and source mtime and size, or hash
+FLAG_HASH_BASED = 0b01
+FLAG_CHECK_SOURCE = 0b10
+HEADER_CHECK_JOBS = 8
+
+
+def parse_bytecode_name(name: str) -> tuple[str | None, int]:
+    """
+    Return the interpreter tag and optimization level of a bytecode file name,
+    e.g. ``('cpython-313', 2)`` for ``mod.cpython-313.opt-2.pyc`` (see PEP 488).
+    Legacy bytecode, like ``mod.pyc``, has no interpreter tag.
+    """
+    parts = name.split('.')[1:-1]
+    tag = parts[0] if parts else None
+    level = 0
+    if len(parts) > 1 and parts[1].startswith('opt-') and parts[1][4:].isdigit():
+        level = int(parts[1][4:])
+    return tag, level
+
+
+class BytecodeSelection:
+    """
+    Decides which bytecode files to keep, by the interpreter tags and the
+    optimization levels they were compiled for. A criterion that isn't
+    specified keeps any bytecode.
+    """
+
+    def __init__(self, tags=None, levels=None):
+        self.tags = set(tags) if tags else None
+        self.levels = set(levels) if levels else None
+
+    def keeps(self, name: str) -> bool:
+        """Is a bytecode file to be kept, judging by its name only?"""
+        tag, level = parse_bytecode_name(name)
+        if self.tags is not None and tag not in self.tags:
+            return False
+        return self.levels is None or level in self.levels
+
+
+def pycache_mirror(directory: Path) -> Path | None:
+    """
+    Return the directory that holds the bytecode of a source directory in the
+    tree of the bytecode cache prefix (see ``PYTHONPYCACHEPREFIX``), or None
+    if Python doesn't use a cache prefix.
+    """
+    if not sys.pycache_prefix:
+        return None
+    return Path(cache_from_source(str(directory.absolute() / '_.py'))).parent
+
+
+def source_of(path: Path) -> Path:
+    """Return the location of the source file a bytecode file was made from."""
+    try:
+        return Path(source_from_cache(path))
+    except (NotImplementedError, ValueError):
+        return path.with_suffix('.py')  # legacy bytecode next to its source
+
+
+def is_stale(path: Path) -> bool:
+    """
+    Is a bytecode file outdated, or has its source file gone?
+    ``.pyo`` files are obsolete since Python 3.5, hence always stale.
+    """
+    if path.suffix != '.pyc':
+        return True
+    try:
+        with path.open('rb') as pyc:
+            header = pyc.read(PYC_HEADER_SIZE)
+        return len(header) < PYC_HEADER_SIZE or not header_matches(
+            header,
+            source_of(path),
+        )
+    except OSError:
+        return True
+
+
+def header_matches(header: bytes, source: Path) -> bool:
+    """
+    Does the header of a ``.pyc`` file (see PEP 552) match its source file,
+    like the import system checks it? The hash of a hash-based ``.pyc`` is
+    only verified if it was created by the running Python version, because
+    the hash is keyed by the version.
+    """
+    source_stat = source.stat()
+    flags = int.from_bytes(header[4:8], 'little')
+    if flags == 0:
+        mtime = int.from_bytes(header[8:12], 'little')
+        size = int.from_bytes(header[12:16], 'little')
+        return (mtime, size) == (
+            int(source_stat.st_mtime) & 0xFFFFFFFF,
+            source_stat.st_size & 0xFFFFFFFF,
+        )
+    if flags & ~(FLAG_HASH_BASED | FLAG_CHECK_SOURCE) or not flags & FLAG_HASH_BASED:
+        return False
+    return header[:4] != MAGIC_NUMBER or header[8:16] == source_hash(
+        source.read_bytes(),
+    )
+
+
+class SelectiveBytecodeHandler(BytecodeHandler):
+    """
+    Deletes only bytecode that isn't selected to be kept, e.g. bytecode of
+    interpreters that are no longer in use, and keeps bytecode cache
+    directories that still hold bytecode.
+    """
+
+    def __init__(self, file_types, dir_names, selection=None):
+        super().__init__(file_types, dir_names)
+        self.selection = selection or BytecodeSelection()
+
+    def enter(self, _directory, state, *, ignored):
+        return None if ignored else state
+
+    def clean_file(self, fileobj, _state):
+        if fileobj.suffix not in self.file_types:
+            return False
+        if self.selection.keeps(fileobj.name):
+            log.debug('Keeping selected bytecode: %s', fileobj)
+        else:
+            Runner.unlink(fileobj)
+        return True
+
+    def clean_directory(self, dirobj, _state, _child_state):
+        if dirobj.name not in self.dir_names:
+            return False
+        remove_if_empty(dirobj)
+        return True
+
+
+class StaleBytecodeHandler(SelectiveBytecodeHandler):
+    """
+    Deletes only bytecode that is outdated or whose source file is gone,
+    and keeps bytecode cache directories that still hold valid bytecode.
+    Bytecode that isn't selected to be kept is deleted without any check.
+
+    The headers are checked on a thread pool while the traversal moves on.
+    A bytecode cache directory is only considered for removal once all the
+    checks of its content are complete.
+    """
+
+    def __init__(
+        self,
+        file_types,
+        dir_names,
+        selection=None,
+        jobs=HEADER_CHECK_JOBS,
+    ):
+        super().__init__(file_types, dir_names, selection)
+        self.jobs = jobs
+        self.executor: ThreadPoolExecutor | None = None
+        self.lock = threading.Lock()
+        self.pending: dict[Path, list[Future]] = {}
+
+    def clean_file(self, fileobj, state):
+        if fileobj.suffix not in self.file_types:
+            return False
+        if not self.selection.keeps(fileobj.name):
+            return super().clean_file(fileobj, state)
+        path = fileobj.path
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.jobs)
+            future = self.executor.submit(remove_if_stale, path)
+            if path.parent.name in self.dir_names:
+                self.pending.setdefault(path.parent, []).append(future)
+        return True
+
+    def clean_directory(self, dirobj, _state, _child_state):
+        if dirobj.name not in self.dir_names:
+            return False
+        path = dirobj.path
+        with self.lock:
+            futures = self.pending.pop(path, [])
+        wait(futures)
+        remove_if_empty(dirobj)
+        return True
+
+    def finish(self):
+        with self.lock:
+            executor, self.executor = self.executor, None
+            self.pending.clear()
+        if executor is not None:
+            executor.shutdown()
+
+
+def remove_if_stale(path: Path) -> None:
+    """Delete a bytecode file if it is stale, otherwise keep it."""
+    if is_stale(path):
+        Runner.unlink(path)
+    else:
+        log.debug('Keeping valid bytecode: %s', path)
+
+
+def remove_if_empty(dirobj) -> None:
+    """Remove a bytecode cache directory once no bytecode is left in it."""
+    path = dirobj.path
+    Runner.settle(path)
+    try:
+        if not any(os.scandir(path)):
+            Runner.rmdir(dirobj)
+    except OSError as err:
+        log.debug('Cannot check or remove directory %s: %s', path, err)
+
+
+def remove_bytecode_of(sources) -> None:
+    """
+    Delete the bytecode of the given Python source files, of all interpreter
+    tags and optimization levels, looking only into the bytecode cache
+    directories they map to. A bytecode cache directory is removed when
+    nothing else is left in it.
+    """
+    modules: dict[Path, set[str]] = {}
+    for source in sources:
+        cache = Path(cache_from_source(str(source)))
+        modules.setdefault(cache.parent, set()).add(source.stem)
+
+    for cache_dir, names in modules.items():
+        try:
+            with os.scandir(cache_dir) as entries:
+                content = [entry.name for entry in entries]
+        except OSError:
+            continue
+        bytecode = [
+            name
+            for name in content
+            if name.split('.')[0] in names and Path(name).suffix in BYTECODE_FILES
+        ]
+        for name in bytecode:
+            Runner.unlink(cache_dir / name)
+        if bytecode and len(bytecode) == len(content):
+            Runner.settle(cache_dir)
+            Runner.rmdir(cache_dir)
@@ -7,9 +7,12 @@
 import argparse
 import logging
 import shutil
+import sys
 
 from . import __version__
 from . import main as main_module
+from .compiler import INVALIDATION_MODES, OPTIMIZATION_LEVELS
+from .shard import FINAL, Shard
 
 log = logging.getLogger(__name__)
 
@@ -43,9 +46,16 @@ def parse_arguments():
     parser.add_argument('--version', action='version', version=__version__)
     parser.add_argument(
         'directory',
-        nargs='+',
+        nargs='*',
         help='directory tree to traverse for bytecode and debris',
     )
+    parser.add_argument(
+        '-0',
+        '--null',
+        action='store_true',
+        help='paths read with --from-stdin are separated by NUL characters,'
+        ' e.g. from "find -print0" or "fd -0"',
+    )
     parser.add_argument(
         '-d',
         '--debris',
@@ -61,6 +71,17 @@ def parse_arguments():
             ' '.join(debris_default_topics),
         ),
     )
+    parser.add_argument(
+        '--distributions',
+        metavar='NAME',
+        action='extend',
+        nargs='*',
+        default=argparse.SUPPRESS,
+        help='only delete the bytecode of the distributions installed in the'
+        ' directories (e.g. site-packages), as listed in their RECORD files,'
+        ' without walking the directory tree (may be specified multiple'
+        ' times; default: all distributions)',
+    )
     parser.add_argument(
         '-e',
         '--erase',
@@ -77,6 +98,18 @@ def parse_arguments():
         action='store_true',
         help='remove empty directories',
     )
+    parser.add_argument(
+        '--execute-plan',
+        metavar='FILE',
+        help='carry out the deletions of a plan written with --plan, without'
+        ' scanning again; entries that changed since are skipped',
+    )
+    parser.add_argument(
+        '--from-stdin',
+        action='store_true',
+        help='read the paths to clean up from standard input, one per line,'
+        ' instead of walking directory trees',
+    )
     parser.add_argument(
         '-g',
         '--git-clean',
@@ -95,12 +128,117 @@ def parse_arguments():
         help='directory that should be ignored (may be specified multiple times;'
         ' default: %s)' % ' '.join(ignore_default_items),
     )
+    parser.add_argument(
+        '--index',
+        action='store_true',
+        help='remember directories without anything to clean up, and only scan'
+        ' them again when they have changed (stored in ~/.cache/pyclean)',
+    )
+    parser.add_argument(
+        '-j',
+        '--jobs',
+        metavar='N',
+        type=int,
+        default=1,
+        help='number of parallel file system operations, useful on network'
+        ' or overlay file systems (default: 1)',
+    )
+    parser.add_argument(
+        '--invalidation-mode',
+        metavar='MODE',
+        choices=list(INVALIDATION_MODES),
+        help='convert bytecode of the running interpreter to hash-based'
+        ' invalidation instead of deleting it, which makes imports faster on'
+        ' read-only deployments, and use it with --recompile (choices: %s)'
+        % ' '.join(INVALIDATION_MODES),
+    )
+    parser.add_argument(
+        '--keep-optimization',
+        metavar='LEVEL',
+        dest='keep_levels',
+        action='extend',
+        nargs='+',
+        type=int,
+        choices=OPTIMIZATION_LEVELS,
+        help='keep bytecode of these optimization levels, delete the bytecode'
+        ' of other levels (may be specified multiple times)',
+    )
+    parser.add_argument(
+        '--keep-tag',
+        metavar='TAG',
+        dest='keep_tags',
+        action='extend',
+        nargs='+',
+        type=interpreter_tag,
+        help='keep bytecode of the interpreters with these tags, e.g. cpython-313'
+        ' or "current" for the running interpreter, delete the bytecode of other'
+        ' interpreters (may be specified multiple times)',
+    )
     parser.add_argument(
         '-n',
         '--dry-run',
         action='store_true',
         help='show what would be done',
     )
+    parser.add_argument(
+        '--no-hint',
+        action='store_true',
+        help='do not suggest --debris topics at the end, e.g. in scripts',
+    )
+    parser.add_argument(
+        '-O',
+        '--optimize',
+        metavar='LEVEL',
+        action='extend',
+        nargs='+',
+        type=int,
+        choices=OPTIMIZATION_LEVELS,
+        help='optimization levels to compile bytecode for with --recompile'
+        ' (may be specified multiple times; default: 0)',
+    )
+    parser.add_argument(
+        '--plan',
+        metavar='FILE',
+        help='write the deletions decided by the scan to a plan file, instead'
+        ' of carrying them out (see --execute-plan)',
+    )
+    parser.add_argument(
+        '-p',
+        '--processes',
+        metavar='N',
+        type=int,
+        default=1,
+        help='clean up to N directory trees at the same time, in separate'
+        ' processes (default: 1)',
+    )
+
+    parser.add_argument(
+        '--recompile',
+        action='store_true',
+        help='compile all Python source files to bytecode after cleaning up,'
+        ' using all CPU cores, to warm up the bytecode cache',
+    )
+    parser.add_argument(
+        '--shard',
+        metavar='I/N',
+        type=shard,
+        help='only clean the I-th of N disjoint parts of each directory tree,'
+        ' to share the work between processes or machines; run once more with'
+        ' "--shard final --folders" when all are done, to remove shared'
+        ' directories left empty',
+    )
+    parser.add_argument(
+        '--since',
+        metavar='REV',
+        help='only delete the bytecode of Python source files deleted or renamed'
+        ' since a Git revision, without walking the directory tree',
+    )
+    parser.add_argument(
+        '--stale-only',
+        action='store_true',
+        help='only delete bytecode that is outdated or whose source file is gone,'
+        ' keep bytecode that is still valid',
+    )
 
     verbosity = parser.add_mutually_exclusive_group()
     verbosity.add_argument('-q', '--quiet', action='store_true', help='be quiet')
@@ -118,31 +256,261 @@ def parse_arguments():
         help='assume yes as answer for interactive questions',
     )
 
+    add_quarantine_arguments(parser)
+
     args = parser.parse_args()
     init_logging(args)
 
-    if args.git_clean and not shutil.which('git'):
-        parser.error('Git is not available. Install Git to use --git-clean.')
+    validate_arguments(parser, args)
+    apply_implications(args)
 
-    if args.yes and not args.erase and not args.git_clean:
-        parser.error('Specifying --yes only makes sense with --erase or --git-clean.')
+    select_debris_topics(args, debris_default_topics, debris_optional_topics)
+
+    args.explicit_ignore = args.ignore if args.ignore is not None else []
+    # Keep defaults first while deduplicating explicit repeats.
+    args.ignore = list(dict.fromkeys([*ignore_default_items, *args.explicit_ignore]))
+
+    log.debug('Ignored directories: %s', ' '.join(args.ignore))
 
+    return args
+
+
+def add_quarantine_arguments(parser):
+    """
+    Add the options to quarantine disposable directories, and to restore or
+    purge them later, in a group of their own.
+    """
+    quarantine = parser.add_argument_group('quarantine')
+    quarantine.add_argument(
+        '--purge-trash',
+        action='store_true',
+        help='delete the directories quarantined longer than the undo window',
+    )
+    quarantine.add_argument(
+        '--quarantine',
+        action='store_true',
+        help='move disposable directories into a trash area with a single'
+        ' rename each, to be deleted in the background',
+    )
+    quarantine.add_argument(
+        '--undo',
+        action='store_true',
+        help='restore the directories quarantined and not yet deleted',
+    )
+    quarantine.add_argument(
+        '--undo-window',
+        metavar='SECONDS',
+        type=int,
+        default=0,
+        help='keep quarantined directories for SECONDS, so that they can be'
+        ' restored with --undo (default: 0)',
+    )
+    quarantine.add_argument(  # for the purge worker, see pyclean.quarantine
+        '--purge-wait',
+        action='store_true',
+        help=argparse.SUPPRESS,
+    )
+
+
+def select_debris_topics(args, default_topics, optional_topics):
+    """
+    Expand the --debris topics given into the list of topics to clean up.
+    """
     if 'debris' in args:
         if 'all' in args.debris:
-            args.debris = debris_default_topics + debris_optional_topics
+            args.debris = default_topics + optional_topics
         elif not args.debris:
-            args.debris = debris_default_topics
+            args.debris = default_topics
         log.debug('Debris topics to scan for: %s', ' '.join(args.debris))
     else:
         args.debris = []
 
-    args.explicit_ignore = args.ignore if args.ignore is not None else []
-    # Keep defaults first while deduplicating explicit repeats.
-    args.ignore = list(dict.fromkeys([*ignore_default_items, *args.explicit_ignore]))
 
-    log.debug('Ignored directories: %s', ' '.join(args.ignore))
+def validate_arguments(parser, args):
+    """
+    Abort on command line options that don't make sense together.
+    """
+    if args.git_clean and not shutil.which('git'):
+        parser.error('Git is not available. Install Git to use --git-clean.')
 
-    return args
+    if args.yes and not args.erase and not args.git_clean:
+        parser.error('Specifying --yes only makes sense with --erase or --git-clean.')
+
+    if args.plan and args.erase and not args.yes:
+        parser.error(
+            'A --plan is executed without prompts, hence --erase requires --yes.',
+        )
+
+    if args.optimize and not args.recompile:
+        parser.error('Specifying --optimize only makes sense with --recompile.')
+
+    if args.invalidation_mode and args.stale_only:
+        parser.error('--invalidation-mode and --stale-only cannot be combined.')
+
+    validate_modes(parser, args)
+    validate_trash(parser, args)
+
+    if args.jobs < 1:
+        parser.error('The number of --jobs must be a positive integer.')
+
+    if args.processes < 1:
+        parser.error('The number of --processes must be a positive integer.')
+
+
+def apply_implications(args):
+    """
+    Fill in the option values implied by other options.
+    """
+    args.optimize = list(dict.fromkeys(args.optimize or [0]))
+
+    if args.plan:
+        args.dry_run = True
+
+
+def validate_modes(parser, args):
+    """
+    Abort when options are combined with a mode of operation that doesn't
+    walk directory trees.
+    """
+    walking_options = [
+        'debris' in args,
+        args.shard,
+        args.erase,
+        args.folders,
+        args.index,
+        args.invalidation_mode,
+        args.keep_levels,
+        args.keep_tags,
+        args.stale_only,
+    ]
+    if args.since and any(walking_options):
+        parser.error(
+            '--since does not walk the directory tree, it cannot be combined'
+            ' with options that do.',
+        )
+
+    if 'distributions' in args and any([*walking_options, args.since]):
+        parser.error(
+            '--distributions does not walk the directory tree, it cannot be'
+            ' combined with --since or options that do.',
+        )
+
+    if not args.directory and not args.from_stdin and not args.execute_plan:
+        parser.error('the following arguments are required: directory')
+
+    plan_conflicts = [
+        args.directory,
+        args.erase,
+        args.folders,
+        args.from_stdin,
+        args.git_clean,
+        args.plan,
+        args.recompile,
+        args.shard,
+        'debris' in args,
+        'distributions' in args,
+    ]
+    if args.execute_plan and any(plan_conflicts):
+        parser.error(
+            '--execute-plan only carries out a plan, it cannot be combined with'
+            ' directories or other cleanup options.',
+        )
+
+    stdin_conflicts = [
+        args.directory,
+        args.erase,
+        args.folders,
+        args.git_clean,
+        args.index,
+        args.invalidation_mode,
+        args.recompile,
+        args.shard,
+        args.since,
+        args.stale_only,
+        'distributions' in args,
+    ]
+    if args.from_stdin and any(stdin_conflicts):
+        parser.error(
+            '--from-stdin only deletes bytecode and debris among the paths read,'
+            ' it cannot be combined with directories or other cleanup options.',
+        )
+
+    if args.shard == FINAL and not args.folders:
+        parser.error('The final pass of --shard only makes sense with --folders.')
+
+    if args.null and not args.from_stdin:
+        parser.error('Specifying --null only makes sense with --from-stdin.')
+
+
+def validate_trash(parser, args):
+    """
+    Abort when the trash area of quarantined directories is to be purged or
+    restored together with a cleanup, or quarantine is used without a walk.
+    """
+    cleanup_options = [
+        'debris' in args,
+        'distributions' in args,
+        args.erase,
+        args.execute_plan,
+        args.folders,
+        args.from_stdin,
+        args.git_clean,
+        args.index,
+        args.invalidation_mode,
+        args.keep_levels,
+        args.keep_tags,
+        args.plan,
+        args.quarantine,
+        args.recompile,
+        args.shard,
+        args.since,
+        args.stale_only,
+    ]
+    if args.undo and args.purge_trash:
+        parser.error('--undo and --purge-trash cannot be combined.')
+
+    if (args.undo or args.purge_trash) and any(cleanup_options):
+        parser.error(
+            '--undo and --purge-trash only act on the trash area, they cannot be'
+            ' combined with cleanup options.',
+        )
+
+    walkless_modes = [
+        'distributions' in args,
+        args.execute_plan,
+        args.from_stdin,
+        args.since,
+    ]
+    if args.quarantine and any(walkless_modes):
+        parser.error(
+            '--quarantine only applies to directories found walking the tree, it'
+            ' cannot be combined with modes that do not.',
+        )
+
+    if args.undo_window < 0:
+        parser.error('The --undo-window must not be negative.')
+
+
+def shard(value):
+    """
+    Convert a command line value ``I/N`` to a shard, or ``final`` for the
+    final pass after all shards are done.
+    """
+    if value == FINAL:
+        return FINAL
+    number, _, count = value.partition('/')
+    if not (number.isdigit() and count.isdigit()) or not 0 < int(number) <= int(count):
+        msg = 'use I/N with 1 <= I <= N, or final'
+        raise argparse.ArgumentTypeError(msg)
+    return Shard(int(number), int(count))
+
+
+def interpreter_tag(value):
+    """
+    Convert a command line value to an interpreter tag, as used in bytecode
+    file names. "current" stands for the tag of the running interpreter.
+    """
+    return sys.implementation.cache_tag if value == 'current' else value
 
 
 def init_logging(args):
@@ -0,0 +1,277 @@
+# SPDX-FileCopyrightText: 2026 Peter Bittner <django@bittner.it>
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Regeneration of bytecode after a cleanup (warm-up of the bytecode cache),
+and conversion of bytecode to hash-based invalidation.
+"""
+
+from __future__ import annotations
+
+import compileall
+import logging
+import os
+import py_compile
+import stat
+import sys
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import partial
+from importlib.util import MAGIC_NUMBER, source_hash
+from pathlib import Path
+
+from .bytecode import (
+    BYTECODE_DIRS,
+    FLAG_CHECK_SOURCE,
+    FLAG_HASH_BASED,
+    PYC_HEADER_SIZE,
+    SelectiveBytecodeHandler,
+    header_matches,
+    parse_bytecode_name,
+    source_of,
+)
+from .runner import Runner
+
+log = logging.getLogger(__name__)
+
+OPTIMIZATION_LEVELS = [0, 1, 2]
+INVALIDATION_MODES = {
+    'checked-hash': py_compile.PycInvalidationMode.CHECKED_HASH,
+    'unchecked-hash': py_compile.PycInvalidationMode.UNCHECKED_HASH,
+}
+
+CONVERTED = 'converted'
+RECOMPILED = 'recompiled'
+UNCHANGED = 'unchanged'
+ORPHANED = 'orphaned'
+FAILED = 'failed'
+
+
+def source_files(directory: Path):
+    """
+    Yield the Python source files of a directory tree, skipping ignored
+    directories (like the cleanup does) and bytecode cache directories.
+    """
+    if Runner.is_ignored(directory):
+        return
+    for root, dirnames, filenames in os.walk(directory):
+        parent = Path(root)
+        dirnames[:] = [
+            name
+            for name in dirnames
+            if name not in BYTECODE_DIRS
+            and not Runner.ignore_matcher.matches(parent / name)
+        ]
+        for name in filenames:
+            if name.endswith('.py'):
+                yield parent / name
+
+
+def compile_source(path: Path, optimize: list[int], invalidation_mode=None) -> bool:
+    """Compile a source file for all optimization levels, in a worker process."""
+    return compileall.compile_file(
+        path,
+        quiet=2,
+        optimize=optimize,
+        invalidation_mode=invalidation_mode,
+    )
+
+
+def recompile(
+    directories: list[Path],
+    optimize: list[int],
+    dry_run=False,
+    invalidation_mode=None,
+):
+    """
+    Compile the Python source files of the given directory trees to bytecode,
+    spread across a process pool, so that the bytecode cache is warm again.
+    Bytecode that is already up-to-date is not written again.
+    """
+    files = [path for directory in directories for path in source_files(directory)]
+    levels = ' '.join(str(level) for level in optimize)
+    if not files:
+        log.debug('No source files to compile.')
+        return
+    if dry_run:
+        log.info(
+            'Would compile %d files to bytecode (optimization levels: %s).',
+            len(files),
+            levels,
+        )
+        return
+
+    log.info('Compiling %d files (optimization levels: %s) ...', len(files), levels)
+    with ProcessPoolExecutor() as executor:
+        results = executor.map(
+            partial(
+                compile_source,
+                optimize=optimize,
+                invalidation_mode=invalidation_mode,
+            ),
+            files,
+            chunksize=64,
+        )
+        failed = [path for path, success in zip(files, results) if not success]
+
+    for path in failed:
+        log.debug('Cannot compile %s', path)
+    if failed:
+        log.warning('%d files could not be compiled.', len(failed))
+
+
+def convert_to_hash(path: Path, invalidation_mode) -> str:
+    """
+    Switch a bytecode file of the running interpreter to hash-based
+    invalidation (see PEP 552), in a worker process. If the bytecode is
+    up-to-date only its header is rewritten, otherwise its source file is
+    compiled again, even if the header is hash-based already.
+    """
+    flags = FLAG_HASH_BASED
+    if invalidation_mode == py_compile.PycInvalidationMode.CHECKED_HASH:
+        flags |= FLAG_CHECK_SOURCE
+    try:
+        source = source_of(path)
+        with path.open('rb') as pyc:
+            data = pyc.read()
+        header = data[:PYC_HEADER_SIZE]
+        if len(header) < PYC_HEADER_SIZE or header[:4] != MAGIC_NUMBER:
+            return UNCHANGED
+        source_bytes = source.read_bytes()
+    except FileNotFoundError:
+        return ORPHANED
+    except OSError:
+        return FAILED
+
+    try:
+        if not header_matches(header, source):
+            _tag, level = parse_bytecode_name(path.name)
+            py_compile.compile(
+                str(source),
+                cfile=str(path),
+                doraise=True,
+                optimize=level,
+                invalidation_mode=invalidation_mode,
+            )
+            result = RECOMPILED
+        elif int.from_bytes(header[4:8], 'little') != flags:
+            write_atomic(
+                path,
+                MAGIC_NUMBER
+                + flags.to_bytes(4, 'little')
+                + source_hash(source_bytes)
+                + data[PYC_HEADER_SIZE:],
+            )
+            result = CONVERTED
+        else:
+            result = UNCHANGED
+    except (OSError, py_compile.PyCompileError):
+        return FAILED
+    return result
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    """Replace the content of a file, without readers ever seeing a part."""
+    mode = stat.S_IMODE(path.stat().st_mode)
+    temporary = path.with_name('%s.%d' % (path.name, os.getpid()))
+    fd = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_EXCL, mode)
+    try:
+        with os.fdopen(fd, 'wb') as stream:
+            stream.write(data)
+        temporary.replace(path)
+    except OSError:
+        temporary.unlink(missing_ok=True)
+        raise
+
+
+class HashBytecodeHandler(SelectiveBytecodeHandler):
+    """
+    Converts the bytecode of the running interpreter to hash-based
+    invalidation in place, instead of deleting it. The import system then
+    needn't check the modification time of the source file of every module
+    (``unchecked-hash``), which makes cold imports on read-only deployments
+    faster. Bytecode of other interpreters is kept, unless it isn't selected
+    to be kept, and orphaned bytecode is deleted.
+
+    The bytecode files are converted on a process pool while the traversal
+    moves on. A bytecode cache directory is only considered for removal once
+    the conversions of its content are complete, and orphaned bytecode in it
+    is deleted.
+    """
+
+    def __init__(
+        self,
+        file_types,
+        dir_names,
+        selection=None,
+        invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH,
+        *,
+        dry_run=False,
+    ):
+        super().__init__(file_types, dir_names, selection)
+        self.invalidation_mode = invalidation_mode
+        self.dry_run = dry_run
+        self.executor: ProcessPoolExecutor | None = None
+        self.lock = threading.Lock()
+        self.pending: dict[Path, list[tuple[Path, Future]]] = {}
+        self.outcomes = dict.fromkeys([CONVERTED, RECOMPILED, FAILED], 0)
+
+    def clean_file(self, fileobj, state):
+        if fileobj.suffix != '.pyc' or not self.selection.keeps(fileobj.name):
+            return super().clean_file(fileobj, state)
+        tag, _level = parse_bytecode_name(fileobj.name)
+        if tag != sys.implementation.cache_tag:
+            log.debug('Keeping bytecode of another interpreter: %s', fileobj)
+        elif self.dry_run:
+            log.debug('Would convert bytecode: %s', fileobj)
+        else:
+            path = fileobj.path
+            with self.lock:
+                if self.executor is None:
+                    self.executor = ProcessPoolExecutor()
+                future = self.executor.submit(
+                    convert_to_hash,
+                    path,
+                    self.invalidation_mode,
+                )
+                self.pending.setdefault(path.parent, []).append((path, future))
+        return True
+
+    def clean_directory(self, dirobj, state, child_state):
+        if dirobj.name in self.dir_names:
+            with self.lock:
+                pending = self.pending.pop(dirobj.path, [])
+            self._resolve(pending)
+        return super().clean_directory(dirobj, state, child_state)
+
+    def _resolve(self, pending):
+        """Wait for conversions, and delete the bytecode found orphaned."""
+        for path, future in pending:
+            outcome = future.result()
+            if outcome == ORPHANED:
+                Runner.unlink(path)
+            elif outcome == FAILED:
+                log.debug('Cannot convert %s', path)
+            if outcome in self.outcomes:
+                with self.lock:
+                    self.outcomes[outcome] += 1
+
+    def finish(self):
+        with self.lock:
+            executor, self.executor = self.executor, None
+            pending, self.pending = self.pending, {}
+        for futures in pending.values():
+            self._resolve(futures)
+        if executor is not None:
+            executor.shutdown()
+        outcomes = self.outcomes
+        self.outcomes = dict.fromkeys([CONVERTED, RECOMPILED, FAILED], 0)
+        if outcomes[CONVERTED] or outcomes[RECOMPILED]:
+            log.info(
+                'Converted %d bytecode files, recompiled %d.',
+                outcomes[CONVERTED],
+                outcomes[RECOMPILED],
+            )
+        if outcomes[FAILED]:
+            log.warning('%d bytecode files could not be converted.', outcomes[FAILED])
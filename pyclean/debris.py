@@ -4,13 +4,19 @@
 
 """Tool-specific artifact cleanup and debris detection (to suggest option usage)."""
 
+from __future__ import annotations
+
 import logging
-import os
-from pathlib import Path
+from fnmatch import fnmatch
+from typing import TYPE_CHECKING
 
-from .erase import delete_filesystem_objects
-from .ignore import should_ignore
+from .globbing import RECURSIVE, has_magic
+from .ignore import normalize
 from .runner import Runner
+from .traversal import DISPOSE, CleanupHandler, clean_tree
+
+if TYPE_CHECKING:
+    from pathlib import Path
 
 log = logging.getLogger(__name__)
 
@@ -75,6 +81,188 @@ DEBRIS_TOPICS = {
 }
 
 
+class DebrisRule:
+    """
+    A debris pattern, reduced to the path segments of the file system object
+    it is anchored on, and what should happen to that object.
+    """
+
+    def __init__(self, parts: tuple[str, ...]):
+        self.parts = parts
+        self.contents = False  # ``name/**/*``: everything inside
+        self.directory = False  # ``name/``: the directory itself
+        self.any_type = False  # ``name``: a file, symlink or directory
+        self.topics: set[str] = set()  # where the patterns came from, if known
+
+    def matches(self, name, parents) -> bool:
+        """Do the entry name and the names of its parents match the rule?"""
+        *prefix, last = self.parts
+        if len(parents) < len(prefix) or not fnmatch(name, last):
+            return False
+        return all(
+            fnmatch(parent, part)
+            for parent, part in zip(parents[len(parents) - len(prefix) :], prefix)
+        )
+
+
+class DebrisMatcher:
+    """
+    Debris patterns compiled into rules that are looked up by entry name.
+
+    Rules with a literal name are found with a dictionary lookup, only rules
+    with wildcards in their name need to be tried one by one. A rule with
+    more than one segment (e.g. ``build/lib``) also compares the names of
+    the parent directories, up to the root of the traversal.
+    """
+
+    def __init__(self, patterns: list[str], topics: dict[str, str] | None = None):
+        rules: dict[tuple[str, ...], DebrisRule] = {}
+        for pattern in patterns:
+            parts = tuple(normalize(pattern).split('/'))
+            if parts[-2:] == (RECURSIVE, '*'):
+                anchor, flag = parts[:-2], 'contents'
+            elif parts[-1] == '':
+                anchor, flag = parts[:-1], 'directory'
+            else:
+                anchor, flag = parts, 'any_type'
+            if not anchor or RECURSIVE in anchor or '' in anchor:
+                msg = 'Unsupported debris pattern: %s' % pattern
+                raise ValueError(msg)
+            rule = rules.setdefault(anchor, DebrisRule(anchor))
+            setattr(rule, flag, True)
+            if topics:
+                rule.topics.add(topics[pattern])
+
+        self.literal: dict[str, list[DebrisRule]] = {}
+        self.wildcard: list[DebrisRule] = []
+        for anchor, rule in rules.items():
+            if has_magic(anchor[-1]):
+                self.wildcard.append(rule)
+            else:
+                self.literal.setdefault(anchor[-1], []).append(rule)
+
+        self.context = max((len(anchor) for anchor in rules), default=1) - 1
+
+    def __bool__(self):
+        return bool(self.literal or self.wildcard)
+
+    def lookup(self, name, parents) -> list[DebrisRule]:
+        """Return all rules that match an entry, given its parents' names."""
+        candidates = [*self.literal.get(name, ()), *self.wildcard]
+        return [rule for rule in candidates if rule.matches(name, parents)]
+
+    def parents_of(self, name, parents) -> tuple[str, ...]:
+        """Return the parent names to keep for the entries of a subdirectory."""
+        if not self.context:
+            return ()
+        return (*parents, name)[-self.context :]
+
+
+class DebrisHandler(CleanupHandler):
+    """
+    Deletes debris of the given topics, applying the topic patterns relative
+    to every directory of the tree that is not ignored.
+
+    The handler state of a directory is the names of its parents that the
+    matcher needs, or :data:`SUBTREE` when only the content of a directory
+    is debris. Debris directories with all of their content are disposed of
+    in one go, without any further matching.
+    """
+
+    SUBTREE = 'subtree'
+
+    def __init__(self, topics=(), patterns=None):
+        for topic in topics:
+            log.debug('Scanning for debris of %s ...', topic.title())
+        if patterns is None:
+            patterns = [pattern for topic in topics for pattern in DEBRIS_TOPICS[topic]]
+        self.matcher = DebrisMatcher(patterns)
+
+    def start(self, directory):
+        if not self.matcher or Runner.is_ignored(directory):
+            return None
+        return ()
+
+    def enter(self, directory, state, *, ignored):
+        if ignored:
+            return None
+        if state is self.SUBTREE:
+            return DISPOSE
+        rules = self.matcher.lookup(directory.name, state)
+        if any(rule.contents for rule in rules):
+            if any(rule.directory or rule.any_type for rule in rules):
+                return DISPOSE
+            return self.SUBTREE
+        return self.matcher.parents_of(directory.name, state)
+
+    def clean_file(self, fileobj, state):
+        if state is not self.SUBTREE and not any(
+            rule.any_type for rule in self.matcher.lookup(fileobj.name, state)
+        ):
+            return False
+        if Runner.ignore_matcher.matches(fileobj.path):
+            return False
+        Runner.unlink(fileobj)
+        return True
+
+    def clean_directory(self, dirobj, state, child_state):
+        if child_state is None:
+            return False
+        if state is not self.SUBTREE and not any(
+            rule.directory or rule.any_type
+            for rule in self.matcher.lookup(dirobj.name, state)
+        ):
+            return False
+        Runner.rmdir(dirobj)
+        return True
+
+
+class DebrisDetector(CleanupHandler):
+    """
+    Collects evidence of debris of all topics while the other cleanup phases
+    walk the tree, without deleting anything, to suggest the ``--debris``
+    topics that would have something to clean up.
+
+    A debris directory is recorded when the walk reaches it, even if it is
+    ignored, and nothing inside it is looked at. A debris file counts as
+    acted on, so that its directory is not skipped by a scan index, which
+    would hide the evidence from the next run.
+    """
+
+    def __init__(self, found: set[str]):
+        self.found = found
+        topic_of = {
+            pattern: topic
+            for topic, patterns in DEBRIS_TOPICS.items()
+            for pattern in patterns
+        }
+        self.matcher = DebrisMatcher(list(topic_of), topic_of)
+
+    def start(self, _directory):
+        return ()
+
+    def enter(self, directory, state, *, ignored):
+        rules = self.matcher.lookup(directory.name, state)
+        if rules:
+            self.record(rules)
+            return None
+        return None if ignored else self.matcher.parents_of(directory.name, state)
+
+    def clean_file(self, fileobj, state):
+        rules = [
+            rule for rule in self.matcher.lookup(fileobj.name, state) if rule.any_type
+        ]
+        self.record(rules)
+        return bool(rules)
+
+    def record(self, rules):
+        """Add the topics of the rules that matched to the evidence found."""
+        topics = {topic for rule in rules for topic in rule.topics}
+        if not topics <= self.found:
+            with Runner.lock:
+                self.found |= topics
+
+
 def remove_debris_for(topic, directory):
     """
     Clean up debris for a specific topic.
@@ -89,57 +277,32 @@ def recursive_delete_debris(directory: Path, patterns: list[str]):
     """
     Recursively delete debris matching any of the given patterns.
 
-    This function walks the directory tree once and applies all patterns
-    at each level, avoiding redundant directory scans.
+    The patterns are compiled once and applied relative to every directory
+    of the tree, in a single walk. Debris directories are removed together
+    with their content, without matching anything inside them.
     """
-    for pattern in patterns:
-        delete_filesystem_objects(directory, pattern)
-
     try:
-        subdirs = [entry for entry in os.scandir(directory) if entry.is_dir()]
-    except (OSError, PermissionError) as err:
+        clean_tree(directory, [DebrisHandler(patterns=patterns)])
+    except OSError as err:
         log.warning('Cannot access directory %s: %s', directory, err)
-        return
-
-    for subdir in subdirs:
-        if should_ignore(subdir.path, Runner.ignore):
-            log.debug('Skipping %s', subdir.name)
-        else:
-            recursive_delete_debris(Path(subdir.path), patterns)
 
 
 def detect_debris_in_directory(directory):
     """
-    Scan a directory for debris artifacts and return a list of detected topics.
+    Scan a directory tree for debris artifacts and return the topics detected.
     """
-    detected_topics = []
-
-    for topic, patterns in DEBRIS_TOPICS.items():
-        for pattern in patterns:
-            if '**' in pattern:
-                continue
-            matches = list(directory.glob(pattern))
-            if matches:
-                detected_topics.append(topic)
-                break
-
-    return detected_topics
+    detected: set[str] = set()
+    clean_tree(directory, [DebrisDetector(detected)])
+    return sorted(detected)
 
 
-def suggest_debris_option(args):
+def suggest_debris_option(detected):
     """
     Suggest using the --debris option when it wasn't used.
-    Optionally provide targeted suggestions based on detected artifacts.
+    Provide targeted suggestions based on the artifacts detected, if any.
     """
-    all_detected = set()
-    for dir_name in args.directory:
-        dir_path = Path(dir_name)
-        if dir_path.exists():
-            detected = detect_debris_in_directory(dir_path)
-            all_detected.update(detected)
-
-    if all_detected:
-        topics_str = ' '.join(sorted(all_detected))
+    if detected:
+        topics_str = ' '.join(sorted(detected))
         log.info(
             'Hint: Use --debris to also clean up build artifacts. Detected: %s',
             topics_str,
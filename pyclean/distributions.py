@@ -0,0 +1,62 @@
+# SPDX-FileCopyrightText: 2026 Peter Bittner <django@bittner.it>
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Cleanup of the bytecode of installed distributions, by their metadata."""
+
+from __future__ import annotations
+
+import logging
+import re
+from importlib.metadata import distributions
+from pathlib import Path
+
+from .bytecode import remove_bytecode_of
+from .runner import Runner
+
+log = logging.getLogger(__name__)
+
+
+def canonical_name(name: str) -> str:
+    """Normalize a distribution name (see PEP 503)."""
+    return re.sub(r'[-_.]+', '-', name).lower()
+
+
+def installed_sources(directory: Path, names=()):
+    """
+    Yield the Python source files of the distributions installed in a
+    directory, e.g. ``site-packages``, as listed in their ``RECORD`` files.
+    Only the distributions named are considered, if any. Files installed
+    outside of the directory, e.g. scripts, are skipped, and so are files
+    in directories matching an ignore pattern (relative to the directory).
+    """
+    wanted = {canonical_name(name) for name in names}
+    found = set()
+    for dist in distributions(path=[str(directory)]):
+        name = canonical_name(dist.metadata['Name'] or '')
+        if wanted and name not in wanted:
+            continue
+        found.add(name)
+        files = dist.files
+        if files is None:
+            log.warning('Cannot list the files of %s, it has no RECORD.', name)
+            continue
+        for file in files:
+            if (
+                file.suffix == '.py'
+                and '..' not in file.parts
+                and not Runner.ignore_matcher.is_ignored(file.parent)
+            ):
+                yield Path(dist.locate_file(file))
+
+    for name in sorted(wanted - found):
+        log.warning('Distribution %s is not installed in %s', name, directory)
+
+
+def clean_distributions(directory: Path, names=()):
+    """
+    Delete the bytecode of the distributions installed in a directory,
+    without walking the directory tree.
+    """
+    log.debug('Cleaning bytecode of installed distributions in %s', directory)
+    remove_bytecode_of(installed_sources(directory, names))
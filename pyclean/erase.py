@@ -7,10 +7,15 @@
 from __future__ import annotations
 
 import logging
-from pathlib import Path
+from typing import TYPE_CHECKING
 
-from .ignore import path_is_ignored
+from .globbing import GlobPattern
+from .ignore import IgnoreMatcher
 from .runner import Runner
+from .traversal import CleanupHandler, clean_tree
+
+if TYPE_CHECKING:
+    from pathlib import Path
 
 log = logging.getLogger(__name__)
 
@@ -36,47 +41,106 @@ def delete_filesystem_objects(
     Identifies all pathnames matching a specific glob pattern, and attempts
     to delete them in the proper order, optionally asking for confirmation.
 
-    Implementation Note: We sort the file system objects in *reverse order*
-    and first delete *all files* before removing directories. This way we
-    make sure that the directories that are deepest down in the hierarchy
-    are empty (for both files & directories) when we attempt to remove them.
+    The matches are deleted while the directory tree is walked, files as
+    they are found, and directories after their content (post-order), so
+    that the directories deepest down in the hierarchy are empty when we
+    attempt to remove them. Nothing is collected or sorted up front.
 
     If ``ignore_patterns`` is not provided, the current ``Runner.ignore``
     patterns are used for compatibility with existing internal call sites.
     """
-    directory = Path(directory)
-    all_names = sorted(directory.glob(path_glob), reverse=True)
-    # Keep existing behavior for call sites like debris cleanup that invoke
-    # delete_filesystem_objects() directly and rely on Runner.ignore filtering.
     ignore_patterns = Runner.ignore if ignore_patterns is None else ignore_patterns
-    if ignore_patterns:
-        all_names = [n for n in all_names if not path_is_ignored(n, ignore_patterns)]
-    if not all_names:
-        return
-    log.debug('Erase file system objects matching: %s', path_glob)
-    dirs = (name for name in all_names if name.is_dir() and not name.is_symlink())
-    files = (name for name in all_names if not name.is_dir() or name.is_symlink())
-
-    for file_object in files:
-        file_type = 'symlink' if file_object.is_symlink() else 'file'
-        if (
-            not dry_run
-            and prompt
-            and not confirm('Delete %s %s' % (file_type, file_object))
-        ):
-            Runner.unlink_failed += 1
-            continue
-        Runner.unlink(file_object)
-
-    for dir_object in dirs:
-        if (
-            not dry_run
-            and prompt
-            and not confirm('Remove empty directory %s' % dir_object)
-        ):
-            Runner.rmdir_failed += 1
-            continue
-        Runner.rmdir(dir_object)
+    clean_tree(
+        directory,
+        [EraseHandler([path_glob], prompt, dry_run, ignore_patterns)],
+    )
+
+
+class EraseHandler(CleanupHandler):
+    """
+    Deletes free-form targets matching any of the globbing patterns, which
+    are relative to the root of the traversal. All patterns are matched in
+    a single walk, which only descends where a pattern can still match.
+
+    Only ``ignore_patterns`` constrain the matches, independently of the
+    ignore verdict of the traversal (see :func:`remove_freeform_targets`).
+    """
+
+    respects_ignore = False
+
+    def __init__(
+        self,
+        glob_patterns: list[str],
+        prompt=False,
+        dry_run=False,
+        ignore_patterns: list[str] | None = None,
+    ):
+        self.patterns = [GlobPattern(path_glob) for path_glob in glob_patterns]
+        self.prompt = prompt and not dry_run
+        self.ignore_matcher = IgnoreMatcher(ignore_patterns)
+        self.reported: set[str] = set()
+
+    def start(self, directory):
+        if not self.patterns or self.ignore_matcher.is_ignored(directory):
+            return None
+        return tuple(pattern.initial for pattern in self.patterns)
+
+    def enter(self, directory, state, *, ignored):  # noqa: ARG002
+        if self.ignore_matcher.matches(directory.path):
+            return None
+        child_state = tuple(
+            pattern.advance(pattern_state, directory.name)
+            for pattern, pattern_state in zip(self.patterns, state)
+        )
+        return child_state if any(child_state) else None
+
+    def clean_file(self, fileobj, state):
+        child_state = tuple(
+            pattern.advance(pattern_state, fileobj.name)
+            for pattern, pattern_state in zip(self.patterns, state)
+        )
+        if not self._matches(child_state, is_dir=False, path=fileobj.path):
+            return False
+
+        file_type = 'symlink' if fileobj.is_symlink() else 'file'
+        if self.prompt and not confirm('Delete %s %s' % (file_type, fileobj)):
+            with Runner.lock:
+                Runner.unlink_failed += 1
+        else:
+            Runner.unlink(fileobj)
+        return True
+
+    def clean_directory(self, dirobj, _state, child_state):
+        if child_state is None or not self._matches(child_state, is_dir=True):
+            return False
+
+        if dirobj.is_symlink():
+            if self.prompt and not confirm('Delete symlink %s' % dirobj):
+                with Runner.lock:
+                    Runner.unlink_failed += 1
+            else:
+                Runner.unlink(dirobj)
+        elif self.prompt and not confirm('Remove empty directory %s' % dirobj):
+            with Runner.lock:
+                Runner.rmdir_failed += 1
+        else:
+            Runner.rmdir(dirobj)
+        return True
+
+    def _matches(self, state, is_dir, path=None):
+        matching = [
+            pattern.pattern
+            for pattern, pattern_state in zip(self.patterns, state)
+            if pattern.matches(pattern_state, is_dir=is_dir)
+        ]
+        if not matching or (path is not None and self.ignore_matcher.matches(path)):
+            return False
+        with Runner.lock:
+            unreported = [glob for glob in matching if glob not in self.reported]
+            self.reported.update(unreported)
+        for path_glob in unreported:
+            log.debug('Erase file system objects matching: %s', path_glob)
+        return True
 
 
 def remove_freeform_targets(
@@ -106,13 +170,14 @@ def remove_freeform_targets(
     list does not restrict ``--erase`` — when no explicit ignore patterns
     are given, every match is deleted.
     """
-    directory = Path(directory)
-    ignore_patterns = explicit_ignore_patterns or []
-    for path_glob in glob_patterns:
-        delete_filesystem_objects(
-            directory,
-            path_glob,
-            prompt=not yes,
-            dry_run=dry_run,
-            ignore_patterns=ignore_patterns,
-        )
+    clean_tree(
+        directory,
+        [
+            EraseHandler(
+                glob_patterns,
+                prompt=not yes,
+                dry_run=dry_run,
+                ignore_patterns=explicit_ignore_patterns or [],
+            ),
+        ],
+    )
@@ -8,32 +8,91 @@ import logging
 import os
 from pathlib import Path
 
-from .ignore import should_ignore
 from .runner import Runner
+from .traversal import CleanupHandler
 
 log = logging.getLogger(__name__)
 
 
-def remove_empty_directories(directory):
+class EmptyFolderHandler(CleanupHandler):
     """
-    Recursively remove empty directories in the given directory tree.
+    Removes directories that are empty after all other handlers ran.
+
+    The runner counts the objects removed from every directory during the
+    walk, and the scan of a directory counted its entries, so a directory is
+    known to be empty when the two are equal, without reading it again.
+    Only a directory whose entries are unknown, e.g. because the scan was
+    skipped thanks to the index, is checked for content.
+    """
+
+    def start(self, _directory):
+        Runner.track_removals()
+        return True
+
+    def clean_directory(self, dirobj, _state, child_state):
+        if child_state is None:
+            return False
+        Runner.settle(dirobj.path)
+        remaining = Runner.remaining(dirobj)
+        try:
+            if remaining is None:
+                remaining = any(os.scandir(dirobj))
+            if not remaining:
+                Runner.rmdir(dirobj)
+                return True
+        except (OSError, PermissionError) as err:
+            log.debug('Cannot check or remove directory %s: %s', dirobj, err)
+        return False
+
+    def finish(self):
+        Runner.track_removals(enable=False)
+
+
+def remove_empty_directories(directory, max_depth=None):
+    """
+    Remove empty directories in the given directory tree, optionally only
+    down to a number of levels below it.
 
     This walks the directory tree in post-order (bottom-up), attempting to
-    remove directories that are empty.
+    remove directories that are empty. Pending subdirectories are kept on an
+    explicit stack, so deep trees don't exhaust the interpreter's call stack.
     """
+    stack = [(directory, iter(_subdirectories(directory)))]
+    while stack:
+        path, pending = stack[-1]
+        subdir = next(pending, None)
+        if subdir is not None:
+            within = max_depth is None or len(stack) < max_depth
+            subdirs = _subdirectories(subdir) if within else []
+            stack.append((subdir, iter(subdirs)))
+            continue
+        stack.pop()
+        if stack:
+            _remove_if_empty(path)
+
+
+def _subdirectories(directory):
+    """Return the paths of all subdirectories that are not ignored."""
     try:
-        subdirs = [entry for entry in os.scandir(directory) if entry.is_dir()]
+        with os.scandir(directory) as entries:
+            subdirs = [entry for entry in entries if entry.is_dir()]
     except (OSError, PermissionError) as err:
         log.warning('Cannot access directory %s: %s', directory, err)
-        return
+        return []
 
+    paths = []
     for subdir in subdirs:
-        if should_ignore(subdir.path, Runner.ignore):
+        if Runner.ignore_matcher.matches(subdir.path):
             log.debug('Skipping %s', subdir.name)
         else:
-            remove_empty_directories(subdir.path)
-            try:
-                if not any(os.scandir(subdir.path)):
-                    Runner.rmdir(Path(subdir.path))
-            except (OSError, PermissionError) as err:
-                log.debug('Cannot check or remove directory %s: %s', subdir.path, err)
+            paths.append(subdir.path)
+    return paths
+
+
+def _remove_if_empty(path):
+    """Remove a directory if there is nothing left inside."""
+    try:
+        if not any(os.scandir(path)):
+            Runner.rmdir(Path(path))
+    except (OSError, PermissionError) as err:
+        log.debug('Cannot check or remove directory %s: %s', path, err)
@@ -2,10 +2,17 @@
 #
 # SPDX-License-Identifier: GPL-3.0-or-later
 
-"""Git integration for cleaning untracked files."""
+"""Git integration for cleaning untracked files and orphaned bytecode."""
+
+from __future__ import annotations
 
 import logging
+import os
 import subprocess
+from pathlib import Path
+
+from .bytecode import remove_bytecode_of
+from .runner import Runner
 
 GIT_FATAL_ERROR = 128
 
@@ -42,3 +49,57 @@ def execute_git_clean(directory, args):
         )
     elif result.returncode:
         raise SystemExit(result.returncode)
+
+
+def deleted_sources(directory, revision) -> list[Path] | None:
+    """
+    List the Python source files inside a directory that were deleted or
+    renamed since a Git revision, according to a single ``git diff``.
+    """
+    cmd = [
+        'git',
+        'diff',
+        '--name-status',
+        '-z',
+        '--no-renames',
+        '--diff-filter=D',
+        '--relative',
+        revision,
+        '--',
+    ]
+    log.debug('Run: %s', ' '.join(cmd))
+    result = subprocess.run(  # noqa: S603
+        cmd,
+        cwd=directory,
+        capture_output=True,
+        check=False,
+    )
+    if result.returncode:
+        log.warning(
+            'Cannot list files deleted since %s in %s: %s',
+            revision,
+            directory,
+            os.fsdecode(result.stderr).strip(),
+        )
+        return None
+
+    fields = os.fsdecode(result.stdout).split('\0')
+    names = fields[1::2]  # status and name alternate
+    return [Path(directory, name) for name in names if name.endswith('.py')]
+
+
+def remove_orphaned_bytecode(directory, revision):
+    """
+    Delete the bytecode of Python source files deleted or renamed since a
+    Git revision, in all the bytecode cache directories concerned, without
+    walking the directory tree. A bytecode cache directory is removed when
+    nothing else is left in it.
+    """
+    sources = deleted_sources(directory, revision)
+    if sources is None:
+        return
+    log.debug('%d source files deleted since %s', len(sources), revision)
+
+    remove_bytecode_of(
+        source for source in sources if not Runner.is_ignored(source.parent)
+    )
@@ -0,0 +1,78 @@
+# SPDX-FileCopyrightText: 2026 Peter Bittner <django@bittner.it>
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Incremental glob pattern matching along a directory walk."""
+
+from __future__ import annotations
+
+from fnmatch import fnmatch
+from pathlib import PurePath
+
+from .ignore import normalize
+
+RECURSIVE = '**'
+WILDCARDS = frozenset('*?[')
+
+
+def has_magic(segment: str) -> bool:
+    """Does a path segment contain any wildcard characters?"""
+    return not WILDCARDS.isdisjoint(segment)
+
+
+class GlobPattern:
+    """
+    A globbing pattern (as understood by ``Path.glob``), split into path
+    segments that are matched one directory level at a time.
+
+    A match state is the set of pattern positions reachable after consuming
+    the names of all directories on the way down. A tree walker only needs
+    to keep the state of the parent directory to evaluate a child entry, and
+    an empty state means that nothing below can ever match.
+    """
+
+    def __init__(self, pattern: str):
+        normalized = normalize(pattern)
+        if PurePath(normalized).is_absolute():
+            msg = 'Non-relative patterns are unsupported: %s' % pattern
+            raise ValueError(msg)
+
+        self.pattern = pattern
+        self.dir_only = normalized.endswith('/')
+        self.parts = tuple(
+            part for part in normalized.split('/') if part not in ('', '.')
+        )
+        if not self.parts:
+            msg = 'Unacceptable pattern: %r' % pattern
+            raise ValueError(msg)
+        if self.parts[-1] == RECURSIVE:
+            self.dir_only = True
+
+        self.initial = self._closure({0})
+
+    def _closure(self, positions) -> frozenset[int]:
+        """Add positions reachable by letting ``**`` match zero segments."""
+        reachable = set(positions)
+        for start in positions:
+            pos = start
+            while pos < len(self.parts) and self.parts[pos] == RECURSIVE:
+                pos += 1
+                reachable.add(pos)
+        return frozenset(reachable)
+
+    def advance(self, state: frozenset[int], name: str) -> frozenset[int]:
+        """Consume one path segment, return the state of the child entry."""
+        reached = set()
+        for pos in state:
+            if pos == len(self.parts):
+                continue
+            part = self.parts[pos]
+            if part == RECURSIVE:
+                reached.add(pos)
+            elif fnmatch(name, part):
+                reached.add(pos + 1)
+        return self._closure(reached)
+
+    def matches(self, state: frozenset[int], *, is_dir: bool) -> bool:
+        """Does the entry that produced ``state`` match the entire pattern?"""
+        return len(self.parts) in state and (is_dir or not self.dir_only)
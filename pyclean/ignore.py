@@ -7,7 +7,8 @@
 from __future__ import annotations
 
 import os
-from pathlib import Path
+from functools import lru_cache
+from pathlib import Path, PurePath
 
 
 def normalize(path_pattern: str) -> str:
@@ -50,6 +51,73 @@ def should_ignore(pathname: str, ignore_patterns: list[str] | None) -> bool:
 
 def path_is_ignored(path: Path, ignore_patterns: list[str]) -> bool:
     """Check if a path or any of its ancestors matches an ignore pattern."""
-    if not isinstance(path, Path):
-        path = Path(str(path))
-    return any(should_ignore(str(p), ignore_patterns) for p in [path, *path.parents])
+    if not ignore_patterns:
+        return False
+    return compile_patterns(tuple(ignore_patterns)).is_ignored(path)
+
+
+class IgnoreMatcher:
+    """
+    Ignore patterns compiled for matching path names in constant time.
+
+    Simple names go into a set. Patterns with several parts (``foo/bar``) go
+    into a trie of their *reversed* parts, which is walked from the last part
+    of a path upwards, i.e. it matches path suffixes. The cost of a match is
+    independent of the number of patterns, and bounded by the number of parts
+    of the longest pattern.
+
+    A tree walker knows that the parent of a directory is not ignored (or it
+    wouldn't have descended), so it only needs :meth:`matches` for each new
+    directory, not :meth:`is_ignored`, which also checks all ancestors.
+    """
+
+    END = ''  # a path part can never be empty, hence it marks a pattern end
+
+    def __init__(self, ignore_patterns: list[str] | None = None):
+        self.names: set[str] = set()
+        self.suffixes: dict[str, dict] = {}
+        for pattern in ignore_patterns or []:
+            parts = PurePath(normalize(pattern)).parts
+            if len(parts) == 1:
+                self.names.add(parts[0])
+            elif parts:
+                node = self.suffixes
+                for part in reversed(parts):
+                    node = node.setdefault(part, {})
+                node[self.END] = {}
+
+    def __bool__(self):
+        return bool(self.names or self.suffixes)
+
+    def matches(self, path: PurePath | str) -> bool:
+        """Does the path itself match a pattern? (Ancestors are not checked.)"""
+        parts = path_parts(path)
+        return bool(parts) and self._matches_parts(parts)
+
+    def is_ignored(self, path: PurePath | str) -> bool:
+        """Does the path or any of its ancestors match a pattern?"""
+        parts = path_parts(path)
+        return any(self._matches_parts(parts[:end]) for end in range(len(parts), 0, -1))
+
+    def _matches_parts(self, parts) -> bool:
+        if parts[-1] in self.names:
+            return True
+        node = self.suffixes
+        for part in reversed(parts):
+            node = node.get(part)
+            if node is None:
+                return False
+            if self.END in node:
+                return True
+        return False
+
+
+def path_parts(path: PurePath | str) -> tuple[str, ...]:
+    """Split a path into its parts, without re-parsing path objects."""
+    return path.parts if isinstance(path, PurePath) else PurePath(path).parts
+
+
+@lru_cache(maxsize=32)
+def compile_patterns(ignore_patterns: tuple[str, ...]) -> IgnoreMatcher:
+    """Compile (and cache) an ignore pattern list for repeated matching."""
+    return IgnoreMatcher(list(ignore_patterns))
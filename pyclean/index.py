@@ -0,0 +1,132 @@
+# SPDX-FileCopyrightText: 2026 Peter Bittner <django@bittner.it>
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Persistent index of directories without anything to clean up."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+from . import __version__
+from .bytecode import BYTECODE_DIRS, BYTECODE_FILES
+from .debris import DEBRIS_TOPICS
+
+log = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+INDEX_MAX_ENTRIES = 100_000
+RACY_INTERVAL_NS = 2_000_000_000  # mtime granularity of slow file systems
+
+
+def index_location(directory: Path) -> Path:
+    """Return the index file for a directory tree, in the user's cache."""
+    cache_home = os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache'
+    key = hashlib.sha256(str(directory.resolve()).encode()).hexdigest()[:16]
+    return Path(cache_home) / 'pyclean' / ('%s.json' % key)
+
+
+def fingerprint(args) -> str:
+    """
+    Summarize the configuration that decides what gets cleaned up. An index
+    recorded with a different configuration is worthless.
+    """
+    config = {
+        'version': __version__,
+        'bytecode': [BYTECODE_FILES, BYTECODE_DIRS],
+        'pycache_prefix': sys.pycache_prefix,
+        'shard': str(getattr(args, 'shard', None)),
+        'stale_only': getattr(args, 'stale_only', False),
+        'keep_tags': sorted(getattr(args, 'keep_tags', None) or []),
+        'keep_levels': sorted(getattr(args, 'keep_levels', None) or []),
+        'invalidation_mode': getattr(args, 'invalidation_mode', None),
+        'debris': sorted(args.debris),
+        'topics': DEBRIS_TOPICS,
+        'erase': args.erase,
+        'folders': args.folders,
+        'ignore': args.ignore,
+        'explicit_ignore': getattr(args, 'explicit_ignore', []),
+    }
+    serialized = json.dumps(config, sort_keys=True).encode()
+    return hashlib.sha256(serialized).hexdigest()
+
+
+class ScanIndex:
+    """
+    Remembers the directories of a tree in which no cleanup handler found
+    anything to act on, together with their modification time, inode and
+    subdirectories.
+
+    Adding or removing an entry changes the modification time of its parent
+    directory. A directory whose time and inode are unchanged since the last
+    run therefore still has the same content, hence its files need not be
+    scanned again, only its subdirectories need to be checked in turn.
+
+    Only directories confirmed during a run are saved, up to a maximum number
+    of entries, so that directories that disappeared drop out of the index.
+    """
+
+    def __init__(self, root: Path, config: str, location: Path | None = None):
+        self.root = root
+        self.config = config
+        self.location = location or index_location(root)
+        self.known: dict[str, list] = {}
+        self.confirmed: dict[str, list] = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def load(cls, root: Path, config: str, location: Path | None = None):
+        """Read the index of a directory tree, unless it's outdated."""
+        index = cls(root, config, location)
+        try:
+            data = json.loads(index.location.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return index
+        if data.get('version') != INDEX_VERSION or data.get('config') != config:
+            log.debug('Discarding outdated scan index %s', index.location)
+            return index
+        index.known = data.get('directories', {})
+        log.debug('Using scan index %s', index.location)
+        return index
+
+    def lookup(self, directory: Path, stat: os.stat_result) -> list[str] | None:
+        """Return the subdirectories of an unchanged directory, or None."""
+        entry = self.known.get(self._key(directory))
+        if entry and entry[:2] == [stat.st_mtime_ns, stat.st_ino]:
+            return entry[2]
+        return None
+
+    def record(self, directory: Path, stat: os.stat_result, subdirs: list[str]):
+        """Remember a directory that had nothing to clean up."""
+        if time.time_ns() - stat.st_mtime_ns < RACY_INTERVAL_NS:
+            return  # could still change without its timestamp changing
+        with self.lock:
+            if len(self.confirmed) < INDEX_MAX_ENTRIES:
+                entry = [stat.st_mtime_ns, stat.st_ino, subdirs]
+                self.confirmed[self._key(directory)] = entry
+
+    def save(self) -> None:
+        """Write the directories confirmed in this run, replacing the index."""
+        data = {
+            'version': INDEX_VERSION,
+            'config': self.config,
+            'root': str(self.root),
+            'directories': self.confirmed,
+        }
+        temporary = self.location.with_suffix('.tmp%d' % os.getpid())
+        try:
+            self.location.parent.mkdir(parents=True, exist_ok=True)
+            temporary.write_text(json.dumps(data), encoding='utf-8')
+            temporary.replace(self.location)
+        except OSError as err:
+            log.warning('Cannot write scan index %s: %s', self.location, err)
+
+    def _key(self, directory: Path) -> str:
+        return directory.relative_to(self.root).as_posix()
@@ -5,46 +5,349 @@
 """Main orchestration of the pyclean cleanup process."""
 
 import logging
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
 
-from .bytecode import BYTECODE_DIRS, BYTECODE_FILES
-from .debris import remove_debris_for, suggest_debris_option
-from .erase import remove_freeform_targets
-from .folders import remove_empty_directories
-from .gitclean import execute_git_clean
+from .bytecode import (
+    BYTECODE_DIRS,
+    BYTECODE_FILES,
+    BytecodeSelection,
+    SelectiveBytecodeHandler,
+    StaleBytecodeHandler,
+    pycache_mirror,
+)
+from .compiler import INVALIDATION_MODES, HashBytecodeHandler, recompile
+from .debris import DebrisDetector, DebrisHandler, suggest_debris_option
+from .distributions import clean_distributions
+from .erase import EraseHandler
+from .folders import EmptyFolderHandler, remove_empty_directories
+from .gitclean import execute_git_clean, remove_orphaned_bytecode
+from .index import ScanIndex, fingerprint
+from .plan import PlanWriter, execute_plan
+from .quarantine import (
+    Quarantine,
+    purge_trash,
+    remove_trash_area,
+    restore_trash,
+    start_purge_worker,
+)
 from .runner import Runner
-from .traversal import descend_and_clean
+from .shard import FINAL, SHARD_DEPTH, ShardHandler
+from .streaming import clean_stream
+from .traversal import BytecodeHandler, clean_tree
 
 log = logging.getLogger(__name__)
 
 
-def pyclean(args):
-    """Cross-platform cleaning of Python bytecode."""
-    Runner.configure(args)
+def cleanup_handlers(args):
+    """
+    Assemble the cleanup phases requested on the command line, in the order
+    they get a chance to act on each file system object.
+    """
+    handlers = [
+        bytecode_handler(args),
+        DebrisHandler(args.debris),
+        EraseHandler(
+            args.erase,
+            prompt=not args.yes,
+            dry_run=args.dry_run,
+            ignore_patterns=getattr(args, 'explicit_ignore', []),
+        ),
+    ]
+    if args.folders:
+        log.debug('Removing empty directories...')
+        handlers.append(EmptyFolderHandler())
+    if wants_hint(args):
+        handlers.append(DebrisDetector(Runner.debris_found))
+    return handlers
+
+
+def wants_hint(args):
+    """
+    Should the cleanup end with a hint about the --debris option? Only if
+    the evidence for it is found in passing, by a walk that takes place
+    anyway, and never in the modes that don't walk the directory trees.
+    """
+    return (
+        not args.debris
+        and not getattr(args, 'no_hint', False)
+        and walks_source_trees(args)
+    )
+
+
+def walks_source_trees(args):
+    """
+    Does the cleanup walk the directory trees given? With a bytecode cache
+    prefix, the bytecode phase walks the mirrored cache tree instead.
+    """
+    if (
+        getattr(args, 'since', None)
+        or getattr(args, 'distributions', None) is not None
+        or getattr(args, 'from_stdin', False)
+        or getattr(args, 'execute_plan', None)
+        or getattr(args, 'undo', False)
+        or getattr(args, 'purge_trash', False)
+        or getattr(args, 'shard', None) == FINAL
+    ):
+        return False
+    return not sys.pycache_prefix or other_phases_walk(args)
+
+
+def other_phases_walk(args):
+    """Do phases other than the bytecode phase walk the directory trees?"""
+    return bool(args.debris or args.erase or args.folders)
+
+
+def bytecode_handler(args):
+    """
+    Pick the handler for the bytecode phase: delete all bytecode, or only
+    bytecode that isn't selected to be kept, or that is stale, or convert it.
+    """
+    selection = BytecodeSelection(
+        getattr(args, 'keep_tags', None),
+        getattr(args, 'keep_levels', None),
+    )
+    invalidation_mode = getattr(args, 'invalidation_mode', None)
+    if invalidation_mode:
+        return HashBytecodeHandler(
+            BYTECODE_FILES,
+            BYTECODE_DIRS,
+            selection,
+            INVALIDATION_MODES[invalidation_mode],
+            dry_run=args.dry_run,
+        )
+    if getattr(args, 'stale_only', False):
+        return StaleBytecodeHandler(BYTECODE_FILES, BYTECODE_DIRS, selection)
+    if selection.tags is not None or selection.levels is not None:
+        return SelectiveBytecodeHandler(BYTECODE_FILES, BYTECODE_DIRS, selection)
+    return BytecodeHandler(BYTECODE_FILES, BYTECODE_DIRS)
+
+
+def distinct_roots(args):
+    """
+    Return the directories to clean, without duplicates, and without those
+    that are nested inside another directory whose traversal covers them.
 
+    A nested directory is only covered if no ignore pattern prevents the
+    outer traversal from reaching it. With ``--erase`` or ``--git-clean``
+    nested directories are always kept, because erase patterns are relative
+    to each directory and git clean acts on the directory's repository.
+    """
+    roots: dict[Path, Path] = {}
     for dir_name in args.directory:
         dir_path = Path(dir_name)
+        resolved = dir_path.resolve()
+        if resolved in roots:
+            log.debug('Skipping %s (same as %s)', dir_path, roots[resolved])
+        else:
+            roots[resolved] = dir_path
+
+    if args.erase or args.git_clean:
+        return list(roots.values())
+
+    distinct = []
+    for resolved, dir_path in roots.items():
+        outer = next(
+            (
+                other
+                for other_resolved, other in roots.items()
+                if other_resolved != resolved
+                and resolved.is_relative_to(other_resolved)
+                and reaches(other, resolved.relative_to(other_resolved).parts)
+            ),
+            None,
+        )
+        if outer is None:
+            distinct.append(dir_path)
+        else:
+            log.debug('Skipping %s (inside %s)', dir_path, outer)
+    return distinct
 
-        log.info('Cleaning directory %s', dir_path)
-        descend_and_clean(dir_path, BYTECODE_FILES, BYTECODE_DIRS)
 
-        for topic in args.debris:
-            remove_debris_for(topic, dir_path)
+def reaches(directory, parts):
+    """Does a traversal of the directory descend through the given parts?"""
+    if Runner.is_ignored(directory):
+        return False
+    for part in parts:
+        directory /= part
+        if Runner.ignore_matcher.matches(directory):
+            return False
+    return True
 
-        remove_freeform_targets(
+
+def clean_root(dir_path, args):
+    """Run all cleanup phases on a single directory tree."""
+    log.info('Cleaning directory %s', dir_path)
+    since = getattr(args, 'since', None)
+    distributions = getattr(args, 'distributions', None)
+    if since:
+        remove_orphaned_bytecode(dir_path, since)
+    elif distributions is not None:
+        clean_distributions(dir_path, distributions)
+    elif getattr(args, 'undo', False):
+        restore_trash(dir_path)
+    elif getattr(args, 'purge_trash', False):
+        purge_trash(
             dir_path,
-            args.erase,
-            args.yes,
-            args.dry_run,
-            explicit_ignore_patterns=getattr(args, 'explicit_ignore', []),
+            args.undo_window,
+            wait=getattr(args, 'purge_wait', False),
         )
+    elif getattr(args, 'shard', None) == FINAL:
+        log.debug('Removing shared directories left empty by all shards...')
+        remove_empty_directories(dir_path, max_depth=SHARD_DEPTH - 1)
+    else:
+        clean_walking_tree(dir_path, args)
+
+    if args.git_clean:
+        Runner.settle()
+        execute_git_clean(dir_path, args)
+
+
+def clean_walking_tree(dir_path, args):
+    """
+    Run the cleanup phases that walk the directory tree. With a bytecode
+    cache prefix, the bytecode phase walks the mirrored cache tree too, and
+    the directory tree is only walked if other phases need it.
+    """
+    if not getattr(args, 'quarantine', False) or args.dry_run:
+        walk_tree(dir_path, args)
+        return
+    purge_trash(dir_path, args.undo_window)
+    Runner.quarantine = Quarantine(dir_path)
+    try:
+        walk_tree(dir_path, args)
+    finally:
+        Runner.quarantine = None
+        remove_trash_area(dir_path)
+
 
-        if args.folders:
-            log.debug('Removing empty directories...')
-            remove_empty_directories(dir_path)
+def walk_tree(dir_path, args):
+    """
+    Walk the directory tree, and its bytecode cache prefix mirror. When the
+    directory tree is walked anyway, the bytecode phase also acts on it, to
+    remove bytecode written before the cache prefix was set.
+    """
+    handlers = cleanup_handlers(args)
+    mirror = pycache_mirror(dir_path)
+    if mirror is not None:
+        if not other_phases_walk(args):
+            handlers = handlers[1:]
+        if mirror.is_dir():
+            log.debug('Cleaning bytecode in cache prefix tree %s', mirror)
+            clean_tree(
+                mirror,
+                sharded([bytecode_handler(args), EmptyFolderHandler()], args),
+                jobs=walk_jobs(args),
+            )
+
+    index = (
+        ScanIndex.load(dir_path, fingerprint(args))
+        if getattr(args, 'index', False)
+        else None
+    )
+    clean_tree(dir_path, sharded(handlers, args), jobs=walk_jobs(args), index=index)
+    if index is not None:
+        index.save()
+
+
+def sharded(handlers, args):
+    """Restrict the cleanup handlers to a shard of the tree, if requested."""
+    shard = getattr(args, 'shard', None)
+    if shard is None:
+        return handlers
+    log.debug('Cleaning shard %s', shard)
+    return [ShardHandler(handler, shard) for handler in handlers]
+
+
+def walk_jobs(args):
+    """
+    Number of threads to walk a directory tree with. Only a real cleanup
+    with --jobs walks in parallel; dry runs keep their output in order and
+    interactive prompts must not interleave.
+    """
+    if Runner.pool is None or is_interactive(args):
+        return 1
+    return args.jobs
+
+
+def is_interactive(args):
+    """Will the user be prompted for confirmation during the cleanup?"""
+    return not (args.dry_run or args.yes) and bool(args.erase or args.git_clean)
+
+
+def clean_root_in_process(args, dir_path):
+    """
+    Clean a directory tree in a worker process, return its counters and the
+    debris topics found.
+    """
+    Runner.configure(args)
+    try:
+        clean_root(dir_path, args)
+    finally:
+        Runner.finish()
+    return Runner.counters(), Runner.debris_found
+
+
+def init_worker(log_level):
+    """Set up logging in a worker process (when it isn't inherited)."""
+    logging.basicConfig(level=log_level, format='%(message)s')
 
-        if args.git_clean:
-            execute_git_clean(dir_path, args)
+
+def run_cleanup(args, roots, processes):
+    """Clean up the directories, or paths from elsewhere, in the mode chosen."""
+    if getattr(args, 'execute_plan', None):
+        execute_plan(Path(args.execute_plan))
+    elif processes > 1:
+        with ProcessPoolExecutor(
+            max_workers=processes,
+            initializer=init_worker,
+            initargs=(logging.getLogger().getEffectiveLevel(),),
+        ) as executor:
+            for counters, debris_found in executor.map(
+                partial(clean_root_in_process, args),
+                roots,
+            ):
+                Runner.merge(counters)
+                Runner.debris_found |= debris_found
+    elif getattr(args, 'from_stdin', False):
+        clean_stream(sys.stdin.buffer, args)
+    else:
+        for dir_path in roots:
+            clean_root(dir_path, args)
+
+
+def pyclean(args):
+    """Cross-platform cleaning of Python bytecode."""
+    Runner.configure(args)
+    roots = distinct_roots(args)
+
+    plan = (
+        PlanWriter.create(Path(args.plan), args.debris)
+        if getattr(args, 'plan', None)
+        else None
+    )
+    if plan is not None:
+        Runner.unlink, Runner.rmdir = plan.unlink, plan.rmdir
+
+    processes = min(getattr(args, 'processes', 1), len(roots))
+    if processes > 1 and is_interactive(args):
+        log.debug('Cleaning directories one by one, for interactive prompts.')
+        processes = 1
+    elif processes > 1 and plan is not None:
+        log.debug('Cleaning directories one by one, for a single plan file.')
+        processes = 1
+
+    try:
+        run_cleanup(args, roots, processes)
+    finally:
+        Runner.finish()
+        if plan is not None:
+            plan.close()
+
+    if getattr(args, 'quarantine', False) and not args.dry_run:
+        start_purge_worker(roots, args.undo_window)
 
     git_clean_note = ' (Not counting git clean)' if args.git_clean else ''
 
@@ -65,5 +368,14 @@ def pyclean(args):
             git_clean_note,
         )
 
-    if not args.debris:
-        suggest_debris_option(args)
+    if getattr(args, 'recompile', False):
+        mode = getattr(args, 'invalidation_mode', None)
+        recompile(
+            roots,
+            args.optimize,
+            dry_run=args.dry_run,
+            invalidation_mode=INVALIDATION_MODES.get(mode),
+        )
+
+    if wants_hint(args):
+        suggest_debris_option(Runner.debris_found)
@@ -0,0 +1,153 @@
+# SPDX-FileCopyrightText: 2026 Peter Bittner <django@bittner.it>
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Deletion plans: the decisions of a scan, to be carried out later."""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+import stat
+import threading
+from pathlib import Path
+
+from .bytecode import BYTECODE_DIRS
+from .runner import Runner
+from .streaming import PathClassifier
+
+log = logging.getLogger(__name__)
+
+PLAN_HEADER = b'# pyclean plan 1\n'
+FILE = 'f'
+DIRECTORY = 'd'
+
+
+def escape(path) -> bytes:
+    """Encode a path for a plan line, which must not contain a line break."""
+    return os.fsencode(path).replace(b'\\', b'\\\\').replace(b'\n', b'\\n')
+
+
+def unescape(data: bytes) -> str:
+    """Decode a path from a plan line."""
+    return os.fsdecode(
+        re.sub(rb'\\(.)', lambda match: b'\n' if match[1] == b'n' else match[1], data),
+    )
+
+
+class PlanWriter:
+    """
+    Records the deletions decided during a scan in a plan file, instead of
+    carrying them out, in place of the runner's operations.
+
+    Every line of the plan holds the kind of file system object (``f`` or
+    ``d``), the topic it was deleted for, its size and its path, separated
+    by tabs. The path is absolute, so that the plan can be carried out from
+    any working directory. The lines are written as the scan goes, so that
+    a plan of any size never needs to be kept in memory. The topic is
+    derived from the path, from the bytecode and debris rules.
+    """
+
+    def __init__(self, stream, debris_topics=()):
+        self.stream = stream
+        self.lock = threading.Lock()
+        self.bytecode = PathClassifier()
+        self.debris = [(topic, PathClassifier([topic])) for topic in debris_topics]
+        self.stream.write(PLAN_HEADER)
+
+    @classmethod
+    def create(cls, location: Path, debris_topics=()) -> PlanWriter:
+        """Start a new plan file, replacing an existing one."""
+        log.info('Writing deletion plan to %s', location)
+        return cls(location.open('wb'), debris_topics)
+
+    def unlink(self, fileobj) -> None:
+        """Plan the deletion of a file."""
+        log.debug('Planning to delete file: %s', fileobj)
+        self._record(FILE, Path(fileobj))
+        with Runner.lock:
+            Runner.unlink_count += 1
+        Runner.removed(fileobj)
+
+    def rmdir(self, dirobj) -> None:
+        """Plan the removal of a directory."""
+        log.debug('Planning to delete directory: %s', dirobj)
+        self._record(DIRECTORY, Path(dirobj))
+        with Runner.lock:
+            Runner.rmdir_count += 1
+        Runner.removed(dirobj)
+
+    def close(self) -> None:
+        """Complete the plan file."""
+        self.stream.close()
+
+    def topic_of(self, path: Path) -> str:
+        """Tell what a path is deleted for, judging by its name and parents."""
+        if self.bytecode.bytecode_kind(path) or any(
+            part in BYTECODE_DIRS for part in path.parts
+        ):
+            return 'bytecode'
+        for topic, classifier in self.debris:
+            if classifier.debris_kind(path):
+                return topic
+        return 'other'
+
+    def _record(self, kind: str, path: Path) -> None:
+        size = 0
+        if kind == FILE:
+            try:
+                size = os.lstat(path).st_size
+            except OSError as err:
+                log.debug('Cannot check %s: %s', path, err)
+        line = b'\t'.join(
+            [
+                kind.encode(),
+                self.topic_of(path).encode(),
+                b'%d' % size,
+                escape(path.absolute()),
+            ],
+        )
+        with self.lock:
+            self.stream.write(line + b'\n')
+
+
+def read_plan(stream):
+    """Yield the kind, topic, size and path of the entries of a plan file."""
+    if stream.readline() != PLAN_HEADER:
+        msg = 'Not a pyclean plan file: %s' % stream.name
+        raise ValueError(msg)
+    for line in stream:
+        kind, topic, size, path = line.rstrip(b'\n').split(b'\t', 3)
+        yield kind.decode(), topic.decode(), int(size), Path(unescape(path))
+
+
+def execute_plan(location: Path) -> None:
+    """
+    Carry out the deletions of a plan, without scanning again. Each entry is
+    checked with a single ``lstat`` first, and skipped if it's gone, or if
+    it changed its type or (for files) its size since the plan was made.
+    """
+    log.info('Executing deletion plan %s', location)
+    skipped = 0
+    with location.open('rb') as stream:
+        for kind, _topic, size, path in read_plan(stream):
+            try:
+                status = os.lstat(path)
+            except FileNotFoundError:
+                log.debug('Skipping %s, it is gone.', path)
+                continue
+            except OSError as err:
+                log.debug('Cannot check %s: %s', path, err)
+                skipped += 1
+                continue
+            is_directory = stat.S_ISDIR(status.st_mode)
+            if kind == DIRECTORY and is_directory:
+                Runner.rmdir(path)
+            elif kind == FILE and not is_directory and status.st_size == size:
+                Runner.unlink(path)
+            else:
+                log.debug('Skipping %s, it has changed since the plan was made.', path)
+                skipped += 1
+    if skipped:
+        log.info('Skipped %d entries that changed since the plan was made.', skipped)
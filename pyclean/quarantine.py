@@ -0,0 +1,158 @@
+# SPDX-FileCopyrightText: 2026 Peter Bittner <django@bittner.it>
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Quarantine of disposable directories, to be deleted (or restored) later."""
+
+from __future__ import annotations
+
+import contextlib
+import itertools
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from .runner import Runner
+
+log = logging.getLogger(__name__)
+
+TRASH_DIR = '.pyclean-trash'  # never traversed, see pyclean.traversal
+ORIGIN_SUFFIX = '.origin'
+NANOSECONDS = 1_000_000_000
+
+
+class Quarantine:
+    """
+    Moves disposable directories into the trash area of a directory tree.
+
+    A rename takes the same time for a directory of any size, while its
+    removal needs a system call for every file and directory in it. Each
+    quarantined directory becomes a *tombstone* in the trash area, named by
+    the time it was buried, next to a file that records where it came from.
+    A directory on another file system cannot be renamed into the trash
+    area, so it is left to the caller to remove it right away.
+    """
+
+    def __init__(self, root: Path):
+        self.trash = Path(root) / TRASH_DIR
+        self.counter = itertools.count()
+
+    def bury(self, directory) -> bool:
+        """Move a directory into the trash area; return False if impossible."""
+        name = '%d-%d' % (time.time_ns(), next(self.counter))
+        origin = self.trash / (name + ORIGIN_SUFFIX)
+        try:
+            self.trash.mkdir(exist_ok=True)
+            origin.write_text(str(Path(directory).absolute()), encoding='utf-8')
+            os.rename(directory, self.trash / name)  # noqa: PTH104
+        except OSError as err:
+            log.debug('Cannot quarantine %s: %s', directory, err)
+            origin.unlink(missing_ok=True)
+            return False
+        log.debug('Quarantined directory: %s', directory)
+        with Runner.lock:
+            Runner.rmdir_count += 1
+        Runner.removed(directory)
+        return True
+
+
+def tombstones(root: Path):
+    """Yield the tombstones in the trash area of a tree, and their age."""
+    trash = Path(root) / TRASH_DIR
+    if not trash.is_dir():
+        return
+    now = time.time_ns()
+    for entry in sorted(trash.iterdir()):
+        buried, _, _ = entry.name.partition('-')
+        if entry.suffix != ORIGIN_SUFFIX and buried.isdigit():
+            yield entry, (now - int(buried)) / NANOSECONDS
+
+
+def purge_trash(root: Path, window: float = 0, *, wait=False) -> None:
+    """
+    Delete the tombstones older than the undo window, and the trash area
+    itself when it has become empty. With ``wait``, wait until all of the
+    tombstones there are have become that old first.
+    """
+    if wait:
+        ages = [age for _tombstone, age in tombstones(root)]
+        if ages and min(ages) < window:
+            log.debug('Waiting %.1f seconds to purge %s', window - min(ages), root)
+            time.sleep(window - min(ages))
+    for tombstone, age in tombstones(root):
+        if age < window:
+            continue
+        log.debug('Purging %s', tombstone)
+        shutil.rmtree(tombstone, ignore_errors=True)
+        tombstone.with_name(tombstone.name + ORIGIN_SUFFIX).unlink(missing_ok=True)
+    remove_trash_area(root)
+
+
+def remove_trash_area(root: Path) -> None:
+    """Remove the trash area of a tree, if there's nothing left in it."""
+    with contextlib.suppress(OSError):
+        (Path(root) / TRASH_DIR).rmdir()
+
+
+def restore_trash(root: Path) -> None:
+    """
+    Move the tombstones of a tree back to where they came from, unless a
+    directory of the same name was created there in the meantime. Parent
+    directories removed in the meantime are created again.
+    """
+    restored = 0
+    for tombstone, _age in tombstones(root):
+        origin_file = tombstone.with_name(tombstone.name + ORIGIN_SUFFIX)
+        try:
+            origin = Path(origin_file.read_text(encoding='utf-8'))
+        except OSError as err:
+            log.warning('Cannot restore %s: %s', tombstone, err)
+            continue
+        if origin.exists():
+            log.warning('Cannot restore %s, it exists again.', origin)
+            continue
+        log.debug('Restoring %s', origin)
+        try:
+            origin.parent.mkdir(parents=True, exist_ok=True)
+            tombstone.rename(origin)
+        except OSError as err:
+            log.warning('Cannot restore %s: %s', origin, err)
+            continue
+        origin_file.unlink()
+        restored += 1
+    log.info('Restored %d directories in %s.', restored, root)
+    remove_trash_area(root)
+
+
+def start_purge_worker(roots, window: float) -> None:
+    """
+    Purge the trash areas of directory trees in a detached process, which
+    outlives the current one, so that the cleanup returns immediately. The
+    process waits for the undo window to pass, so that it doesn't find all
+    tombstones too young to be purged.
+    """
+    roots = [str(root) for root in roots if (Path(root) / TRASH_DIR).is_dir()]
+    if not roots:
+        return
+    log.debug('Purging quarantined directories in the background.')
+    subprocess.Popen(  # noqa: S603
+        [
+            sys.executable,
+            '-m',
+            'pyclean',
+            '--purge-trash',
+            '--purge-wait',
+            '--undo-window',
+            str(window),
+            '--quiet',
+            *roots,
+        ],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
@@ -7,13 +7,19 @@
 from __future__ import annotations
 
 import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from typing import TYPE_CHECKING
 
-from .ignore import path_is_ignored
+from .ignore import IgnoreMatcher
 
 if TYPE_CHECKING:
     from argparse import Namespace
-    from pathlib import Path
+    from collections.abc import Callable
+
+    from .quarantine import Quarantine
 
 log = logging.getLogger(__name__)
 
@@ -29,7 +35,13 @@ class CleanupRunner:
         """Cleanup runner with optional dry-run behavior."""
         self.unlink = noop
         self.rmdir = noop
-        self.ignore: list[str] = []
+        self.ignore = []
+        self.lock = threading.Lock()
+        self.pool: DeletionPool | None = None
+        self.quarantine: Quarantine | None = None
+        self.ordered = False
+        self.removals: dict[str, int] | None = None
+        self.debris_found: set[str] = set()  # debris topics seen in passing
         self.unlink_count = 0
         self.unlink_failed = 0
         self.rmdir_count = 0
@@ -37,17 +49,155 @@ class CleanupRunner:
 
     def configure(self, args: Namespace) -> None:
         """Set up runner according to command line options."""
-        self.unlink = print_filename if args.dry_run else remove_file
-        self.rmdir = print_dirname if args.dry_run else remove_directory
+        jobs = getattr(args, 'jobs', 1)
+        self.pool = DeletionPool(jobs) if jobs > 1 and not args.dry_run else None
+        if self.pool:
+            self.unlink = self.pool.unlink
+            self.rmdir = self.pool.rmdir
+        else:
+            self.unlink = print_filename if args.dry_run else remove_file
+            self.rmdir = print_dirname if args.dry_run else remove_directory
         self.ignore = args.ignore
+        self.ordered = args.dry_run  # a listing must be the same every time
+        self.debris_found = set()
         self.unlink_count = 0
         self.unlink_failed = 0
         self.rmdir_count = 0
         self.rmdir_failed = 0
 
+    @property
+    def ignore(self) -> list[str]:
+        """Ignore patterns, compiled for matching whenever they are set."""
+        return self._ignore
+
+    @ignore.setter
+    def ignore(self, patterns: list[str]) -> None:
+        self._ignore = patterns
+        self.ignore_matcher = IgnoreMatcher(patterns)
+
     def is_ignored(self, path: Path) -> bool:
         """Check if a path or any of its ancestors matches an ignore pattern."""
-        return path_is_ignored(path, self.ignore)
+        return self.ignore_matcher.is_ignored(path)
+
+    def settle(self, directory: Path | None = None) -> None:
+        """Wait until pending operations (inside a directory) are done."""
+        if self.pool:
+            self.pool.settle(directory)
+
+    def track_removals(self, *, enable=True) -> None:
+        """Start (or stop) counting the objects removed from each directory."""
+        self.removals = {} if enable else None
+
+    def removed(self, path) -> None:
+        """Record that a file system object is gone (or would be, in a dry run)."""
+        if self.removals is not None:
+            parent = os.path.dirname(path)  # noqa: PTH120
+            with self.lock:
+                self.removals[parent] = self.removals.get(parent, 0) + 1
+
+    def remaining(self, directory) -> int | None:
+        """
+        Return how many entries are left in a scanned directory, i.e. the
+        number of entries found by the scan less those removed since, or
+        None if that is unknown. Operations pending inside the directory
+        must have settled.
+        """
+        if self.removals is None or directory.entries is None:
+            return None
+        with self.lock:
+            removed = self.removals.pop(os.fspath(directory), 0)
+        return directory.entries - removed
+
+    def counters(self) -> tuple[int, int, int, int]:
+        """Return the counters, e.g. to merge them into another runner."""
+        with self.lock:
+            return (
+                self.unlink_count,
+                self.unlink_failed,
+                self.rmdir_count,
+                self.rmdir_failed,
+            )
+
+    def merge(self, counters: tuple[int, int, int, int]) -> None:
+        """Add the counters of another runner (e.g. in a worker process)."""
+        unlink_count, unlink_failed, rmdir_count, rmdir_failed = counters
+        with self.lock:
+            self.unlink_count += unlink_count
+            self.unlink_failed += unlink_failed
+            self.rmdir_count += rmdir_count
+            self.rmdir_failed += rmdir_failed
+
+    def finish(self) -> None:
+        """Wait for all pending operations, so that the counters are final."""
+        if self.pool:
+            self.pool.shutdown()
+            self.pool = None
+
+
+class DeletionPool:
+    """
+    Runs file deletions and directory removals on a bounded thread pool,
+    which helps on file systems where every operation has a high latency.
+
+    The removal of a directory is deferred until all operations on its
+    content have completed. The pool counts the operations pending in each
+    directory; the last one to finish submits the deferred removal of the
+    directory itself, hence no worker thread ever blocks waiting. Operations
+    always use full paths, as they may run after a traversal has closed the
+    directory that an entry was found in.
+    """
+
+    def __init__(self, jobs: int):
+        self.executor = ThreadPoolExecutor(max_workers=jobs)
+        self.condition = threading.Condition()
+        self.pending: dict[Path, int] = {}
+        self.deferred: dict[Path, Callable] = {}
+
+    def unlink(self, fileobj: Path) -> None:
+        """Delete a file on a worker thread."""
+        self._submit(remove_file, Path(fileobj), after_content=False)
+
+    def rmdir(self, dirobj: Path) -> None:
+        """Remove a directory on a worker thread, once its content is gone."""
+        self._submit(remove_directory, Path(dirobj), after_content=True)
+
+    def settle(self, directory: Path | None = None) -> None:
+        """Block until no operations are pending (inside a directory)."""
+        with self.condition:
+            if directory is None:
+                self.condition.wait_for(lambda: not self.pending)
+            else:
+                self.condition.wait_for(lambda: directory not in self.pending)
+
+    def shutdown(self) -> None:
+        """Wait for all pending operations, then stop the worker threads."""
+        self.settle()
+        self.executor.shutdown()
+
+    def _submit(self, operation: Callable, path: Path, *, after_content) -> None:
+        with self.condition:
+            self.pending[path.parent] = self.pending.get(path.parent, 0) + 1
+            defer = after_content and path in self.pending
+            if defer:
+                self.deferred[path] = operation
+        if not defer:
+            self._start(operation, path)
+
+    def _start(self, operation: Callable, path: Path) -> None:
+        future = self.executor.submit(operation, path)
+        future.add_done_callback(lambda _: self._done(path))
+
+    def _done(self, path: Path) -> None:
+        directory = path.parent
+        with self.condition:
+            self.pending[directory] -= 1
+            if self.pending[directory]:
+                return
+            del self.pending[directory]
+            operation = self.deferred.pop(directory, None)
+            self.condition.notify_all()
+        if operation:
+            self._start(operation, directory)
 
 
 Runner = CleanupRunner()
@@ -58,10 +208,14 @@ def remove_file(fileobj: Path) -> None:
     log.debug('Deleting file: %s', fileobj)
     try:
         fileobj.unlink()
-        Runner.unlink_count += 1
     except OSError as err:
         log.debug('File not deleted. %s', err)
-        Runner.unlink_failed += 1
+        with Runner.lock:
+            Runner.unlink_failed += 1
+    else:
+        with Runner.lock:
+            Runner.unlink_count += 1
+        Runner.removed(fileobj)
 
 
 def remove_directory(dirobj: Path) -> None:
@@ -69,19 +223,27 @@ def remove_directory(dirobj: Path) -> None:
     log.debug('Removing directory: %s', dirobj)
     try:
         dirobj.rmdir()
-        Runner.rmdir_count += 1
     except OSError as err:
         log.debug('Directory not removed. %s', err)
-        Runner.rmdir_failed += 1
+        with Runner.lock:
+            Runner.rmdir_failed += 1
+    else:
+        with Runner.lock:
+            Runner.rmdir_count += 1
+        Runner.removed(dirobj)
 
 
 def print_filename(fileobj: Path) -> None:
     """Only display the file name, used with --dry-run."""
     log.debug('Would delete file: %s', fileobj)
-    Runner.unlink_count += 1
+    with Runner.lock:
+        Runner.unlink_count += 1
+    Runner.removed(fileobj)
 
 
 def print_dirname(dirobj: Path) -> None:
     """Only display the directory name, used with --dry-run."""
     log.debug('Would delete directory: %s', dirobj)
-    Runner.rmdir_count += 1
+    with Runner.lock:
+        Runner.rmdir_count += 1
+    Runner.removed(dirobj)
@@ -0,0 +1,98 @@
+# SPDX-FileCopyrightText: 2026 Peter Bittner <django@bittner.it>
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Deterministic split of the cleanup of a directory tree into shards."""
+
+from __future__ import annotations
+
+import os
+import zlib
+
+from .traversal import DISPOSE, CleanupHandler
+
+SHARD_DEPTH = 2  # subtrees at this depth below a root belong to one shard
+FINAL = 'final'
+
+
+class Shard:
+    """
+    One of several disjoint shares of the work on a directory tree.
+
+    Every subtree at :data:`SHARD_DEPTH` levels below the root belongs to
+    exactly one shard, chosen by a checksum of its relative path, which is
+    the same on every machine. The files of the directories above belong to
+    the shard chosen for the directory they are in. The directories at
+    :data:`SHARD_DEPTH` are removed by their shard, but the shared ancestor
+    directories above are never removed by a shard, as other shards may
+    still be working inside; that is left to a final pass (see
+    :data:`FINAL`).
+    """
+
+    def __init__(self, number: int, count: int):
+        self.number = number  # counting from 1
+        self.count = count
+
+    def __str__(self):
+        return '%d/%d' % (self.number, self.count)
+
+    def owns(self, parts: tuple[str, ...]) -> bool:
+        """Does a directory, given by its path relative to the root, belong here?"""
+        relative = os.fsencode('/'.join(parts))
+        return zlib.crc32(relative) % self.count == self.number - 1
+
+
+class ShardHandler(CleanupHandler):
+    """
+    Restricts a cleanup handler to the part of a tree owned by a shard.
+
+    The state of the wrapped handler is kept along with the path of the
+    directory relative to the root, as long as it's above the depth where
+    subtrees are distributed, and whether the files in it are owned.
+    """
+
+    OWNED = 'owned'  # inside a subtree that belongs to the shard
+
+    def __init__(self, handler: CleanupHandler, shard: Shard):
+        self.handler = handler
+        self.shard = shard
+        self.respects_ignore = handler.respects_ignore
+
+    def start(self, directory):
+        state = self.handler.start(directory)
+        if state is None:
+            return None
+        return state, (), self.shard.owns(())
+
+    def enter(self, directory, state, *, ignored):
+        inner, parts, _owns_files = state
+        if parts is self.OWNED:
+            child_parts, owned = self.OWNED, True
+        else:
+            child_parts = (*parts, directory.name)
+            owned = self.shard.owns(child_parts)
+            if len(child_parts) == SHARD_DEPTH:
+                if not owned:
+                    return None
+                child_parts = self.OWNED
+        child = self.handler.enter(directory, inner, ignored=ignored)
+        if child is DISPOSE:
+            return DISPOSE if owned else None
+        if child is None:
+            return None
+        return child, child_parts, owned
+
+    def clean_file(self, fileobj, state):
+        inner, _parts, owns_files = state
+        return owns_files and self.handler.clean_file(fileobj, inner)
+
+    def clean_directory(self, dirobj, state, child_state):
+        inner, parts, _owns_files = state
+        if parts is not self.OWNED and len(parts) + 1 < SHARD_DEPTH:
+            return False  # a shared ancestor, for the final pass
+        if child_state is None:
+            return False  # not entered, i.e. owned by another shard
+        return self.handler.clean_directory(dirobj, inner, child_state[0])
+
+    def finish(self):
+        self.handler.finish()
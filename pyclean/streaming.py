@@ -0,0 +1,168 @@
+# SPDX-FileCopyrightText: 2026 Peter Bittner <django@bittner.it>
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Cleanup of candidate paths read from a stream, without walking any tree."""
+
+from __future__ import annotations
+
+import logging
+import os
+import stat
+from pathlib import Path
+
+from .bytecode import BYTECODE_DIRS, BYTECODE_FILES, BytecodeSelection
+from .debris import DEBRIS_TOPICS, DebrisMatcher
+from .runner import Runner
+from .traversal import Entry, remove_subtree
+
+log = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+FILE = 'file'
+DIRECTORY = 'directory'
+ANY_TYPE = 'any type'
+SUBTREE = 'subtree'
+CONTENT = 'content'
+
+
+def read_paths(stream, separator=b'\n', chunk_size=CHUNK_SIZE):
+    """
+    Yield the paths of a binary stream, one at a time, reading the stream in
+    chunks of a fixed size. Only the last, incomplete path of a chunk is kept
+    in memory until the next chunk is read.
+    """
+    rest = b''
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        *items, rest = (rest + chunk).split(separator)
+        for item in items:
+            if item:
+                yield os.fsdecode(item)
+    if rest:
+        yield os.fsdecode(rest)
+
+
+class PathClassifier:
+    """
+    Applies the bytecode and debris rules to single paths, by their names
+    and the names of their parents only.
+
+    Unlike in a tree walk, the content of a debris directory may be listed
+    without the directory itself, hence the parents of a path are matched
+    against the rules for directory content, too. With a base directory,
+    only the parents below it are, like in a walk of the base directory,
+    and paths outside of it are never debris.
+    """
+
+    def __init__(self, topics=(), selection=None, base: Path | None = None):
+        patterns = [pattern for topic in topics for pattern in DEBRIS_TOPICS[topic]]
+        self.debris = DebrisMatcher(patterns)
+        self.selection = selection
+        self.base = base
+
+    def classify(self, path: Path) -> str | None:
+        """
+        Return the type of file system object the path must have to be
+        deleted, or None if it's to be kept.
+
+        A directory is only deleted with everything inside for
+        :data:`SUBTREE` (a directory) and :data:`CONTENT` (a file or a
+        directory), i.e. for bytecode directories and debris rules for
+        directory content. Otherwise, only an empty directory is deleted.
+        """
+        return self.bytecode_kind(path) or self.debris_kind(path)
+
+    def bytecode_kind(self, path: Path) -> str | None:
+        """Classify a path by the bytecode rules only."""
+        if path.suffix in BYTECODE_FILES:
+            if self.selection is None or not self.selection.keeps(path.name):
+                return FILE
+        elif path.name in BYTECODE_DIRS and self.selection is None:
+            return SUBTREE
+        return None
+
+    def debris_kind(self, path: Path) -> str | None:
+        """Classify a path by the debris rules only."""
+        if not self.debris:
+            return None
+        path = self._below_base(path)
+        if path is None or not path.parts:
+            return None
+        parts = path.parts
+        for end in range(len(parts) - 1, 0, -1):
+            rules = self.debris.lookup(parts[end - 1], self._parents(parts, end - 1))
+            if any(rule.contents for rule in rules):
+                return CONTENT
+        rules = self.debris.lookup(path.name, self._parents(parts, len(parts) - 1))
+        return kind_of(rules)
+
+    def _below_base(self, path: Path) -> Path | None:
+        """Return the part of a path below the base, None if it's outside."""
+        if self.base is None:
+            return path
+        if path.is_absolute():
+            try:
+                return path.relative_to(self.base)
+            except ValueError:
+                return None
+        path = Path(os.path.normpath(path))
+        return None if path.parts[:1] == (os.pardir,) else path
+
+    def _parents(self, parts, index):
+        if not self.debris.context:
+            return ()
+        return parts[max(index - self.debris.context, 0) : index]
+
+
+def kind_of(rules) -> str | None:
+    """Combine the debris rules that match the name of a path."""
+    any_type = any(rule.any_type for rule in rules)
+    directory = any(rule.directory for rule in rules)
+    if any(rule.contents for rule in rules):
+        return CONTENT if any_type else SUBTREE if directory else None
+    return ANY_TYPE if any_type else DIRECTORY if directory else None
+
+
+def clean_paths(paths, classifier: PathClassifier):
+    """
+    Delete the paths that match a cleanup rule, through the runner. Only
+    paths that match are checked against the ignore patterns and looked at
+    on the file system, with a single ``lstat``. Paths that are gone, e.g.
+    because they were inside a directory removed before, are skipped.
+    """
+    for name in paths:
+        path = Path(name)
+        expected = classifier.classify(path)
+        if expected is None or Runner.is_ignored(path):
+            continue
+        try:
+            mode = os.lstat(path).st_mode
+        except FileNotFoundError:
+            continue
+        except OSError as err:
+            log.debug('Cannot check %s: %s', path, err)
+            continue
+        if stat.S_ISDIR(mode):
+            if expected in {SUBTREE, CONTENT}:
+                remove_subtree(Entry(path.parent, path.name))
+            elif expected != FILE:
+                Runner.rmdir(path)
+        elif expected not in {DIRECTORY, SUBTREE}:
+            Runner.unlink(path)
+
+
+def clean_stream(stream, args):
+    """Clean up the paths read from a stream, e.g. standard input."""
+    separator = b'\0' if getattr(args, 'null', False) else b'\n'
+    selection = None
+    if getattr(args, 'keep_tags', None) or getattr(args, 'keep_levels', None):
+        selection = BytecodeSelection(args.keep_tags, args.keep_levels)
+    log.info('Cleaning paths from standard input')
+    clean_paths(
+        read_paths(stream, separator),
+        PathClassifier(args.debris, selection, base=Path.cwd()),
+    )
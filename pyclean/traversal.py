@@ -2,35 +2,627 @@
 #
 # SPDX-License-Identifier: GPL-3.0-or-later
 
-"""Directory traversal and ignore pattern matching."""
+"""Directory traversal and dispatching of cleanup handlers."""
 
 from __future__ import annotations
 
 import logging
 import os
+import queue
+import threading
 from pathlib import Path
 
+from .quarantine import TRASH_DIR
 from .runner import Runner
 
 log = logging.getLogger(__name__)
 
 
+DISPOSE = 'dispose'
+
+
+class CleanupHandler:
+    """
+    Base class for a cleanup phase that is driven by :func:`clean_tree`.
+
+    A handler keeps a per-directory *state*, which is ``None`` when the
+    handler has no interest in a directory (and everything below it).
+    The traversal stops descending when no handler is interested anymore.
+    A handler that returns :data:`DISPOSE` for a subdirectory declares it
+    disposable: it is removed with all its content by :func:`remove_subtree`,
+    and neither its content nor the directory is offered to any handler.
+    A handler that applies ignore patterns of its own, instead of the ones
+    of the runner, says so with :attr:`respects_ignore`.
+    """
+
+    respects_ignore = True
+
+    def start(self, _directory: Path):
+        """Return the state for the root directory of the traversal."""
+        return True
+
+    def enter(self, _directory: Path, state, *, ignored: bool):
+        """Return the state for a subdirectory, given its parent's state."""
+        return None if ignored else state
+
+    def clean_file(self, _fileobj: Path, _state) -> bool:
+        """Handle a file in a directory; return True if it was taken care of."""
+        return False
+
+    def clean_directory(self, _dirobj: Path, _state, _child_state) -> bool:
+        """Handle a subdirectory after its content has been processed."""
+        return False
+
+    def finish(self) -> None:
+        """Complete any pending work, once the traversal is over."""
+
+
+class BytecodeHandler(CleanupHandler):
+    """Deletes bytecode files and removes bytecode cache directories."""
+
+    def __init__(self, file_types, dir_names):
+        self.file_types = file_types
+        self.dir_names = dir_names
+
+    def enter(self, directory, state, *, ignored):
+        if ignored:
+            return None
+        return DISPOSE if directory.name in self.dir_names else state
+
+    def clean_file(self, fileobj, _state):
+        if fileobj.suffix in self.file_types:
+            Runner.unlink(fileobj)
+            return True
+        return False
+
+    def clean_directory(self, dirobj, _state, _child_state):
+        if dirobj.name in self.dir_names:
+            Runner.rmdir(dirobj)
+            return True
+        return False
+
+
+DIRECTORY_FLAGS = (
+    os.O_RDONLY | getattr(os, 'O_DIRECTORY', 0) | getattr(os, 'O_CLOEXEC', 0)
+)
+NOFOLLOW_FLAG = getattr(os, 'O_NOFOLLOW', 0)
+DIR_FD_SUPPORT = (
+    os.scandir in os.supports_fd
+    and {os.open, os.unlink, os.rmdir} <= os.supports_dir_fd
+)
+MAX_OPEN_DIRECTORIES = 64
+
+
+class Entry(os.PathLike):
+    """
+    A file system object found during the traversal, addressed by its name
+    relative to the file descriptor of its (open) parent directory.
+
+    Deleting an entry with a directory file descriptor spares the kernel the
+    lookup of every path component again, and it cannot be redirected by a
+    directory that is replaced by a symlink in the meantime. Without an open
+    parent directory, e.g. on platforms without ``dir_fd`` support, the
+    full path is used instead. The full path is only built when needed.
+
+    Once a directory has been scanned, its entry knows how many entries the
+    scan found in it, so that it can tell whether the directory has become
+    empty without reading it again (see :meth:`CleanupRunner.remaining`).
+    """
+
+    __slots__ = (
+        '_path',
+        '_symlink',
+        'dir_fd',
+        'entries',
+        'follow_symlinks',
+        'name',
+        'parent',
+    )
+
+    def __init__(self, parent: Path, name: str, dir_fd=None, *, symlink=False):
+        self.parent = parent
+        self.name = name
+        self.dir_fd = dir_fd
+        self.follow_symlinks = False
+        self.entries: int | None = None  # unknown, unless scanned
+        self._symlink = symlink
+        self._path: Path | None = None
+
+    @classmethod
+    def of(cls, path: Path) -> Entry:
+        """Wrap the root directory of a traversal, which may be a symlink."""
+        entry = cls(path.parent, path.name)
+        entry.follow_symlinks = True
+        entry._path = path
+        return entry
+
+    @property
+    def path(self) -> Path:
+        """The full path of the entry."""
+        if self._path is None:
+            self._path = self.parent / self.name
+        return self._path
+
+    @property
+    def suffix(self) -> str:
+        """The file extension, like ``Path.suffix``."""
+        return os.path.splitext(self.name)[1]  # noqa: PTH122
+
+    def is_symlink(self) -> bool:
+        """Is the entry a symbolic link? (As seen when it was scanned.)"""
+        return self._symlink
+
+    def open(self) -> int | None:
+        """Open a directory entry; return its file descriptor, if supported."""
+        if not DIR_FD_SUPPORT:
+            return None
+        flags = (
+            DIRECTORY_FLAGS if self.follow_symlinks else DIRECTORY_FLAGS | NOFOLLOW_FLAG
+        )
+        if self.dir_fd is None:
+            return os.open(self.path, flags)
+        return os.open(self.name, flags, dir_fd=self.dir_fd)
+
+    def unlink(self) -> None:
+        """Delete the entry, relative to its parent directory if it is open."""
+        if self.dir_fd is None:
+            os.unlink(self.path)  # noqa: PTH108
+        else:
+            os.unlink(self.name, dir_fd=self.dir_fd)
+
+    def rmdir(self) -> None:
+        """Remove the (empty) directory, relative to its parent if open."""
+        if self.dir_fd is None:
+            os.rmdir(self.path)  # noqa: PTH106
+        else:
+            os.rmdir(self.name, dir_fd=self.dir_fd)
+
+    def __fspath__(self) -> str:
+        return str(self.path)
+
+    def __str__(self) -> str:
+        return str(self.path)
+
+    def __repr__(self) -> str:
+        return '%s(%r)' % (type(self).__name__, str(self.path))
+
+
+def clean_tree(directory, handlers: list[CleanupHandler], jobs=1, index=None):
+    """
+    Walk a directory tree once, and let all cleanup handlers act on every
+    file and subdirectory along the way.
+
+    Files are offered to the handlers in order, until one takes care of the
+    file. Subdirectories are offered after their content has been processed
+    (post-order), so they can be removed when they have become empty.
+    Handlers receive an :class:`Entry` for every file and subdirectory.
+    Symbolic links to directories are offered like files, and not followed.
+
+    With more than one job, directories are scanned by a pool of threads
+    (see :class:`ParallelWalk`), otherwise one directory after the other.
+    With a :class:`~pyclean.index.ScanIndex`, the files of directories that
+    had nothing to clean up and haven't changed since are not scanned again.
+    """
+    directory = Path(directory)
+    states = [handler.start(directory) for handler in handlers]
+    try:
+        if not any(state is not None for state in states):
+            return
+        ignored = Runner.is_ignored(directory)
+        if jobs > 1:
+            walk = ParallelWalk(handlers, jobs, index)
+            walk.run(Entry.of(directory), states, ignored)
+        else:
+            _clean_directory(Entry.of(directory), handlers, states, ignored, index)
+    finally:
+        for handler in handlers:
+            handler.finish()
+
+
+def _clean_directory(directory, handlers, states, parent_ignored, index=None):
+    """
+    Process a directory tree depth-first. Pending subdirectories are kept on
+    an explicit stack instead of the call stack, so the depth of a tree is
+    only limited by the file system. Every level of the stack only holds the
+    entries of its subdirectories, not the directory entries of its files.
+
+    The directories on the stack are kept open, so that their content is
+    deleted relative to them, up to :data:`MAX_OPEN_DIRECTORIES` levels.
+    """
+    scan = _scan(directory, handlers, states, keep_open=True, index=index, root=True)
+    stack = [(directory, states, parent_ignored, iter(scan.subdirs), scan)]
+    try:
+        while stack:
+            dirobj, dir_states, dir_ignored, pending, scan = stack[-1]
+            for subdir in pending:
+                child_states, ignored = _enter(
+                    subdir,
+                    handlers,
+                    dir_states,
+                    dir_ignored,
+                )
+                if DISPOSE in child_states:
+                    dispose(subdir)
+                    scan.acted = True
+                    continue
+                if any(state is not None for state in child_states):
+                    child_scan = _scan(
+                        subdir,
+                        handlers,
+                        child_states,
+                        keep_open=len(stack) < MAX_OPEN_DIRECTORIES,
+                        index=index,
+                    )
+                    pending = iter(child_scan.subdirs)
+                    stack.append((subdir, child_states, ignored, pending, child_scan))
+                    break
+                scan.acted |= _leave(subdir, handlers, dir_states, child_states)
+            else:
+                stack.pop()
+                scan.close()
+                scan.remember(index, dirobj)
+                if stack:
+                    parent_states, parent_scan = stack[-1][1], stack[-1][4]
+                    parent_scan.acted |= _leave(
+                        dirobj,
+                        handlers,
+                        parent_states,
+                        dir_states,
+                    )
+    finally:
+        for *_, scan in stack:
+            scan.close()
+
+
+class _Scan:
+    """The subdirectories of a scanned directory, and what it took to scan it."""
+
+    __slots__ = ('acted', 'entries', 'fd', 'stat', 'subdirs')
+
+    def __init__(self, fd=None, stat=None, subdirs=(), *, acted=False):
+        self.fd = fd  # kept open for the subdirectories
+        self.stat = stat  # only needed with an index
+        self.subdirs = subdirs
+        self.acted = acted  # did any handler act on the content?
+        self.entries = None  # files and subdirectories, when all were read
+
+    def close(self):
+        """Close the directory, if it was kept open."""
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def remember(self, index, directory):
+        """Record a directory in the index, if nothing was done inside."""
+        if index is not None and self.stat is not None and not self.acted:
+            names = [subdir.name for subdir in self.subdirs]
+            index.record(directory.path, self.stat, names)
+
+
+def _scan(  # noqa: PLR0913
+    directory: Entry,
+    handlers,
+    states,
+    *,
+    keep_open=False,
+    index=None,
+    root=False,
+):
+    """
+    Scan a directory, offering its files to the handlers right away.
+    Return the subdirectories, which the caller processes, and the file
+    descriptor of the directory when it's kept open for them.
+
+    A subdirectory that cannot be read is skipped with a warning, while the
+    error is raised for the root of the tree.
+    """
+    try:
+        fd = directory.open()
+    except OSError as err:
+        if root:
+            raise
+        log.warning('Cannot access directory %s: %s', directory.path, err)
+        return _Scan()
+
+    try:
+        scan = _scan_directory(directory, fd, handlers, states, keep_open, index, root)
+    except BaseException:
+        if fd is not None:
+            os.close(fd)
+        raise
+
+    if fd is not None and not keep_open:
+        os.close(fd)
+    directory.entries = scan.entries
+    return scan
+
+
+def _scan_directory(directory: Entry, fd, handlers, states, keep_open, index, root):  # noqa: PLR0913
+    """
+    Offer the files of a directory to the handlers as ``scandir`` yields
+    them, without holding all entries of a huge directory in memory first.
+    Only when the runner needs a stable order, e.g. for the output of a dry
+    run, the entries are read completely and sorted by name.
+    """
+    subdir_fd = fd if keep_open else None
+    target = directory.path if fd is None else fd
+    try:
+        stat = None if index is None else os.stat(target)  # noqa: PTH116
+        names = None if stat is None else index.lookup(directory.path, stat)
+        if names is not None:
+            subdirs = [Entry(directory.path, name, subdir_fd) for name in names]
+            return _Scan(subdir_fd, stat, subdirs)
+        children = os.scandir(target)
+    except OSError as err:
+        if root:
+            raise
+        log.warning('Cannot access directory %s: %s', directory.path, err)
+        return _Scan(subdir_fd)
+
+    scan = _Scan(subdir_fd, stat, [])
+    scan.entries = 0
+    with children as iterator:
+        for child in _stream(directory, iterator, scan):
+            scan.entries += 1
+            if not child.is_symlink() and child.is_dir():
+                scan.subdirs.append(Entry(directory.path, child.name, subdir_fd))
+                continue
+            fileobj = Entry(directory.path, child.name, fd, symlink=child.is_symlink())
+            if _clean_file(fileobj, handlers, states):
+                scan.acted = True
+            elif child.is_symlink():
+                log.debug('Skipping symlink %s', child.name)
+            elif not child.is_file():
+                log.debug('Ignoring %s (neither a file nor a folder)', child.name)
+    return scan
+
+
+def _stream(directory: Entry, children, scan: _Scan):
+    """
+    Yield the entries of a directory as they are read, or sorted by name
+    when the runner needs a stable order. A directory that cannot be read
+    completely is not recorded in the index, and the number of its entries
+    is unknown.
+    """
+    try:
+        if Runner.ordered:
+            children = sorted(children, key=lambda entry: entry.name)
+        yield from children
+    except OSError as err:
+        log.warning('Cannot access directory %s: %s', directory.path, err)
+        scan.stat = scan.entries = None
+
+
+def _enter(dirobj, handlers, states, parent_ignored):
+    """Return the handler states of a subdirectory, and whether it's ignored."""
+    ignored = (
+        parent_ignored
+        or dirobj.name == TRASH_DIR
+        or Runner.ignore_matcher.matches(dirobj.path)
+    )
+    if (
+        ignored
+        and not parent_ignored
+        and any(
+            state is not None and handler.respects_ignore
+            for handler, state in zip(handlers, states)
+        )
+    ):
+        log.debug('Skipping %s', dirobj.name)
+
+    child_states = [
+        None if state is None else handler.enter(dirobj, state, ignored=ignored)
+        for handler, state in zip(handlers, states)
+    ]
+    return child_states, ignored
+
+
+def _clean_file(fileobj, handlers, states):
+    """Offer a file to the handlers, until one of them takes care of it."""
+    return any(
+        state is not None and handler.clean_file(fileobj, state)
+        for handler, state in zip(handlers, states)
+    )
+
+
+def _leave(dirobj, handlers, states, child_states):
+    """Offer a processed subdirectory to the handlers (post-order)."""
+    return any(
+        state is not None and handler.clean_directory(dirobj, state, child_state)
+        for handler, state, child_state in zip(handlers, states, child_states)
+    )
+
+
+def dispose(directory: Entry):
+    """
+    Get rid of a disposable directory: move it into quarantine with a single
+    rename, if the runner has one, or remove it with all of its content.
+    """
+    if Runner.quarantine is None or not Runner.quarantine.bury(directory):
+        remove_subtree(directory)
+
+
+def remove_subtree(directory: Entry):
+    """
+    Remove a disposable directory together with all of its content.
+
+    The content is not matched against any cleanup patterns, only ignore
+    patterns are respected. Files are deleted while the entries are streamed
+    from the file system, directories bottom-up, and every single object is
+    counted by the runner (or only reported in a dry run). The entries are
+    only sorted when the runner needs a stable order, like in a walk.
+    """
+    fd, subdirs = _dispose_content(directory, keep_open=True)
+    stack = [(directory, fd, iter(subdirs))]
+    try:
+        while stack:
+            dirobj, fd, pending = stack[-1]
+            subdir = next(pending, None)
+            if subdir is not None:
+                keep_open = len(stack) < MAX_OPEN_DIRECTORIES
+                fd, subdirs = _dispose_content(subdir, keep_open=keep_open)
+                stack.append((subdir, fd, iter(subdirs)))
+                continue
+            stack.pop()
+            if fd is not None:
+                os.close(fd)
+            Runner.rmdir(dirobj)
+    finally:
+        for _, fd, _ in stack:
+            if fd is not None:
+                os.close(fd)
+
+
+def _dispose_content(directory: Entry, *, keep_open):
+    """Delete the files of a disposable directory, return its subdirectories."""
+    try:
+        fd = directory.open()
+    except OSError as err:
+        log.warning('Cannot access directory %s: %s', directory.path, err)
+        return None, []
+
+    subdir_fd = fd if keep_open else None
+    subdirs = []
+    try:
+        with os.scandir(directory.path if fd is None else fd) as iterator:
+            children = iterator
+            if Runner.ordered:
+                children = sorted(iterator, key=lambda entry: entry.name)
+            for child in children:
+                entry = Entry(
+                    directory.path,
+                    child.name,
+                    fd,
+                    symlink=child.is_symlink(),
+                )
+                if Runner.ignore_matcher and Runner.ignore_matcher.matches(entry.path):
+                    log.debug('Skipping %s', child.name)
+                elif not entry.is_symlink() and child.is_dir():
+                    entry.dir_fd = subdir_fd
+                    subdirs.append(entry)
+                else:
+                    Runner.unlink(entry)
+    except OSError as err:
+        log.warning('Cannot access directory %s: %s', directory.path, err)
+    except BaseException:
+        if fd is not None:
+            os.close(fd)
+        raise
+
+    if fd is not None and not keep_open:
+        os.close(fd)
+    return subdir_fd, subdirs
+
+
+class _PendingDirectory:
+    """A directory of a parallel walk, waiting for its content to be done."""
+
+    __slots__ = ('dirobj', 'ignored', 'parent', 'pending', 'scan', 'states')
+
+    def __init__(self, dirobj, states, ignored, parent):
+        self.dirobj = dirobj
+        self.states = states
+        self.ignored = ignored
+        self.parent = parent
+        self.pending = 1  # the scan of the directory itself
+        self.scan = _Scan()
+
+
+class ParallelWalk:
+    """
+    Walks a directory tree with a pool of threads, which is faster when the
+    time goes into waiting for the file system rather than the CPU.
+
+    Worker threads take pending directories from a shared stack, scan them
+    and push the subdirectories they find back onto it, so any idle worker
+    picks up work discovered by the others. Every directory counts its scan
+    and its subdirectories still being processed; whichever worker finishes
+    the last of them offers the directory to the handlers (post-order), like
+    the sequential traversal does.
+    """
+
+    def __init__(self, handlers, jobs, index=None):
+        self.handlers = handlers
+        self.jobs = jobs
+        self.index = index
+        self.lock = threading.Lock()
+        self.todo: queue.LifoQueue[_PendingDirectory | None] = queue.LifoQueue()
+        self.done = threading.Event()
+        self.error: BaseException | None = None
+
+    def run(self, directory, states, ignored):
+        """Walk the tree and return when all of it has been processed."""
+        self.todo.put(_PendingDirectory(directory, states, ignored, parent=None))
+        workers = [
+            threading.Thread(target=self._work, daemon=True) for _ in range(self.jobs)
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            self.done.wait()
+        finally:
+            for _ in workers:
+                self.todo.put(None)
+        for worker in workers:
+            worker.join()
+        if self.error:
+            raise self.error
+
+    def _work(self):
+        while (node := self.todo.get()) is not None:
+            if self.done.is_set():
+                continue
+            try:
+                self._process(node)
+            except BaseException as err:  # noqa: BLE001
+                self.error = err
+                self.done.set()
+
+    def _process(self, node):
+        node.scan = _scan(
+            node.dirobj,
+            self.handlers,
+            node.states,
+            index=self.index,
+            root=node.parent is None,
+        )
+        for dirobj in node.scan.subdirs:
+            child_states, ignored = _enter(
+                dirobj,
+                self.handlers,
+                node.states,
+                node.ignored,
+            )
+            if DISPOSE in child_states:
+                dispose(dirobj)
+                node.scan.acted = True
+            elif any(state is not None for state in child_states):
+                with self.lock:
+                    node.pending += 1
+                self.todo.put(_PendingDirectory(dirobj, child_states, ignored, node))
+            elif _leave(dirobj, self.handlers, node.states, child_states):
+                node.scan.acted = True
+        self._finish(node)
+
+    def _finish(self, node):
+        while node is not None:
+            with self.lock:
+                node.pending -= 1
+                if node.pending:
+                    return
+            node.scan.remember(self.index, node.dirobj)
+            parent = node.parent
+            if parent is None:
+                self.done.set()
+                return
+            if _leave(node.dirobj, self.handlers, parent.states, node.states):
+                parent.scan.acted = True
+            node = parent
+
+
 def descend_and_clean(directory, file_types, dir_names):
     """
     Walk and descend a directory tree, cleaning up files of a certain type
     along the way. Only delete directories if they are empty, in the end.
     """
-    for child in sorted(os.scandir(directory), key=lambda e: e.name):
-        if child.is_file():
-            if Path(child.path).suffix in file_types:
-                Runner.unlink(Path(child.path))
-        elif child.is_dir():
-            if Runner.is_ignored(Path(child.path)):
-                log.debug('Skipping %s', child.name)
-            else:
-                descend_and_clean(child.path, file_types, dir_names)
-
-            if child.name in dir_names:
-                Runner.rmdir(Path(child.path))
-        else:
-            log.debug('Ignoring %s (neither a file nor a folder)', child.name)
+    clean_tree(directory, [BytecodeHandler(file_types, dir_names)])
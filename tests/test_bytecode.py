@@ -0,0 +1,215 @@
+# SPDX-FileCopyrightText: 2026 Peter Bittner <django@bittner.it>
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Tests for the bytecode module."""
+
+import os
+import py_compile
+import sys
+from importlib.util import cache_from_source
+from pathlib import Path
+
+import pytest
+from cli_test_helpers import ArgvContext
+
+import pyclean.cli
+from pyclean.bytecode import BytecodeSelection, is_stale, parse_bytecode_name
+
+CHECKED_HASH = py_compile.PycInvalidationMode.CHECKED_HASH
+TIMESTAMP = py_compile.PycInvalidationMode.TIMESTAMP
+
+
+def compile_module(source, invalidation_mode=TIMESTAMP):
+    """Write a module and compile it, return the path of its bytecode."""
+    source.write_text('answer = 42\n')
+    pyc = py_compile.compile(
+        str(source),
+        cfile=cache_from_source(str(source)),
+        invalidation_mode=invalidation_mode,
+        doraise=True,
+    )
+    return Path(pyc)
+
+
+@pytest.mark.parametrize('invalidation_mode', [TIMESTAMP, CHECKED_HASH])
+def test_valid_bytecode(tmp_path, invalidation_mode):
+    """
+    Is bytecode that matches its source file recognized as valid?
+    """
+    pyc = compile_module(tmp_path / 'mod.py', invalidation_mode)
+
+    assert not is_stale(pyc)
+
+
+def test_outdated_bytecode(tmp_path):
+    """
+    Is bytecode stale when its source file was modified?
+    """
+    source = tmp_path / 'mod.py'
+    pyc = compile_module(source)
+    source.write_text('answer = 43  # changed\n')
+
+    assert is_stale(pyc)
+
+
+def test_outdated_hash_based_bytecode(tmp_path):
+    """
+    Is hash-based bytecode stale when its source file has a new content,
+    even with the same size and timestamp?
+    """
+    source = tmp_path / 'mod.py'
+    pyc = compile_module(source, CHECKED_HASH)
+    stat = source.stat()
+    source.write_text('answer = 43\n')
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    assert is_stale(pyc)
+
+
+@pytest.mark.parametrize(
+    ('name', 'tag', 'level'),
+    [
+        ('mod.cpython-311.pyc', 'cpython-311', 0),
+        ('mod.cpython-313.opt-2.pyc', 'cpython-313', 2),
+        ('mod.pypy39.opt-1.pyc', 'pypy39', 1),
+        ('mod.pyc', None, 0),
+        ('mod.pyo', None, 0),
+    ],
+)
+def test_parse_bytecode_name(name, tag, level):
+    """
+    Are the interpreter tag and optimization level taken from the file name?
+    """
+    assert parse_bytecode_name(name) == (tag, level)
+
+
+def test_bytecode_selection():
+    """
+    Is bytecode only kept when it matches all the criteria specified?
+    """
+    by_tag = BytecodeSelection(tags=['cpython-313'])
+    by_tag_and_level = BytecodeSelection(tags=['cpython-313'], levels=[0])
+
+    assert BytecodeSelection().keeps('mod.pypy39.pyc')
+    assert by_tag.keeps('mod.cpython-313.opt-1.pyc')
+    assert not by_tag.keeps('mod.cpython-311.pyc')
+    assert not by_tag.keeps('mod.pyc')
+    assert by_tag_and_level.keeps('mod.cpython-313.pyc')
+    assert not by_tag_and_level.keeps('mod.cpython-313.opt-1.pyc')
+
+
+def test_keep_tag_option(tmp_path):
+    """
+    Does ``--keep-tag current`` keep only the bytecode of the running
+    interpreter, and ``--keep-optimization`` only the levels specified?
+    """
+    cache = tmp_path / '__pycache__'
+    cache.mkdir()
+    current = sys.implementation.cache_tag
+    names = [
+        'mod.%s.pyc' % current,
+        'mod.%s.opt-1.pyc' % current,
+        'mod.cpython-27.pyc',
+        'mod.pypy39.pyc',
+    ]
+    for name in names:
+        (cache / name).write_bytes(b'')
+    (tmp_path / 'old' / '__pycache__').mkdir(parents=True)
+    (tmp_path / 'old' / '__pycache__' / 'mod.cpython-27.pyc').write_bytes(b'')
+
+    with ArgvContext(
+        'pyclean',
+        str(tmp_path),
+        '--keep-tag',
+        'current',
+        '--keep-optimization',
+        '0',
+    ):
+        pyclean.cli.main()
+
+    assert sorted(path.name for path in cache.iterdir()) == [names[0]]
+    assert not (tmp_path / 'old' / '__pycache__').exists()
+
+
+@pytest.mark.parametrize(
+    'name',
+    ['__pycache__/gone.cpython-311.pyc', 'gone.pyc', 'legacy.pyo', 'empty.pyc'],
+)
+def test_orphaned_or_broken_bytecode(tmp_path, name):
+    """
+    Is bytecode stale without a source file, or when it's not readable?
+    """
+    pyc = tmp_path / name
+    pyc.parent.mkdir(exist_ok=True)
+    pyc.write_bytes(b'')
+    (tmp_path / 'legacy.py').write_text('')
+    (tmp_path / 'empty.py').write_text('')
+
+    assert is_stale(pyc)
+
+
+def test_stale_only_option(tmp_path):
+    """
+    Does ``--stale-only`` keep valid bytecode and its cache directory, but
+    delete outdated and orphaned bytecode and empty cache directories?
+    """
+    valid = compile_module(tmp_path / 'valid.py')
+    outdated = compile_module(tmp_path / 'outdated.py')
+    (tmp_path / 'outdated.py').write_text('changed = True\n')
+    (tmp_path / 'pkg').mkdir()
+    orphaned = compile_module(tmp_path / 'pkg' / 'orphaned.py')
+    (tmp_path / 'pkg' / 'orphaned.py').unlink()
+
+    with ArgvContext('pyclean', str(tmp_path), '--stale-only'):
+        pyclean.cli.main()
+
+    assert valid.exists()
+    assert not outdated.exists()
+    assert not orphaned.exists()
+    assert not orphaned.parent.exists()
+
+
+def test_pycache_prefix(tmp_path, monkeypatch):
+    """
+    With a bytecode cache prefix, is the bytecode of a directory deleted in
+    the mirrored cache tree, without touching the bytecode of other trees?
+    """
+    prefix = tmp_path / 'prefix'
+    monkeypatch.setattr(sys, 'pycache_prefix', str(prefix))
+    project = tmp_path / 'project'
+    (project / 'pkg').mkdir(parents=True)
+    other = tmp_path / 'other'
+    other.mkdir()
+    compiled = [
+        compile_module(project / 'main.py'),
+        compile_module(project / 'pkg' / 'mod.py'),
+        compile_module(other / 'mod.py'),
+    ]
+
+    with ArgvContext('pyclean', str(project)):
+        pyclean.cli.main()
+
+    mirror = prefix / project.absolute().relative_to(project.anchor)
+    assert compiled[0].parent == mirror
+    assert not compiled[0].exists()
+    assert not (mirror / 'pkg').exists()
+    assert compiled[2].exists()
+
+
+@pytest.mark.parametrize(('args', 'removed'), [([], False), (['--folders'], True)])
+def test_pycache_prefix_with_source_walk(tmp_path, monkeypatch, args, removed):
+    """
+    With a bytecode cache prefix, is bytecode written into the source tree
+    before removed when the source tree is walked anyway?
+    """
+    monkeypatch.setattr(sys, 'pycache_prefix', str(tmp_path / 'prefix'))
+    project = tmp_path / 'project'
+    old = project / 'pkg' / '__pycache__' / 'old.pyc'
+    old.parent.mkdir(parents=True)
+    old.write_bytes(b'')
+
+    with ArgvContext('pyclean', str(project), *args):
+        pyclean.cli.main()
+
+    assert old.exists() is not removed
@@ -61,6 +61,18 @@ def test_main_handles_keyboard_interrupt(mock_pyclean):
         pyclean.cli.main()
 
 
+def test_missing_directory(tmp_path):
+    """
+    Does the CLI abort when a directory to clean up does not exist?
+    """
+    missing = tmp_path / 'missing'
+
+    with ArgvContext('pyclean', str(missing)), pytest.raises(SystemExit) as exit_info:
+        pyclean.cli.main()
+
+    assert exit_info.value.code != 0
+
+
 @patch('pyclean.cli.main_module.pyclean')
 def test_mandatory_arg_missing(mock_modern):
     """
@@ -353,3 +365,22 @@ def test_git_clean_without_git(mock_which, capsys):
 
     captured = capsys.readouterr()
     assert 'Git is not available' in captured.err
+
+
+@pytest.mark.parametrize('jobs', ['0', '-1'])
+def test_jobs_must_be_positive(jobs):
+    """
+    Does CLI abort when `--jobs` is not a positive number?
+    """
+    with ArgvContext('pyclean', '.', '--jobs', jobs), pytest.raises(SystemExit):
+        pyclean.cli.parse_arguments()
+
+
+def test_jobs_default():
+    """
+    Does `--jobs` default to sequential operation?
+    """
+    with ArgvContext('pyclean', '.'):
+        args = pyclean.cli.parse_arguments()
+
+    assert args.jobs == 1
@@ -0,0 +1,210 @@
+# SPDX-FileCopyrightText: 2026 Peter Bittner <django@bittner.it>
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Tests for the compiler module."""
+
+import py_compile
+from argparse import Namespace
+from importlib.util import cache_from_source, source_hash
+from pathlib import Path
+
+import pytest
+from cli_test_helpers import ArgvContext
+
+import pyclean.cli
+import pyclean.main
+from pyclean.compiler import (
+    CONVERTED,
+    ORPHANED,
+    RECOMPILED,
+    UNCHANGED,
+    convert_to_hash,
+    recompile,
+    source_files,
+)
+
+UNCHECKED_HASH = py_compile.PycInvalidationMode.UNCHECKED_HASH
+
+
+def build_project(directory):
+    """Create a project with modules in a package and in an ignored folder."""
+    (directory / 'pkg').mkdir(parents=True)
+    (directory / 'pkg' / '__init__.py').write_text('')
+    (directory / 'pkg' / 'mod.py').write_text('answer = 42\n')
+    (directory / '.venv' / 'lib').mkdir(parents=True)
+    (directory / '.venv' / 'lib' / 'site.py').write_text('')
+    (directory / 'README.md').write_text('')
+
+
+def test_source_files(tmp_path):
+    """
+    Are only Python source files found, outside of ignored directories?
+    """
+    pyclean.main.Runner.configure(Namespace(dry_run=False, ignore=['.venv']))
+    build_project(tmp_path)
+
+    assert sorted(source_files(tmp_path)) == [
+        tmp_path / 'pkg' / '__init__.py',
+        tmp_path / 'pkg' / 'mod.py',
+    ]
+
+
+def test_recompile(tmp_path):
+    """
+    Is bytecode written for all optimization levels requested?
+    """
+    pyclean.main.Runner.configure(Namespace(dry_run=False, ignore=['.venv']))
+    build_project(tmp_path)
+    module = str(tmp_path / 'pkg' / 'mod.py')
+
+    recompile([tmp_path], [0, 2])
+
+    assert Path(cache_from_source(module, optimization='')).exists()
+    assert Path(cache_from_source(module, optimization=2)).exists()
+    assert not Path(cache_from_source(module, optimization=1)).exists()
+    assert not (tmp_path / '.venv' / 'lib' / '__pycache__').exists()
+
+
+def test_recompile_option(tmp_path):
+    """
+    Does ``--recompile`` regenerate the bytecode that was cleaned up?
+    """
+    build_project(tmp_path)
+    module = str(tmp_path / 'pkg' / 'mod.py')
+
+    with ArgvContext('pyclean', str(tmp_path), '--recompile', '-O', '0', '1'):
+        pyclean.cli.main()
+
+    assert Path(cache_from_source(module, optimization='')).exists()
+    assert Path(cache_from_source(module, optimization=1)).exists()
+
+
+def test_recompile_dry_run(tmp_path):
+    """
+    Does a dry run not write any bytecode?
+    """
+    build_project(tmp_path)
+
+    with ArgvContext('pyclean', str(tmp_path), '--recompile', '--dry-run'):
+        pyclean.cli.main()
+
+    assert not list(tmp_path.rglob('__pycache__'))
+
+
+def test_optimize_requires_recompile():
+    """
+    Does the CLI abort when ``--optimize`` is used without ``--recompile``?
+    """
+    with ArgvContext('pyclean', '.', '--optimize', '1'), pytest.raises(SystemExit):
+        pyclean.cli.parse_arguments()
+
+
+def compile_module(source, content='answer = 42\n'):
+    """Write a module and compile it, return the path of its bytecode."""
+    source.write_text(content)
+    return Path(py_compile.compile(str(source), doraise=True))
+
+
+def test_convert_to_hash(tmp_path):
+    """
+    Is the header of up-to-date bytecode rewritten with the source hash,
+    keeping the code object as it is?
+    """
+    source = tmp_path / 'mod.py'
+    pyc = compile_module(source)
+    code = pyc.read_bytes()[16:]
+
+    assert convert_to_hash(pyc, UNCHECKED_HASH) == CONVERTED
+
+    data = pyc.read_bytes()
+    assert int.from_bytes(data[4:8], 'little') == 0b01
+    assert data[8:16] == source_hash(source.read_bytes())
+    assert data[16:] == code
+    assert convert_to_hash(pyc, UNCHECKED_HASH) == UNCHANGED
+
+
+def test_convert_outdated_bytecode(tmp_path):
+    """
+    Is outdated bytecode compiled again, and orphaned bytecode reported?
+    """
+    source = tmp_path / 'mod.py'
+    pyc = compile_module(source)
+    source.write_text('answer = 43  # changed\n')
+    orphaned = compile_module(tmp_path / 'gone.py')
+    (tmp_path / 'gone.py').unlink()
+
+    assert convert_to_hash(pyc, UNCHECKED_HASH) == RECOMPILED
+    assert pyc.read_bytes()[8:16] == source_hash(source.read_bytes())
+    assert convert_to_hash(orphaned, UNCHECKED_HASH) == ORPHANED
+
+
+def test_convert_outdated_hash_based_bytecode(tmp_path):
+    """
+    Is outdated bytecode compiled again when its header is hash-based already?
+    """
+    source = tmp_path / 'mod.py'
+    pyc = compile_module(source)
+    assert convert_to_hash(pyc, UNCHECKED_HASH) == CONVERTED
+    source.write_text('answer = 43  # changed\n')
+
+    assert convert_to_hash(pyc, UNCHECKED_HASH) == RECOMPILED
+    assert pyc.read_bytes()[8:16] == source_hash(source.read_bytes())
+
+
+def test_invalidation_mode_option(tmp_path):
+    """
+    Does ``--invalidation-mode`` convert bytecode instead of deleting it,
+    while orphaned bytecode is still deleted?
+    """
+    pyc = compile_module(tmp_path / 'mod.py')
+    orphaned = compile_module(tmp_path / 'gone.py')
+    (tmp_path / 'gone.py').unlink()
+    other = pyc.parent / 'mod.pypy39.pyc'
+    other.write_bytes(b'')
+
+    with ArgvContext(
+        'pyclean',
+        str(tmp_path),
+        '--invalidation-mode',
+        'checked-hash',
+    ):
+        pyclean.cli.main()
+
+    assert int.from_bytes(pyc.read_bytes()[4:8], 'little') == 0b11  # noqa: PLR2004
+    assert other.exists()
+    assert not orphaned.exists()
+
+
+@pytest.mark.parametrize('jobs', ['1', '4'])
+def test_invalidation_mode_removes_orphaned_cache(tmp_path, jobs):
+    """
+    Is a bytecode cache directory that held only orphaned bytecode removed
+    with ``--invalidation-mode``, also when walking with several threads?
+    """
+    (tmp_path / 'pkg').mkdir()
+    orphaned = compile_module(tmp_path / 'pkg' / 'gone.py')
+    (tmp_path / 'pkg' / 'gone.py').unlink()
+
+    with ArgvContext(
+        'pyclean',
+        str(tmp_path),
+        '--invalidation-mode',
+        'unchecked-hash',
+        '--jobs',
+        jobs,
+    ):
+        pyclean.cli.main()
+
+    assert not orphaned.parent.exists()
+
+
+def test_invalidation_mode_excludes_stale_only():
+    """
+    Does the CLI abort when ``--invalidation-mode`` and ``--stale-only``
+    are used together?
+    """
+    args = ['--invalidation-mode', 'unchecked-hash', '--stale-only']
+
+    with ArgvContext('pyclean', '.', *args), pytest.raises(SystemExit):
+        pyclean.cli.parse_arguments()
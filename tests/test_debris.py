@@ -4,6 +4,7 @@
 
 """Tests for the debris module."""
 
+import sys
 from argparse import Namespace
 from pathlib import Path
 from tempfile import TemporaryDirectory
@@ -18,6 +19,7 @@ import pyclean.main
 import pyclean.traversal
 from pyclean.debris import (
     DEBRIS_TOPICS,
+    DebrisMatcher,
     detect_debris_in_directory,
     recursive_delete_debris,
     remove_debris_for,
@@ -33,10 +35,16 @@ from pyclean.debris import (
         (['-d', 'jupyter', 'mypy', 'tox'], ['jupyter', 'mypy', 'tox']),
     ],
 )
-@patch('pyclean.main.remove_freeform_targets')
-@patch('pyclean.main.remove_debris_for')
-@patch('pyclean.main.descend_and_clean')
-def test_debris_option(mock_descend, mock_debris, mock_erase, options, scanned_topics):
+@patch('pyclean.main.EraseHandler')
+@patch('pyclean.main.DebrisHandler')
+@patch('pyclean.main.clean_tree')
+def test_debris_option(
+    mock_clean_tree,
+    mock_debris,
+    mock_erase,
+    options,
+    scanned_topics,
+):
     """
     Does ``--debris`` execute the appropriate cleanup code?
     """
@@ -45,8 +53,8 @@ def test_debris_option(mock_descend, mock_debris, mock_erase, options, scanned_t
 
     debris_calls = [call_args[0][0] for call_args in mock_debris.call_args_list]
 
-    assert mock_descend.called
-    assert debris_calls == scanned_topics
+    assert mock_clean_tree.called
+    assert debris_calls == [scanned_topics]
     assert mock_erase.called
 
 
@@ -145,8 +153,8 @@ def test_detect_no_debris_in_directory():
 
 
 @patch('pyclean.debris.log')
-@patch('pyclean.main.descend_and_clean')
-def test_suggest_debris_without_artifacts(mock_descend, mock_log):
+@patch('pyclean.main.clean_tree')
+def test_suggest_debris_without_artifacts(mock_clean_tree, mock_log):
     """
     Does pyclean suggest --debris when executed without it and no artifacts present?
     """
@@ -160,8 +168,7 @@ def test_suggest_debris_without_artifacts(mock_descend, mock_log):
 
 
 @patch('pyclean.debris.log')
-@patch('pyclean.main.descend_and_clean')
-def test_suggest_debris_with_artifacts(mock_descend, mock_log):
+def test_suggest_debris_with_artifacts(mock_log):
     """
     Does pyclean suggest specific --debris topics when artifacts are detected?
     """
@@ -181,8 +188,8 @@ def test_suggest_debris_with_artifacts(mock_descend, mock_log):
 
 
 @patch('pyclean.debris.log')
-@patch('pyclean.main.descend_and_clean')
-def test_no_suggest_debris_when_used(mock_descend, mock_log):
+@patch('pyclean.main.clean_tree')
+def test_no_suggest_debris_when_used(mock_clean_tree, mock_log):
     """
     Does pyclean NOT suggest --debris when it's already used?
     """
@@ -194,6 +201,82 @@ def test_no_suggest_debris_when_used(mock_descend, mock_log):
     assert not any('Hint: Use --debris' in msg for msg in log_info_calls)
 
 
+@pytest.mark.parametrize('processes', ['1', '2'])
+@patch('pyclean.main.suggest_debris_option')
+def test_debris_evidence_from_walk(mock_suggest, tmp_path, processes):
+    """
+    Is the hint fed from debris seen during the cleanup walk, also in nested
+    projects and in ignored directories, without scanning the roots again?
+    """
+    (tmp_path / 'one' / 'nested' / 'project' / 'htmlcov').mkdir(parents=True)
+    (tmp_path / 'one' / 'nested' / 'project' / 'pytestdebug.log').touch()
+    (tmp_path / 'two' / '.tox').mkdir(parents=True)
+    roots = [str(tmp_path / 'one'), str(tmp_path / 'two')]
+
+    with (
+        patch('pathlib.Path.glob') as mock_glob,
+        ArgvContext('pyclean', *roots, '--processes', processes),
+    ):
+        pyclean.cli.main()
+
+    assert not mock_glob.called
+    mock_suggest.assert_called_once_with({'coverage', 'pytest', 'tox'})
+
+
+@patch('pyclean.debris.log')
+@patch('pyclean.main.DebrisDetector')
+def test_no_hint_option(mock_detector, mock_log, tmp_path):
+    """
+    Does ``--no-hint`` skip both the collection of evidence and the hint?
+    """
+    (tmp_path / 'build').mkdir()
+
+    with ArgvContext('pyclean', str(tmp_path), '--no-hint'):
+        pyclean.cli.main()
+
+    assert not mock_detector.called
+    assert not mock_log.info.called
+
+
+@pytest.mark.parametrize(
+    'args',
+    [
+        ['--undo'],
+        ['--purge-trash'],
+        ['--folders', '--shard', 'final'],
+    ],
+)
+@patch('pyclean.main.suggest_debris_option')
+@patch('pyclean.main.DebrisDetector')
+def test_no_hint_without_walk(mock_detector, mock_suggest, tmp_path, args):
+    """
+    Is the hint skipped in modes that don't walk the directory tree?
+    """
+    with ArgvContext('pyclean', str(tmp_path), *args):
+        pyclean.cli.main()
+
+    assert not mock_detector.called
+    assert not mock_suggest.called
+
+
+@pytest.mark.parametrize(('args', 'hint'), [([], False), (['--folders'], True)])
+@patch('pyclean.main.suggest_debris_option')
+@patch('pyclean.main.DebrisDetector')
+def test_no_hint_with_pycache_prefix(mock_detector, mock_suggest, tmp_path, args, hint):
+    """
+    With a bytecode cache prefix, is evidence for the hint only collected
+    when another phase walks the directory tree anyway?
+    """
+    with (
+        patch.object(sys, 'pycache_prefix', str(tmp_path / 'prefix')),
+        ArgvContext('pyclean', str(tmp_path), *args),
+    ):
+        pyclean.cli.main()
+
+    assert mock_detector.called is hint
+    assert mock_suggest.called is hint
+
+
 def test_ignore_with_debris_cleanup():
     """
     Does --ignore work correctly during debris cleanup?
@@ -224,19 +307,23 @@ def test_debris_cleanup_scans_directories_once():
         (directory / 'subdir1').mkdir()
         (directory / 'subdir2').mkdir()
 
-        original_should_ignore = pyclean.ignore.should_ignore
+        args = Namespace(dry_run=False, ignore=['.git'])
+        pyclean.main.Runner.configure(args)
+
+        original_matches = pyclean.main.Runner.ignore_matcher.matches
         call_count = {'total': 0, 'git_checks': 0}
 
-        def counting_should_ignore(path, patterns):
+        def counting_matches(path):
             call_count['total'] += 1
             if Path(path).name == '.git':
                 call_count['git_checks'] += 1
-            return original_should_ignore(path, patterns)
-
-        args = Namespace(dry_run=False, ignore=['.git'])
-        pyclean.main.Runner.configure(args)
+            return original_matches(path)
 
-        with patch('pyclean.debris.should_ignore', side_effect=counting_should_ignore):
+        with patch.object(
+            pyclean.main.Runner.ignore_matcher,
+            'matches',
+            side_effect=counting_matches,
+        ):
             remove_debris_for('cache', directory)
 
         assert call_count['git_checks'] == 1, (
@@ -252,11 +339,11 @@ def test_debris_cleanup_scans_directories_once():
     ],
 )
 @patch('pyclean.debris.log')
-def test_recursive_delete_debris_error(mock_log, system_error):
+def test_recursive_delete_debris_error(mock_log, system_error, tmp_path):
     args = Namespace(dry_run=False, ignore=[])
     pyclean.main.Runner.configure(args)
 
-    directory = Path('/nonexistent/test/directory')
+    directory = tmp_path
     patterns = ['.cache/**/*', '.cache/']
 
     with patch('os.scandir', side_effect=system_error) as mock_scandir:
@@ -269,7 +356,7 @@ def test_recursive_delete_debris_error(mock_log, system_error):
     )
 
 
-@patch('pyclean.debris.log')
+@patch('pyclean.traversal.log')
 def test_skip_ignored_directories(mock_log):
     """
     Does recursive_delete_debris log skipped directories correctly?
@@ -285,3 +372,77 @@ def test_skip_ignored_directories(mock_log):
     recursive_delete_debris(directory, patterns)
 
     mock_log.debug.assert_called_with('Skipping %s', '.git')
+
+
+@pytest.mark.parametrize(
+    ('pattern', 'name', 'parents', 'flag'),
+    [
+        ('.mypy_cache/**/*', '.mypy_cache', ('src',), 'contents'),
+        ('.mypy_cache/', '.mypy_cache', (), 'directory'),
+        ('.coverage', '.coverage', ('a', 'b'), 'any_type'),
+        ('build/bdist.*/', 'bdist.linux-x86_64', ('src', 'build'), 'directory'),
+        ('*.egg-info/**/*', 'pyclean.egg-info', (), 'contents'),
+    ],
+)
+def test_debris_matcher_lookup(pattern, name, parents, flag):
+    """
+    Does the compiled matcher decide from the name and parent names alone?
+    """
+    matcher = DebrisMatcher([pattern])
+
+    (rule,) = matcher.lookup(name, parents)
+
+    assert getattr(rule, flag)
+    assert not matcher.lookup('other', parents)
+
+
+def test_debris_matcher_relative_position():
+    """
+    Are multi-segment patterns only matched below the traversal root?
+    """
+    matcher = DebrisMatcher(DEBRIS_TOPICS['package'])
+
+    assert matcher.lookup('lib', ('build',))
+    assert not matcher.lookup('lib', ())
+    assert not matcher.lookup('lib', ('src',))
+    assert matcher.parents_of('build', ('a',)) == ('build',)
+
+
+def test_debris_matcher_unsupported_pattern():
+    """
+    Are patterns rejected that cannot be decided by name and position?
+    """
+    with pytest.raises(ValueError, match=r'Unsupported debris pattern'):
+        DebrisMatcher(['foo/**/bar'])
+
+
+def test_debris_subtree_removed_without_matching(tmp_path):
+    """
+    Is a debris directory removed with its content, without any further
+    pattern matching inside of it?
+    """
+    args = Namespace(dry_run=False, ignore=[])
+    pyclean.main.Runner.configure(args)
+
+    cache = tmp_path / 'pkg' / '.mypy_cache' / '3.11' / 'pkg'
+    cache.mkdir(parents=True)
+    (cache / 'module.data.json').write_text('{}')
+    (cache.parent / '.gitignore').write_text('*')
+    pyright = tmp_path / '.pyright'
+    (pyright / 'keep').mkdir(parents=True)
+
+    with patch.object(
+        DebrisMatcher,
+        'lookup',
+        autospec=True,
+        side_effect=DebrisMatcher.lookup,
+    ) as mock_lookup:
+        remove_debris_for('mypy', tmp_path)
+        remove_debris_for('pyright', tmp_path)
+
+    looked_up = {call_args[0][1] for call_args in mock_lookup.call_args_list}
+
+    assert not (tmp_path / 'pkg' / '.mypy_cache').exists()
+    assert (tmp_path / 'pkg').exists()
+    assert looked_up == {'pkg', '.mypy_cache', '.pyright', 'keep'}
+    assert pyright.exists(), 'Directory pattern only removes empty directories'
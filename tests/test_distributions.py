@@ -0,0 +1,94 @@
+# SPDX-FileCopyrightText: 2026 Peter Bittner <django@bittner.it>
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Tests for the distributions module."""
+
+import py_compile
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from cli_test_helpers import ArgvContext
+
+import pyclean.cli
+from pyclean.distributions import canonical_name
+
+
+def install(site_packages, name, modules):
+    """Fake an installed distribution with compiled modules."""
+    dist_info = site_packages / ('%s-1.0.dist-info' % name)
+    dist_info.mkdir(parents=True)
+    (dist_info / 'METADATA').write_text('Name: %s\nVersion: 1.0\n' % name)
+    record = ['%s-1.0.dist-info/METADATA,,' % name, '../../../bin/%s,,' % name]
+    bytecode = []
+    for module in modules:
+        source = site_packages / module
+        source.parent.mkdir(parents=True, exist_ok=True)
+        source.write_text('')
+        bytecode.append(Path(py_compile.compile(str(source), doraise=True)))
+        record.append('%s,,' % module)
+    (dist_info / 'RECORD').write_text('\n'.join(record))
+    return bytecode
+
+
+@pytest.mark.parametrize(
+    ('name', 'canonical'),
+    [('Django', 'django'), ('zope.interface', 'zope-interface'), ('a__b', 'a-b')],
+)
+def test_canonical_name(name, canonical):
+    """
+    Are distribution names normalized?
+    """
+    assert canonical_name(name) == canonical
+
+
+def test_distributions_option(tmp_path):
+    """
+    Does ``--distributions`` delete only the bytecode of the distributions
+    named, also in directories shared with other distributions?
+    """
+    site_packages = tmp_path / 'site-packages'
+    upgraded = install(site_packages, 'My_Package', ['mypkg/__init__.py', 'ns/a.py'])
+    other = install(site_packages, 'other', ['other.py', 'ns/b.py'])
+
+    with ArgvContext('pyclean', str(site_packages), '--distributions', 'my-package'):
+        pyclean.cli.main()
+
+    assert not any(path.exists() for path in upgraded)
+    assert not (site_packages / 'mypkg' / '__pycache__').exists()
+    assert all(path.exists() for path in other)
+
+
+def test_all_distributions(tmp_path):
+    """
+    Is the bytecode of all distributions deleted when none is named, even in
+    a directory that is ignored by default?
+    """
+    site_packages = tmp_path / '.venv' / 'site-packages'
+    bytecode = [
+        *install(site_packages, 'first', ['first.py']),
+        *install(site_packages, 'second', ['second/__init__.py']),
+    ]
+
+    with ArgvContext('pyclean', str(site_packages), '--distributions'):
+        pyclean.cli.main()
+
+    assert not any(path.exists() for path in bytecode)
+
+
+@patch('pyclean.distributions.log')
+def test_unknown_distribution(mock_log, tmp_path):
+    """
+    Is a distribution that isn't installed reported?
+    """
+    install(tmp_path, 'known', ['known.py'])
+
+    with ArgvContext('pyclean', str(tmp_path), '--distributions', 'Unknown'):
+        pyclean.cli.main()
+
+    mock_log.warning.assert_called_once_with(
+        'Distribution %s is not installed in %s',
+        'unknown',
+        tmp_path,
+    )
@@ -5,111 +5,105 @@
 """Tests for the erase module."""
 
 import logging
+import os
 from argparse import Namespace
 from pathlib import Path
 from unittest.mock import call, patch
 
 import pytest
 from cli_test_helpers import ArgvContext
-from conftest import DirectoryMock, FileMock, SymlinkMock
 
 import pyclean.cli
 import pyclean.main
 from pyclean.erase import (
+    EraseHandler,
     confirm,
     delete_filesystem_objects,
     remove_freeform_targets,
 )
+from pyclean.traversal import clean_tree
 
 
-@patch('pyclean.main.remove_freeform_targets')
-@patch('pyclean.main.remove_debris_for')
-@patch('pyclean.main.descend_and_clean')
-def test_erase_option(mock_descend, mock_debris, mock_erase):
+@patch('pyclean.main.EraseHandler')
+@patch('pyclean.main.DebrisHandler')
+@patch('pyclean.main.clean_tree')
+def test_erase_option(mock_clean_tree, mock_debris, mock_erase):
     """
     Does ``--erase`` execute the appropriate cleanup code?
     """
     with ArgvContext('pyclean', '.', '--erase', 'tmp/**/*', 'tmp/'):
         pyclean.cli.main()
 
-    erase_calls = [call_args[0][1] for call_args in mock_erase.call_args_list]
+    erase_calls = [call_args[0][0] for call_args in mock_erase.call_args_list]
 
-    assert mock_descend.called
-    assert not mock_debris.called
+    assert mock_clean_tree.called
+    assert mock_debris.call_args == call([])
     assert erase_calls == [['tmp/**/*', 'tmp/']]
 
 
-@patch('pyclean.erase.delete_filesystem_objects')
-def test_erase_loop(mock_delete_fs_obj):
+@patch('pyclean.erase.clean_tree')
+def test_erase_loop(mock_clean_tree):
     """
-    Does ``remove_freeform_targets()`` call filesystem object removal?
+    Does ``remove_freeform_targets()`` match all patterns in a single walk?
     """
-    patterns = ['foo.txt']
+    patterns = ['foo.txt', 'tmp/']
     directory = Path()
 
     remove_freeform_targets(directory, patterns, yes=False, dry_run=False)
 
-    assert mock_delete_fs_obj.mock_calls == [
-        call(directory, 'foo.txt', prompt=True, dry_run=False, ignore_patterns=[]),
-    ]
+    (walked, [handler]), _ = mock_clean_tree.call_args
+    assert mock_clean_tree.call_count == 1
+    assert walked == directory
+    assert [pattern.pattern for pattern in handler.patterns] == patterns
+    assert handler.prompt
+
+
+def build_tmp(directory):
+    """Create a directory, a file and a symlink in a ``tmp`` directory."""
+    (directory / 'tmp' / 'a-dir').mkdir(parents=True)
+    (directory / 'tmp' / 'a-file').write_text('test')
+    (directory / 'tmp' / 'a-symlink').symlink_to(directory / 'tmp' / 'a-file')
+
+
+def names(mock_calls):
+    """The names of the file system objects a mock was called with."""
+    return [fs_object.name for (fs_object,), _ in mock_calls]
 
 
 @patch('pyclean.runner.remove_directory')
 @patch('pyclean.runner.remove_file')
 @patch('builtins.input', return_value='y')
-@patch(
-    'pathlib.Path.glob',
-    return_value=[
-        DirectoryMock(),
-        SymlinkMock(),
-        FileMock(),
-    ],
-)
-def test_delete_filesdir_loop(mock_glob, mock_yes, mock_unlink, mock_rmdir):
+def test_delete_filesdir_loop(mock_yes, mock_unlink, mock_rmdir, tmp_path):
     """
     Exercise the file and directory loop code.
     """
+    build_tmp(tmp_path)
     args = Namespace(dry_run=False, ignore=[])
-    directory = Path()
 
     pyclean.main.Runner.configure(args)
-    delete_filesystem_objects(directory, 'tmp/**/*', prompt=True)
+    delete_filesystem_objects(tmp_path, 'tmp/**/*', prompt=True)
 
-    assert mock_glob.called
-    assert mock_yes.called
-    assert mock_unlink.called
-    assert mock_rmdir.called
-
-    assert mock_unlink.call_args_list == [
-        call(SymlinkMock()),
-        call(FileMock()),
-    ]
-    assert mock_rmdir.call_args_list == [
-        call(DirectoryMock()),
-    ]
+    assert mock_yes.call_count == 3  # noqa: PLR2004
+    assert sorted(names(mock_unlink.call_args_list)) == ['a-file', 'a-symlink']
+    assert names(mock_rmdir.call_args_list) == ['a-dir']
 
 
 @patch('pyclean.runner.remove_directory')
 @patch('pyclean.runner.remove_file')
 @patch('builtins.input', return_value='n')
-@patch(
-    'pathlib.Path.glob',
-    return_value=[DirectoryMock(), SymlinkMock(), FileMock()],
-)
-def test_no_skips_deletion(mock_glob, mock_no, mock_unlink, mock_rmdir):
+def test_no_skips_deletion(mock_no, mock_unlink, mock_rmdir, tmp_path):
     """
     Is deletion skipped with --erase when user says "no" at the prompt?
     """
+    build_tmp(tmp_path)
     args = Namespace(dry_run=False, ignore=[])
     pyclean.main.Runner.configure(args)
-    directory = Path()
 
     assert pyclean.main.Runner.unlink_failed == 0
     assert pyclean.main.Runner.rmdir_failed == 0
 
-    delete_filesystem_objects(directory, 'tmp/**/*', prompt=True)
+    delete_filesystem_objects(tmp_path, 'tmp/**/*', prompt=True)
 
-    assert mock_glob.called
     assert mock_no.called
     assert not mock_unlink.called
     assert not mock_rmdir.called
@@ -117,35 +111,75 @@ def test_no_skips_deletion(mock_glob, mock_no, mock_unlink, mock_rmdir):
     assert pyclean.main.Runner.rmdir_failed > 0
 
 
-@patch('pyclean.runner.remove_directory')
-@patch('pyclean.runner.remove_file')
-@patch(
-    'pathlib.Path.glob',
-    return_value=[DirectoryMock(), SymlinkMock(), FileMock()],
-)
-@patch('pyclean.main.remove_debris_for')
-@patch('pyclean.main.descend_and_clean')
-def test_yes_skips_prompt(
-    mock_descend,
-    mock_debris,
-    mock_glob,
-    mock_unlink,
-    mock_rmdir,
-):
+@patch('builtins.input', return_value='y')
+def test_delete_streams_in_post_order(mock_yes, tmp_path):
+    """
+    Are the matches deleted as the walk finds them, in post-order, without
+    checking their type with another system call?
+    """
+    (tmp_path / 'tmp' / 'sub').mkdir(parents=True)
+    (tmp_path / 'tmp' / 'sub' / 'deep.txt').write_text('test')
+    pyclean.main.Runner.configure(Namespace(dry_run=False, ignore=[]))
+
+    with (
+        patch('os.stat', wraps=os.stat) as mock_stat,
+        patch('os.lstat', wraps=os.lstat) as mock_lstat,
+    ):
+        delete_filesystem_objects(tmp_path, 'tmp/**/*', prompt=True)
+
+    assert not mock_stat.called
+    assert not mock_lstat.called
+    assert mock_yes.mock_calls == [
+        call('Delete file %s? ' % (tmp_path / 'tmp' / 'sub' / 'deep.txt')),
+        call('Remove empty directory %s? ' % (tmp_path / 'tmp' / 'sub')),
+    ]
+    assert not (tmp_path / 'tmp' / 'sub').exists()
+    assert (tmp_path / 'tmp').exists()
+
+
+@patch('builtins.input')
+def test_yes_skips_prompt(mock_input, tmp_path):
     """
     Does --yes skip the confirmation prompt for --erase?
     """
-    with ArgvContext('pyclean', '.', '--erase', 'tmp/*', '--yes'):
+    (tmp_path / 'tmp' / 'a-dir').mkdir(parents=True)
+    (tmp_path / 'tmp' / 'a-file').write_text('test')
+    (tmp_path / 'tmp' / 'a-symlink').symlink_to(tmp_path / 'tmp' / 'a-file')
+
+    with ArgvContext('pyclean', str(tmp_path), '--erase', 'tmp/*', '--yes'):
         pyclean.cli.main()
 
-    assert mock_glob.called
-    assert mock_unlink.mock_calls == [
-        call(SymlinkMock()),
-        call(FileMock()),
-    ]
-    assert mock_rmdir.mock_calls == [
-        call(DirectoryMock()),
+    assert not mock_input.called
+    assert not list((tmp_path / 'tmp').iterdir())
+    assert pyclean.main.Runner.unlink_count == 2  # noqa: PLR2004
+    assert pyclean.main.Runner.rmdir_count == 1
+
+
+@patch('builtins.input', return_value='y')
+def test_erase_matches_all_patterns_in_one_walk(mock_input, tmp_path):
+    """
+    Does a single traversal delete the matches of all ``--erase`` patterns,
+    in an order that empties directories before they are removed?
+    """
+    (tmp_path / 'tmp' / 'sub').mkdir(parents=True)
+    (tmp_path / 'tmp' / 'sub' / 'deep.txt').write_text('test')
+    (tmp_path / 'keep').mkdir()
+    (tmp_path / 'keep' / 'file.log').write_text('test')
+    (tmp_path / 'file.log').write_text('test')
+
+    args = Namespace(dry_run=False, ignore=[])
+    pyclean.main.Runner.configure(args)
+
+    clean_tree(tmp_path, [EraseHandler(['tmp/**/*', 'tmp/', '*.log'], prompt=True)])
+
+    assert mock_input.mock_calls == [
+        call('Delete file %s? ' % (tmp_path / 'file.log')),
+        call('Delete file %s? ' % (tmp_path / 'tmp' / 'sub' / 'deep.txt')),
+        call('Remove empty directory %s? ' % (tmp_path / 'tmp' / 'sub')),
+        call('Remove empty directory %s? ' % (tmp_path / 'tmp')),
     ]
+    assert not (tmp_path / 'tmp').exists()
+    assert (tmp_path / 'keep' / 'file.log').exists()
 
 
 @patch('builtins.input', side_effect=KeyboardInterrupt)
@@ -160,20 +194,18 @@ def test_abort_confirm(mock_input):
 @patch('pyclean.runner.print_dirname')
 @patch('pyclean.runner.print_filename')
 @patch('builtins.input')
-@patch('pathlib.Path.glob', return_value=[DirectoryMock(), FileMock()])
-def test_dryrun_no_prompt(mock_glob, mock_input, mock_print_file, mock_print_dir):
+def test_dryrun_no_prompt(mock_input, mock_print_file, mock_print_dir, tmp_path):
     """
     Does --dry-run skip the confirmation prompt for --erase?
     This test verifies the fix for the issue where prompts were shown
     even with --dry-run.
     """
+    build_tmp(tmp_path)
     args = Namespace(dry_run=True, ignore=[])
     pyclean.main.Runner.configure(args)
-    directory = Path()
 
-    delete_filesystem_objects(directory, 'tmp/**/*', prompt=True, dry_run=True)
+    delete_filesystem_objects(tmp_path, 'tmp/**/*', prompt=True, dry_run=True)
 
-    assert mock_glob.called
     # input() should NOT be called with dry_run=True
     assert not mock_input.called
     # But the print functions should be called (since it's a dry run)
@@ -184,19 +216,17 @@ def test_dryrun_no_prompt(mock_glob, mock_input, mock_print_file, mock_print_dir
 @patch('pyclean.runner.remove_directory')
 @patch('pyclean.runner.remove_file')
 @patch('builtins.input', return_value='y')
-@patch('pathlib.Path.glob', return_value=[DirectoryMock(), FileMock()])
-def test_no_dryrun_with_prompt(mock_glob, mock_input, mock_unlink, mock_rmdir):
+def test_no_dryrun_with_prompt(mock_input, mock_unlink, mock_rmdir, tmp_path):
     """
     Does non-dry-run mode show prompts when expected?
     This test ensures the fix doesn't break normal prompt behavior.
     """
+    build_tmp(tmp_path)
     args = Namespace(dry_run=False, ignore=[])
     pyclean.main.Runner.configure(args)
-    directory = Path()
 
-    delete_filesystem_objects(directory, 'tmp/**/*', prompt=True, dry_run=False)
+    delete_filesystem_objects(tmp_path, 'tmp/**/*', prompt=True, dry_run=False)
 
-    assert mock_glob.called
     # input() SHOULD be called with dry_run=False and prompt=True
     assert mock_input.called
     # The real deletion functions should be called (not dry-run)
@@ -4,6 +4,8 @@
 
 """Tests for the folders module."""
 
+import os
+import sys
 from argparse import Namespace
 from pathlib import Path
 from tempfile import TemporaryDirectory
@@ -74,18 +76,18 @@ def test_remove_empty_directories_dry_run():
         assert (directory / 'empty').exists()
 
 
-@patch('pyclean.folders.remove_empty_directories')
-@patch('pyclean.main.descend_and_clean')
-def test_folders_option_calls_remove_empty(mock_descend, mock_remove_empty):
+@patch('pyclean.main.EmptyFolderHandler')
+@patch('pyclean.main.clean_tree')
+def test_folders_option_calls_remove_empty(mock_clean_tree, mock_remove_empty):
     with ArgvContext('pyclean', '.', '--folders'):
         pyclean.cli.main()
 
     assert mock_remove_empty.called
 
 
-@patch('pyclean.folders.remove_empty_directories')
-@patch('pyclean.main.descend_and_clean')
-def test_no_folders_option_skips_remove_empty(mock_descend, mock_remove_empty):
+@patch('pyclean.main.EmptyFolderHandler')
+@patch('pyclean.main.clean_tree')
+def test_no_folders_option_skips_remove_empty(mock_clean_tree, mock_remove_empty):
     with ArgvContext('pyclean', '.'):
         pyclean.cli.main()
 
@@ -158,3 +160,57 @@ def test_skip_ignored_directories(mock_log):
     remove_empty_directories(directory)
 
     mock_log.debug.assert_called_with('Skipping %s', '.git')
+
+
+def test_remove_empty_directories_deep_tree(tmp_path):
+    """
+    Does remove_empty_directories cope with trees deeper than the recursion limit?
+    """
+    args = Namespace(dry_run=False, ignore=[])
+    pyclean.main.Runner.configure(args)
+    depth = sys.getrecursionlimit() + 100
+    deepest = tmp_path
+    for _ in range(depth):
+        deepest /= 'd'
+        deepest.mkdir()
+
+    remove_empty_directories(tmp_path)
+
+    assert not list(tmp_path.iterdir())
+
+
+def test_emptied_directories_removed_without_rescan(tmp_path):
+    """
+    Are directories that the walk emptied removed without reading them
+    again, while directories with content left are kept?
+    """
+    (tmp_path / 'pkg' / 'sub').mkdir(parents=True)
+    (tmp_path / 'pkg' / 'sub' / 'mod.pyc').write_text('')
+    (tmp_path / 'pkg' / 'mod.pyc').write_text('')
+    (tmp_path / 'kept').mkdir()
+    (tmp_path / 'kept' / 'mod.py').write_text('')
+
+    with (
+        patch('pyclean.folders.os', wraps=os) as mock_os,
+        ArgvContext('pyclean', str(tmp_path), '--folders'),
+    ):
+        pyclean.cli.main()
+
+    assert not mock_os.scandir.called
+    assert not (tmp_path / 'pkg').exists()
+    assert (tmp_path / 'kept' / 'mod.py').exists()
+
+
+def test_dry_run_reports_emptied_directories(tmp_path):
+    """
+    Does a dry run report the directories that the cleanup would empty?
+    """
+    (tmp_path / 'pkg').mkdir()
+    (tmp_path / 'pkg' / 'mod.pyc').write_text('')
+
+    with ArgvContext('pyclean', str(tmp_path), '--folders', '--dry-run'):
+        pyclean.cli.main()
+
+    assert (tmp_path / 'pkg' / 'mod.pyc').exists()
+    assert pyclean.main.Runner.unlink_count == 1
+    assert pyclean.main.Runner.rmdir_count == 1
@@ -4,7 +4,10 @@
 
 """Tests for the gitclean module."""
 
+import py_compile
+import subprocess
 from argparse import Namespace
+from pathlib import Path
 from unittest.mock import Mock, patch
 
 import pytest
@@ -12,7 +15,12 @@ from cli_test_helpers import ArgvContext
 from conftest import skip_if_no_git
 
 import pyclean.cli
-from pyclean.gitclean import GIT_FATAL_ERROR, build_git_clean_command, execute_git_clean
+from pyclean.gitclean import (
+    GIT_FATAL_ERROR,
+    build_git_clean_command,
+    deleted_sources,
+    execute_git_clean,
+)
 
 
 def test_run_git_clean_dry_run():
@@ -70,8 +78,8 @@ def test_execute_git_clean_not_a_git_repo(mock_run, mock_log):
 
 @skip_if_no_git
 @patch('pyclean.main.execute_git_clean')
-@patch('pyclean.main.descend_and_clean')
-def test_pyclean_with_git_clean(mock_descend, mock_git_clean):
+@patch('pyclean.main.clean_tree')
+def test_pyclean_with_git_clean(mock_clean_tree, mock_git_clean):
     """
     Does pyclean call execute_git_clean when --git-clean flag is used?
     """
@@ -84,8 +92,8 @@ def test_pyclean_with_git_clean(mock_descend, mock_git_clean):
 @skip_if_no_git
 @patch('pyclean.gitclean.subprocess.run', return_value=Mock(returncode=42))
 @patch('pyclean.gitclean.log')
-@patch('pyclean.main.descend_and_clean')
-def test_git_clean_exit_nonzero_raises(mock_descend, mock_log, mock_git_clean):
+@patch('pyclean.main.clean_tree')
+def test_git_clean_exit_nonzero_raises(mock_clean_tree, mock_log, mock_git_clean):
     """
     Does pyclean exit with git-clean's status code when git clean fails?
     """
@@ -97,3 +105,76 @@ def test_git_clean_exit_nonzero_raises(mock_descend, mock_log, mock_git_clean):
 
     mock_log.info.assert_called_once_with('Executing git clean...')
     assert exc_info.value.code == 42  # noqa: PLR2004
+
+
+def git(directory, *args):
+    """Run a Git command quietly in a directory."""
+    subprocess.run(  # noqa: S603
+        ['git', '-c', 'user.name=Test', '-c', 'user.email=test@example.com', *args],  # noqa: S607
+        cwd=directory,
+        check=True,
+        capture_output=True,
+    )
+
+
+def build_repository(directory):
+    """Create a repository with compiled modules, return their bytecode."""
+    (directory / 'pkg').mkdir()
+    bytecode = {}
+    for name in ('kept', 'deleted', 'renamed'):
+        source = directory / 'pkg' / ('%s.py' % name)
+        source.write_text('')
+        bytecode[name] = Path(py_compile.compile(str(source), doraise=True))
+    (directory / 'pkg' / '__pycache__' / 'deleted.pypy39.pyc').write_bytes(b'')
+    git(directory, 'init', '-q')
+    git(directory, 'add', 'pkg/kept.py', 'pkg/deleted.py', 'pkg/renamed.py')
+    git(directory, 'commit', '-q', '-m', 'Initial commit')
+    git(directory, 'rm', '-q', 'pkg/deleted.py')
+    git(directory, 'mv', 'pkg/renamed.py', 'pkg/moved.py')
+    return bytecode
+
+
+@skip_if_no_git
+def test_deleted_sources(tmp_path):
+    """
+    Are deleted and renamed source files listed, relative to the directory?
+    """
+    build_repository(tmp_path)
+
+    assert sorted(deleted_sources(tmp_path / 'pkg', 'HEAD')) == [
+        tmp_path / 'pkg' / 'deleted.py',
+        tmp_path / 'pkg' / 'renamed.py',
+    ]
+    assert deleted_sources(tmp_path, 'no-such-revision') is None
+
+
+@skip_if_no_git
+def test_since_option(tmp_path):
+    """
+    Does ``--since`` delete only the bytecode of deleted or renamed source
+    files, of all interpreters, without walking the directory tree?
+    """
+    bytecode = build_repository(tmp_path)
+
+    with (
+        patch('pyclean.main.clean_tree') as mock_clean_tree,
+        ArgvContext('pyclean', str(tmp_path), '--since', 'HEAD'),
+    ):
+        pyclean.cli.main()
+
+    mock_clean_tree.assert_not_called()
+    assert bytecode['kept'].exists()
+    assert not bytecode['deleted'].exists()
+    assert not bytecode['renamed'].exists()
+    assert not (bytecode['deleted'].parent / 'deleted.pypy39.pyc').exists()
+
+
+def test_since_excludes_walking_options():
+    """
+    Does the CLI abort when ``--since`` is combined with ``--debris``?
+    """
+    with (
+        ArgvContext('pyclean', '.', '--since', 'HEAD', '--debris'),
+        pytest.raises(SystemExit),
+    ):
+        pyclean.cli.parse_arguments()
@@ -0,0 +1,60 @@
+# SPDX-FileCopyrightText: 2026 Peter Bittner <django@bittner.it>
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Tests for the globbing module."""
+
+import pytest
+
+from pyclean.globbing import GlobPattern
+
+
+def match(pattern, path, is_dir=False):
+    """Walk the path segments of a relative path through a glob pattern."""
+    state = pattern.initial
+    for name in path.split('/'):
+        state = pattern.advance(state, name)
+    return pattern.matches(state, is_dir=is_dir)
+
+
+@pytest.mark.parametrize(
+    ('pattern', 'path', 'is_dir', 'expected'),
+    [
+        ('*.txt', 'foo.txt', False, True),
+        ('*.txt', 'sub/foo.txt', False, False),
+        ('**/*.txt', 'foo.txt', False, True),
+        ('**/*.txt', 'a/b/c/foo.txt', False, True),
+        ('tmp/**/*', 'tmp', True, False),
+        ('tmp/**/*', 'tmp/file', False, True),
+        ('tmp/**/*', 'tmp/sub/file', False, True),
+        ('tmp/', 'tmp', True, True),
+        ('tmp/', 'tmp', False, False),
+        ('build/bdist.*/', 'build/bdist.linux', True, True),
+        ('build/bdist.*/', 'other/bdist.linux', True, False),
+        ('.coverage', '.coverage', False, True),
+    ],
+)
+def test_glob_pattern(pattern, path, is_dir, expected):
+    """
+    Does a glob pattern match like ``Path.glob``, one segment at a time?
+    """
+    assert match(GlobPattern(pattern), path, is_dir) == expected
+
+
+def test_glob_pattern_exhausted():
+    """
+    Does a pattern report that nothing below a directory can match anymore?
+    """
+    pattern = GlobPattern('tmp/*.txt')
+
+    assert not pattern.advance(pattern.initial, 'src')
+    assert pattern.advance(pattern.initial, 'tmp')
+
+
+@pytest.mark.parametrize('pattern', ['', '/', '/abs/*'])
+def test_glob_pattern_invalid(pattern):
+    """
+    Are empty and absolute patterns rejected, like with ``Path.glob``?
+    """
+    with pytest.raises(ValueError, match=r'pattern'):
+        GlobPattern(pattern)
@@ -5,10 +5,11 @@
 """Tests for the ignore module."""
 
 import platform
+from pathlib import Path
 
 import pytest
 
-from pyclean.ignore import normalize, should_ignore
+from pyclean.ignore import IgnoreMatcher, normalize, path_is_ignored, should_ignore
 
 
 @pytest.mark.parametrize(
@@ -94,3 +95,57 @@ def test_normalize_pattern_windows():
     assert normalize('foo/bar') == 'foo/bar'
     assert normalize(r'foo\bar') == 'foo/bar'  # Normalized
     assert normalize('bar') == 'bar'
+
+
+@pytest.mark.parametrize(
+    ('path_str', 'patterns', 'expected'),
+    [
+        ('foo/bar', ['bar'], True),
+        ('foo/bar/baz', ['bar'], False),
+        ('baz/foo/bar', ['foo/bar'], True),
+        ('foo/bar/baz', ['foo/bar'], False),
+        ('bar/foo', ['foo/bar'], False),
+        ('bar', ['foo/bar'], False),
+        ('a/b/c', ['x/b/c', 'a/b/c'], True),
+        ('foo/bar', [], False),
+    ],
+)
+def test_ignore_matcher_matches(path_str, patterns, expected):
+    """
+    Does the compiled matcher match the path itself, without its ancestors?
+    """
+    assert IgnoreMatcher(patterns).matches(path_str) == expected
+
+
+@pytest.mark.parametrize(
+    ('path_str', 'patterns', 'expected'),
+    [
+        ('foo/bar/baz', ['bar'], True),
+        ('foo/bar/baz/deep', ['foo/bar'], True),
+        ('src/foo/bar/models', ['foo/bar'], True),
+        ('foo/baz', ['foo/bar'], False),
+        ('keep.txt', ['allure-results'], False),
+    ],
+)
+def test_ignore_matcher_is_ignored(path_str, patterns, expected):
+    """
+    Does the compiled matcher agree with ``path_is_ignored`` on ancestors?
+    """
+    matcher = IgnoreMatcher(patterns)
+
+    assert matcher.is_ignored(path_str) == expected
+    assert path_is_ignored(Path(path_str), patterns) == expected
+
+
+def test_ignore_matcher_many_patterns():
+    """
+    Does a large number of patterns end up in the set and the suffix trie?
+    """
+    patterns = ['name%d' % i for i in range(500)] + ['a%d/b' % i for i in range(500)]
+
+    matcher = IgnoreMatcher(patterns)
+
+    assert len(matcher.names) == 500  # noqa: PLR2004
+    assert set(matcher.suffixes) == {'b'}
+    assert matcher.matches('x/a499/b')
+    assert not matcher.matches('x/a500/b')
@@ -0,0 +1,161 @@
+# SPDX-FileCopyrightText: 2026 Peter Bittner <django@bittner.it>
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Tests for the index module."""
+
+import os
+from argparse import Namespace
+from unittest.mock import call, patch
+
+import pytest
+from cli_test_helpers import ArgvContext
+
+import pyclean.cli
+import pyclean.main
+from pyclean.bytecode import BYTECODE_DIRS, BYTECODE_FILES
+from pyclean.index import ScanIndex, fingerprint, index_location
+from pyclean.traversal import BytecodeHandler, clean_tree
+
+LAST_WEEK = 1_700_000_000
+
+
+def build_tree(directory):
+    """Create a tree without any bytecode, with timestamps in the past."""
+    for name in ('a', 'b', 'c'):
+        (directory / name / 'sub').mkdir(parents=True)
+        (directory / name / 'sub' / 'mod.py').write_text('')
+    for path in [directory, *directory.rglob('*')]:
+        os.utime(path, (LAST_WEEK, LAST_WEEK))
+
+
+def clean_with_index(directory, location):
+    """Clean up bytecode in a tree using an index, return the scanned paths."""
+    pyclean.main.Runner.configure(Namespace(dry_run=False, ignore=[]))
+    index = ScanIndex.load(directory, 'config', location)
+    scanned = []
+    original_scandir = os.scandir
+
+    def counting_scandir(path):
+        scanned.append(os.stat(path).st_ino)  # noqa: PTH116
+        return original_scandir(path)
+
+    with patch('os.scandir', side_effect=counting_scandir):
+        handlers = [BytecodeHandler(BYTECODE_FILES, BYTECODE_DIRS)]
+        clean_tree(directory, handlers, index=index)
+    index.save()
+    return scanned
+
+
+def test_unchanged_directories_not_scanned(tmp_path):
+    """
+    Are directories that had nothing to clean up skipped in the next run,
+    while changed directories are scanned and cleaned?
+    """
+    directory = tmp_path / 'tree'
+    location = tmp_path / 'index.json'
+    build_tree(directory)
+
+    assert len(clean_with_index(directory, location)) == 7  # noqa: PLR2004
+    assert clean_with_index(directory, location) == []
+
+    (directory / 'b' / 'sub' / 'mod.pyc').write_text('')
+    os.utime(directory / 'b' / 'sub', (LAST_WEEK, LAST_WEEK + 1))
+
+    assert clean_with_index(directory, location) == [
+        (directory / 'b' / 'sub').stat().st_ino,
+    ]
+    assert not (directory / 'b' / 'sub' / 'mod.pyc').exists()
+
+
+def test_recent_directories_not_recorded(tmp_path):
+    """
+    Are directories modified just now left out, as they may still change
+    within the resolution of their timestamps?
+    """
+    (tmp_path / 'tree').mkdir()
+    index = ScanIndex(tmp_path / 'tree', 'config', tmp_path / 'index.json')
+
+    index.record(tmp_path / 'tree', (tmp_path / 'tree').stat(), [])
+
+    assert index.confirmed == {}
+
+
+def test_index_invalidated_by_configuration(tmp_path):
+    """
+    Is an index discarded when the configuration is different?
+    """
+    directory = tmp_path / 'tree'
+    location = tmp_path / 'index.json'
+    build_tree(directory)
+    clean_with_index(directory, location)
+
+    assert ScanIndex.load(directory, 'config', location).known
+    assert not ScanIndex.load(directory, 'other', location).known
+
+
+def test_fingerprint():
+    """
+    Does the fingerprint change with ignore patterns and debris topics?
+    """
+    args = Namespace(debris=[], erase=[], folders=False, ignore=['.git'])
+    other_ignore = Namespace(debris=[], erase=[], folders=False, ignore=['.hg'])
+    other_debris = Namespace(debris=['tox'], erase=[], folders=False, ignore=['.git'])
+
+    original = fingerprint(args)
+
+    assert fingerprint(Namespace(**vars(args))) == original
+    assert fingerprint(other_ignore) != original
+    assert fingerprint(other_debris) != original
+
+    with patch.dict('pyclean.index.DEBRIS_TOPICS', {'tox': ['.tox/', '.nox/']}):
+        assert fingerprint(args) != original
+
+
+@patch('pyclean.index.INDEX_MAX_ENTRIES', 2)
+def test_index_size_cap(tmp_path):
+    """
+    Is the number of directories kept in the index capped?
+    """
+    directory = tmp_path / 'tree'
+    location = tmp_path / 'index.json'
+    build_tree(directory)
+    clean_with_index(directory, location)
+
+    assert len(ScanIndex.load(directory, 'config', location).known) == 2  # noqa: PLR2004
+
+
+def test_index_option(tmp_path, monkeypatch):
+    """
+    Does ``--index`` store an index in the user's cache directory?
+    """
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'cache'))
+    directory = tmp_path / 'tree'
+    build_tree(directory)
+
+    with ArgvContext('pyclean', str(directory), '--index'):
+        pyclean.cli.main()
+
+    location = index_location(directory)
+    assert location.parent == tmp_path / 'cache' / 'pyclean'
+    assert location.exists()
+
+
+@pytest.mark.parametrize('jobs', ['1', '4'])
+@patch('pyclean.main.suggest_debris_option')
+def test_index_keeps_debris_evidence(mock_suggest, tmp_path, monkeypatch, jobs):
+    """
+    Is the hint about debris files the same in every run with ``--index``,
+    although unchanged directories are skipped?
+    """
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'cache'))
+    directory = tmp_path / 'tree'
+    build_tree(directory)
+    (directory / 'a' / 'sub' / '.coverage').write_text('')
+    os.utime(directory / 'a' / 'sub', (LAST_WEEK, LAST_WEEK))
+
+    for _run in range(2):
+        with ArgvContext('pyclean', str(directory), '--index', '--jobs', jobs):
+            pyclean.cli.main()
+
+    assert mock_suggest.call_args_list == [call({'coverage'}), call({'coverage'})]
@@ -5,6 +5,7 @@
 """Tests for pyclean's main module."""
 
 import logging
+import os
 from argparse import Namespace
 from pathlib import Path
 from unittest.mock import call, patch
@@ -16,37 +17,65 @@ import pyclean.cli
 import pyclean.main
 
 
-@patch('pyclean.main.descend_and_clean')
-def test_walks_tree(mock_descend):
+@patch('pyclean.main.clean_tree')
+def test_walks_tree(mock_clean_tree):
     """
     Does pyclean walk the directory tree?
     """
     with ArgvContext('pyclean', '.'):
         pyclean.cli.main()
 
-    assert mock_descend.mock_calls == [
-        call(Path(), ['.pyc', '.pyo'], ['__pycache__']),
+    assert [call_args[0][0] for call_args in mock_clean_tree.call_args_list] == [
+        Path(),
     ]
 
 
-@patch('pyclean.main.descend_and_clean')
-def test_walks_all_trees(mock_descend):
+@patch('pyclean.main.clean_tree')
+def test_walks_all_trees(mock_clean_tree):
     """
     Are all positional args evaluated?
     """
     with ArgvContext('pyclean', 'foo', 'bar', 'baz'):
         pyclean.cli.main()
 
-    assert mock_descend.mock_calls == [
-        call(Path('foo'), ['.pyc', '.pyo'], ['__pycache__']),
-        call(Path('bar'), ['.pyc', '.pyo'], ['__pycache__']),
-        call(Path('baz'), ['.pyc', '.pyo'], ['__pycache__']),
+    assert [call_args[0][0] for call_args in mock_clean_tree.call_args_list] == [
+        Path('foo'),
+        Path('bar'),
+        Path('baz'),
     ]
 
 
+def test_scans_each_directory_once(tmp_path):
+    """
+    Do bytecode, debris and erase cleanup share a single tree traversal?
+    """
+    (tmp_path / 'pkg' / '__pycache__').mkdir(parents=True)
+    (tmp_path / 'pkg' / '__pycache__' / 'mod.cpython-311.pyc').write_text('')
+    (tmp_path / 'pkg' / '.pytest_cache' / 'v').mkdir(parents=True)
+    (tmp_path / 'pkg' / '.pytest_cache' / 'v' / 'lastfailed').write_text('{}')
+    (tmp_path / 'pkg' / 'module.py').write_text('')
+    (tmp_path / 'pkg' / 'notes.tmp').write_text('')
+
+    scanned = []
+    original_scandir = os.scandir
+
+    def counting_scandir(path):
+        scanned.append(os.stat(path).st_ino)  # noqa: PTH116 (also takes a descriptor)
+        return original_scandir(path)
+
+    with (
+        patch('os.scandir', side_effect=counting_scandir),
+        ArgvContext('pyclean', str(tmp_path), '-d', 'pytest', '-e', '**/*.tmp', '-y'),
+    ):
+        pyclean.cli.main()
+
+    assert sorted(scanned) == sorted(set(scanned))
+    assert [path.name for path in tmp_path.rglob('*')] == ['pkg', 'module.py']
+
+
 @patch.object(pyclean.main.logging, 'basicConfig')
-@patch('pyclean.main.descend_and_clean')
-def test_normal_logging(mock_descend, mock_logconfig):
+@patch('pyclean.main.clean_tree')
+def test_normal_logging(mock_clean_tree, mock_logconfig):
     """
     Does a normal run use log level INFO?
     """
@@ -59,8 +88,8 @@ def test_normal_logging(mock_descend, mock_logconfig):
 
 
 @patch.object(pyclean.main.logging, 'basicConfig')
-@patch('pyclean.main.descend_and_clean')
-def test_verbose_logging(mock_descend, mock_logconfig):
+@patch('pyclean.main.clean_tree')
+def test_verbose_logging(mock_clean_tree, mock_logconfig):
     """
     Does --verbose use log level DEBUG?
     """
@@ -73,8 +102,8 @@ def test_verbose_logging(mock_descend, mock_logconfig):
 
 
 @patch.object(pyclean.main.logging, 'basicConfig')
-@patch('pyclean.main.descend_and_clean')
-def test_quiet_logging(mock_descend, mock_logconfig):
+@patch('pyclean.main.clean_tree')
+def test_quiet_logging(mock_clean_tree, mock_logconfig):
     """
     Does --quiet use log level FATAL?
     """
@@ -136,3 +165,66 @@ def test_report_failures(  # noqa: PLR0913
         'would be removed',
         explanation,
     )
+
+
+@patch('pyclean.main.clean_tree')
+def test_deduplicates_roots(mock_clean_tree, tmp_path):
+    """
+    Are duplicate and nested directories only cleaned once?
+    """
+    (tmp_path / 'a' / 'b').mkdir(parents=True)
+    (tmp_path / '.venv' / 'lib').mkdir(parents=True)
+    (tmp_path / 'other').mkdir()
+    directories = [
+        tmp_path / 'a' / 'b',
+        tmp_path,
+        tmp_path / 'a' / '..',
+        tmp_path / '.venv' / 'lib',
+        tmp_path / 'other',
+    ]
+
+    with ArgvContext('pyclean', *map(str, directories)):
+        pyclean.cli.main()
+
+    assert [call_args[0][0] for call_args in mock_clean_tree.call_args_list] == [
+        tmp_path,
+        tmp_path / '.venv' / 'lib',
+    ]
+
+
+@patch('pyclean.main.clean_tree')
+def test_keeps_nested_roots_for_erase(mock_clean_tree, tmp_path):
+    """
+    Are nested directories kept when erase patterns are relative to them?
+    """
+    (tmp_path / 'a').mkdir()
+
+    with ArgvContext('pyclean', str(tmp_path), str(tmp_path / 'a'), '-e', 'x'):
+        pyclean.cli.main()
+
+    assert mock_clean_tree.call_count == 2  # noqa: PLR2004
+
+
+@patch('pyclean.main.log')
+def test_processes_option(mock_log, tmp_path):
+    """
+    Are several directory trees cleaned in worker processes, with their
+    counters merged into the final summary?
+    """
+    roots = [tmp_path / ('service%d' % i) for i in range(4)]
+    for root in roots:
+        (root / '__pycache__').mkdir(parents=True)
+        (root / '__pycache__' / 'mod.cpython-311.pyc').write_text('')
+        (root / 'legacy.pyc').write_text('')
+
+    with ArgvContext('pyclean', *map(str, roots), '--processes', '3'):
+        pyclean.cli.main()
+
+    assert not list(tmp_path.rglob('*.pyc'))
+    mock_log.info.assert_any_call(
+        'Total %d files, %d directories %s.%s',
+        8,
+        4,
+        'removed',
+        '',
+    )
@@ -0,0 +1,120 @@
+# SPDX-FileCopyrightText: 2026 Peter Bittner <django@bittner.it>
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Tests for the plan module."""
+
+import pytest
+from cli_test_helpers import ArgvContext
+
+import pyclean.cli
+from pyclean.plan import escape, read_plan, unescape
+
+
+@pytest.mark.parametrize('path', ['plain/path', 'with\nbreak', 'back\\slash\\n'])
+def test_escape(path):
+    """
+    Do paths survive the encoding for a plan line, without line breaks?
+    """
+    assert b'\n' not in escape(path)
+    assert unescape(escape(path)) == path
+
+
+def build_tree(directory):
+    """Create a tree with bytecode and pytest debris."""
+    (directory / '__pycache__').mkdir(parents=True)
+    (directory / '__pycache__' / 'mod.cpython-313.pyc').write_bytes(b'x')
+    (directory / 'legacy.pyc').write_bytes(b'xyz')
+    (directory / '.pytest_cache' / 'v').mkdir(parents=True)
+    (directory / '.pytest_cache' / 'v' / 'lastfailed').write_text('{}')
+
+
+def test_plan_and_execute(tmp_path):
+    """
+    Does ``--plan`` record the deletions without carrying them out, and
+    ``--execute-plan`` carry them out later, skipping what changed since?
+    """
+    project = tmp_path / 'project'
+    build_tree(project)
+    plan = tmp_path / 'cleanup.plan'
+
+    args = ['--debris', 'pytest', '--plan', str(plan)]
+
+    with ArgvContext('pyclean', str(project), *args):
+        pyclean.cli.main()
+
+    with plan.open('rb') as stream:
+        entries = {
+            path: (kind, topic, size) for kind, topic, size, path in read_plan(stream)
+        }
+    assert entries[project / 'legacy.pyc'] == ('f', 'bytecode', 3)
+    assert entries[project / '__pycache__'] == ('d', 'bytecode', 0)
+    assert entries[project / '.pytest_cache' / 'v' / 'lastfailed'][1] == 'pytest'
+    assert (project / '__pycache__').exists()
+
+    (project / 'legacy.pyc').write_bytes(b'changed')
+
+    with ArgvContext('pyclean', '--execute-plan', str(plan)):
+        pyclean.cli.main()
+
+    assert (project / 'legacy.pyc').exists()
+    assert not (project / '__pycache__').exists()
+    assert not (project / '.pytest_cache').exists()
+
+
+def test_plan_relative_paths(tmp_path, monkeypatch):
+    """
+    Does a plan made for a relative directory work from another directory?
+    """
+    build_tree(tmp_path / 'project')
+    plan = tmp_path / 'cleanup.plan'
+    monkeypatch.chdir(tmp_path)
+
+    with ArgvContext('pyclean', 'project', '--plan', str(plan)):
+        pyclean.cli.main()
+
+    monkeypatch.chdir(tmp_path / 'project')
+    with ArgvContext('pyclean', '--execute-plan', str(plan)):
+        pyclean.cli.main()
+
+    assert not (tmp_path / 'project' / '__pycache__').exists()
+    assert not (tmp_path / 'project' / 'legacy.pyc').exists()
+
+
+def test_execute_invalid_plan(tmp_path):
+    """
+    Is a file that isn't a plan rejected?
+    """
+    plan = tmp_path / 'cleanup.plan'
+    plan.write_text('rm -rf /\n')
+
+    with (
+        ArgvContext('pyclean', '--execute-plan', str(plan)),
+        pytest.raises(SystemExit, match='Not a pyclean plan file'),
+    ):
+        pyclean.cli.main()
+
+
+def test_execute_plan_excludes_directories():
+    """
+    Does the CLI abort when ``--execute-plan`` is combined with directories?
+    """
+    with (
+        ArgvContext('pyclean', '.', '--execute-plan', 'cleanup.plan'),
+        pytest.raises(SystemExit),
+    ):
+        pyclean.cli.parse_arguments()
+
+
+def test_plan_with_erase_requires_yes():
+    """
+    Does the CLI abort on ``--plan`` with ``--erase`` unless ``--yes`` is
+    given, as the plan is carried out without a confirmation prompt?
+    """
+    args = ['pyclean', '.', '--erase', '*.log', '--plan', 'cleanup.plan']
+
+    with ArgvContext(*args), pytest.raises(SystemExit):
+        pyclean.cli.parse_arguments()
+
+    with ArgvContext(*args, '--yes'):
+        assert pyclean.cli.parse_arguments().dry_run
@@ -0,0 +1,189 @@
+# SPDX-FileCopyrightText: 2026 Peter Bittner <django@bittner.it>
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Tests for the quarantine module."""
+
+import errno
+import time
+from unittest.mock import patch
+
+import pytest
+from cli_test_helpers import ArgvContext
+
+import pyclean.cli
+from pyclean.quarantine import (
+    NANOSECONDS,
+    TRASH_DIR,
+    Quarantine,
+    purge_trash,
+    restore_trash,
+    tombstones,
+)
+
+
+def build_tree(directory):
+    """Create a package with a bytecode cache, return the cache directory."""
+    pycache = directory / 'pkg' / '__pycache__'
+    pycache.mkdir(parents=True)
+    (pycache / 'mod.cpython-312.pyc').write_bytes(b'')
+    (directory / 'pkg' / 'mod.py').write_text('')
+    return pycache
+
+
+@patch('pyclean.quarantine.subprocess.Popen')
+def test_quarantine_and_undo(mock_popen, tmp_path):
+    """
+    Does ``--quarantine`` move bytecode directories into the trash area, to
+    be purged by a detached worker, and does ``--undo`` bring them back?
+    """
+    pycache = build_tree(tmp_path)
+
+    with ArgvContext('pyclean', str(tmp_path), '--quarantine', '--undo-window', '60'):
+        pyclean.cli.main()
+
+    assert not pycache.exists()
+    assert len(list(tombstones(tmp_path))) == 1
+    command = mock_popen.call_args.args[0]
+    assert command[-6:] == [
+        '--purge-trash',
+        '--purge-wait',
+        '--undo-window',
+        '60',
+        '--quiet',
+        str(tmp_path),
+    ]
+
+    with ArgvContext('pyclean', str(tmp_path), '--undo'):
+        pyclean.cli.main()
+
+    assert (pycache / 'mod.cpython-312.pyc').exists()
+    assert not (tmp_path / TRASH_DIR).exists()
+
+
+@patch('pyclean.quarantine.subprocess.Popen')
+def test_trash_is_not_traversed(mock_popen, tmp_path):
+    """
+    Is the content of the trash area left alone by the next cleanup?
+    """
+    build_tree(tmp_path)
+    with ArgvContext('pyclean', str(tmp_path), '--quarantine', '--undo-window', '60'):
+        pyclean.cli.main()
+    (tombstone, _age) = next(tombstones(tmp_path))
+
+    with ArgvContext('pyclean', str(tmp_path)):
+        pyclean.cli.main()
+
+    assert (tombstone / 'mod.cpython-312.pyc').exists()
+    assert mock_popen.call_count == 1
+
+
+def test_purge_trash(tmp_path):
+    """
+    Are only the tombstones older than the undo window purged, and the trash
+    area removed when nothing is left?
+    """
+    quarantine = Quarantine(tmp_path)
+    assert quarantine.bury(build_tree(tmp_path))
+
+    purge_trash(tmp_path, window=60)
+    assert len(list(tombstones(tmp_path))) == 1
+
+    purge_trash(tmp_path)
+    assert not (tmp_path / TRASH_DIR).exists()
+
+
+def test_restore_into_removed_parent(tmp_path):
+    """
+    Is a tombstone restored when the parent of its origin was removed, and
+    does a tombstone that cannot be restored not stop the others?
+    """
+    quarantine = Quarantine(tmp_path)
+    pycache = build_tree(tmp_path)
+    (tmp_path / 'build' / 'lib').mkdir(parents=True)
+    assert quarantine.bury(tmp_path / 'build' / 'lib')
+    assert quarantine.bury(pycache)
+    (tmp_path / 'build').rmdir()
+    (tmp_path / 'pkg').rename(tmp_path / 'blocked')
+    (tmp_path / 'pkg').write_text('')
+
+    restore_trash(tmp_path)
+
+    assert (tmp_path / 'build' / 'lib').is_dir()
+    assert len(list(tombstones(tmp_path))) == 1
+
+
+def test_purge_worker_waits_for_window(tmp_path):
+    """
+    Does the purge worker wait until the undo window has passed, and then
+    purge the tombstones?
+    """
+    assert Quarantine(tmp_path).bury(build_tree(tmp_path))
+    clock = [time.time_ns()]
+
+    def sleep(seconds):
+        clock[0] += int(seconds * NANOSECONDS)
+
+    args = ['--purge-trash', '--purge-wait', '--undo-window', '60']
+
+    with (
+        patch('pyclean.quarantine.time.time_ns', side_effect=lambda: clock[0]),
+        patch('pyclean.quarantine.time.sleep', side_effect=sleep) as mock_sleep,
+        ArgvContext('pyclean', str(tmp_path), *args),
+    ):
+        pyclean.cli.main()
+
+    mock_sleep.assert_called_once()
+    assert not (tmp_path / TRASH_DIR).exists()
+
+
+def test_bury_across_file_systems(tmp_path):
+    """
+    Is a directory that cannot be renamed into the trash area left in place,
+    without leaving anything behind in the trash area?
+    """
+    pycache = build_tree(tmp_path)
+    cross_device = OSError(errno.EXDEV, 'Invalid cross-device link')
+
+    with patch('pyclean.quarantine.os.rename', side_effect=cross_device):
+        assert not Quarantine(tmp_path).bury(pycache)
+
+    assert pycache.exists()
+    assert not any((tmp_path / TRASH_DIR).iterdir())
+
+
+@patch('pyclean.quarantine.subprocess.Popen')
+def test_quarantine_falls_back_to_removal(mock_popen, tmp_path):
+    """
+    Is a directory removed as usual when it cannot be quarantined?
+    """
+    pycache = build_tree(tmp_path)
+
+    with (
+        patch('pyclean.quarantine.os.rename', side_effect=OSError(errno.EXDEV, '')),
+        ArgvContext('pyclean', str(tmp_path), '--quarantine'),
+    ):
+        pyclean.cli.main()
+
+    assert not pycache.exists()
+    assert not (tmp_path / TRASH_DIR).exists()
+    mock_popen.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    'args',
+    [
+        ['--undo', '--purge-trash'],
+        ['--undo', '--folders'],
+        ['--purge-trash', '--quarantine'],
+        ['--quarantine', '--since', 'HEAD'],
+        ['--undo-window', '-1'],
+    ],
+)
+def test_invalid_quarantine(args):
+    """
+    Does the CLI abort on trash area modes combined with cleanup options,
+    quarantine of modes that don't walk the tree, and negative windows?
+    """
+    with ArgvContext('pyclean', '.', *args), pytest.raises(SystemExit):
+        pyclean.cli.parse_arguments()
@@ -143,3 +143,60 @@ def test_is_not_ignored_for_unrelated_path():
     pyclean.main.Runner.ignore = ['allure-results']
     assert not pyclean.main.Runner.is_ignored(Path('keep.txt'))
     assert not pyclean.main.Runner.is_ignored(Path('other/foo.txt'))
+
+
+def test_deletion_pool(tmp_path):
+    """
+    Does the thread pool remove directories only after their content, and
+    keep exact counts of all operations?
+    """
+    args = Namespace(dry_run=False, ignore=[], jobs=8)
+    pyclean.main.Runner.configure(args)
+
+    directories = [tmp_path / ('dir%d' % i) / 'sub' for i in range(20)]
+    for directory in directories:
+        directory.mkdir(parents=True)
+        for j in range(10):
+            (directory / ('file%d.pyc' % j)).write_text('')
+
+    for directory in directories:
+        for fileobj in sorted(directory.iterdir()):
+            pyclean.main.Runner.unlink(fileobj)
+        pyclean.main.Runner.rmdir(directory)
+        pyclean.main.Runner.rmdir(directory.parent)
+    pyclean.main.Runner.rmdir(tmp_path / 'does-not-exist')
+    pyclean.main.Runner.finish()
+
+    assert not list(tmp_path.iterdir())
+    assert pyclean.main.Runner.unlink_count == 200  # noqa: PLR2004
+    assert pyclean.main.Runner.rmdir_count == 40  # noqa: PLR2004
+    assert pyclean.main.Runner.rmdir_failed == 1
+
+
+def test_jobs_option(tmp_path):
+    """
+    Does ``--jobs`` clean a tree on a thread pool with accurate totals?
+    """
+    for i in range(10):
+        cache = tmp_path / ('pkg%d' % i) / '__pycache__'
+        cache.mkdir(parents=True)
+        for j in range(10):
+            (cache / ('mod%d.cpython-311.pyc' % j)).write_text('')
+
+    with ArgvContext('pyclean', str(tmp_path), '--jobs', '4', '--folders'):
+        pyclean.cli.main()
+
+    assert not list(tmp_path.iterdir())
+    assert pyclean.main.Runner.unlink_count == 100  # noqa: PLR2004
+    assert pyclean.main.Runner.rmdir_count == 20  # noqa: PLR2004
+    assert pyclean.main.Runner.pool is None
+
+
+def test_jobs_ignored_for_dryrun():
+    """
+    Is the thread pool only used when file system objects are deleted?
+    """
+    args = Namespace(dry_run=True, ignore=[], jobs=4)
+    pyclean.main.Runner.configure(args)
+
+    assert pyclean.main.Runner.pool is None
@@ -0,0 +1,108 @@
+# SPDX-FileCopyrightText: 2026 Peter Bittner <django@bittner.it>
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Tests for the shard module."""
+
+import pytest
+from cli_test_helpers import ArgvContext
+
+import pyclean.cli
+from pyclean.shard import Shard
+
+SHARDS = 3
+
+
+def build_tree(directory):
+    """Create bytecode on all levels of a tree, return the bytecode files."""
+    bytecode = [directory / 'root.pyc']
+    for top in ('a', 'b', 'c', 'd'):
+        bytecode.append(directory / top / 'top.pyc')
+        bytecode.extend(
+            directory / top / sub / 'deep' / 'sub.pyc' for sub in ('x', 'y', 'z')
+        )
+    for path in bytecode:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b'')
+    return bytecode
+
+
+def test_owns():
+    """
+    Does every directory belong to exactly one shard?
+    """
+    shards = [Shard(number, SHARDS) for number in range(1, SHARDS + 1)]
+
+    for parts in [(), ('a',), ('a', 'x'), ('b', 'y')]:
+        assert sum(shard.owns(parts) for shard in shards) == 1
+
+
+def test_shards_are_disjoint_and_complete(tmp_path):
+    """
+    Do the shards clean up disjoint parts of a tree, and all of it together?
+    And does the final pass remove the shared directories left empty?
+    """
+    bytecode = build_tree(tmp_path)
+    deleted = set()
+
+    for number in range(1, SHARDS + 1):
+        shard = '%d/%d' % (number, SHARDS)
+        with ArgvContext('pyclean', str(tmp_path), '--folders', '--shard', shard):
+            pyclean.cli.main()
+
+        gone = {path for path in bytecode if not path.exists()} - deleted
+        assert gone, 'shard %s did nothing' % shard
+        deleted |= gone
+
+    assert deleted == set(bytecode)
+    assert not (tmp_path / 'a' / 'x').exists()
+    assert (tmp_path / 'a').exists()
+
+    with ArgvContext('pyclean', str(tmp_path), '--folders', '--shard', 'final'):
+        pyclean.cli.main()
+
+    assert not any(tmp_path.iterdir())
+
+
+def test_shard_leaves_other_subtrees_alone(tmp_path):
+    """
+    Is a directory at the depth of the shared subtrees left alone by the
+    shards that don't own it, even if it's empty?
+    """
+    pycache = tmp_path / 'a' / '__pycache__'
+    pycache.mkdir(parents=True)
+    owner = next(
+        number
+        for number in range(1, SHARDS + 1)
+        if Shard(number, SHARDS).owns(('a', '__pycache__'))
+    )
+
+    for number in range(1, SHARDS + 1):
+        if number != owner:
+            shard = '%d/%d' % (number, SHARDS)
+            with ArgvContext('pyclean', str(tmp_path), '--shard', shard):
+                pyclean.cli.main()
+    assert pycache.exists()
+
+    with ArgvContext('pyclean', str(tmp_path), '--shard', '%d/%d' % (owner, SHARDS)):
+        pyclean.cli.main()
+    assert not pycache.exists()
+
+
+@pytest.mark.parametrize(
+    'args',
+    [
+        ['--shard', '0/3'],
+        ['--shard', '4/3'],
+        ['--shard', 'half'],
+        ['--shard', 'final'],
+        ['--shard', '1/2', '--since', 'HEAD'],
+    ],
+)
+def test_invalid_shard(args):
+    """
+    Does the CLI abort on invalid shards, a final pass without ``--folders``,
+    and shards of modes that don't walk the tree?
+    """
+    with ArgvContext('pyclean', '.', *args), pytest.raises(SystemExit):
+        pyclean.cli.parse_arguments()
@@ -0,0 +1,186 @@
+# SPDX-FileCopyrightText: 2026 Peter Bittner <django@bittner.it>
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Tests for the streaming module."""
+
+import io
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from cli_test_helpers import ArgvContext
+
+import pyclean.cli
+from pyclean.bytecode import BytecodeSelection
+from pyclean.streaming import (
+    ANY_TYPE,
+    CONTENT,
+    DIRECTORY,
+    FILE,
+    SUBTREE,
+    PathClassifier,
+    read_paths,
+)
+
+
+def test_read_paths_across_chunks():
+    """
+    Are paths split correctly when they span several chunks?
+    """
+    stream = io.BytesIO(b'a/b.pyc\0long/path/name.py\0\0last')
+
+    paths = list(read_paths(stream, separator=b'\0', chunk_size=3))
+
+    assert paths == ['a/b.pyc', 'long/path/name.py', 'last']
+
+
+@pytest.mark.parametrize(
+    ('path', 'expected'),
+    [
+        ('pkg/__pycache__/mod.cpython-313.pyc', FILE),
+        ('pkg/__pycache__', SUBTREE),
+        ('pkg/mod.py', None),
+        ('.pytest_cache', SUBTREE),
+        ('.pytest_cache/v/cache/nodeids', CONTENT),
+        ('pkg/.coverage', ANY_TYPE),
+        ('build', DIRECTORY),
+        ('build/lib/pkg/mod.py', CONTENT),
+        ('src/lib/pkg/mod.py', None),
+    ],
+)
+def test_classify(path, expected):
+    """
+    Are paths classified by the bytecode and debris rules, by name only?
+    """
+    classifier = PathClassifier(['coverage', 'package', 'pytest'])
+
+    assert classifier.classify(Path(path)) == expected
+
+
+def test_classify_with_selection():
+    """
+    Is bytecode selected to be kept not deleted, along with its directory?
+    """
+    classifier = PathClassifier(selection=BytecodeSelection(tags=['cpython-313']))
+
+    assert classifier.classify(Path('__pycache__/mod.cpython-313.pyc')) is None
+    assert classifier.classify(Path('__pycache__/mod.cpython-311.pyc')) == FILE
+    assert classifier.classify(Path('__pycache__')) is None
+
+
+def test_from_stdin_option(tmp_path):
+    """
+    Does ``--from-stdin -0`` delete matching paths read from standard input,
+    and skip paths that are ignored or gone?
+    """
+    (tmp_path / 'pkg' / '__pycache__').mkdir(parents=True)
+    (tmp_path / 'pkg' / '__pycache__' / 'mod.pyc').write_bytes(b'')
+    (tmp_path / 'pkg' / 'mod.py').write_text('')
+    (tmp_path / 'legacy.pyc').write_bytes(b'')
+    (tmp_path / '.venv').mkdir()
+    (tmp_path / '.venv' / 'site.pyc').write_bytes(b'')
+    paths = [
+        tmp_path / 'pkg' / '__pycache__',
+        tmp_path / 'pkg' / '__pycache__' / 'mod.pyc',
+        tmp_path / 'pkg' / 'mod.py',
+        tmp_path / 'legacy.pyc',
+        tmp_path / '.venv' / 'site.pyc',
+    ]
+    stdin = io.TextIOWrapper(io.BytesIO(b'\0'.join(bytes(path) for path in paths)))
+
+    with (
+        patch('sys.stdin', stdin),
+        ArgvContext('pyclean', '--from-stdin', '-0'),
+    ):
+        pyclean.cli.main()
+
+    assert not (tmp_path / 'pkg' / '__pycache__').exists()
+    assert not (tmp_path / 'legacy.pyc').exists()
+    assert (tmp_path / 'pkg' / 'mod.py').exists()
+    assert (tmp_path / '.venv' / 'site.pyc').exists()
+
+
+def test_from_stdin_keeps_directory_content(tmp_path, monkeypatch):
+    """
+    Is a directory that matches a rule for the directory only, not for its
+    content, kept along with files in it that are not debris?
+    """
+    (tmp_path / 'build' / 'keep').mkdir(parents=True)
+    (tmp_path / 'build' / 'keep' / 'important.txt').write_text('')
+    (tmp_path / 'build' / 'lib').mkdir()
+    (tmp_path / 'build' / 'lib' / 'mod.py').write_text('')
+    (tmp_path / 'dist').mkdir()
+    paths = [tmp_path / 'build', tmp_path / 'dist']
+    stdin = io.TextIOWrapper(io.BytesIO(b'\n'.join(bytes(path) for path in paths)))
+    monkeypatch.chdir(tmp_path)
+
+    with (
+        patch('sys.stdin', stdin),
+        ArgvContext('pyclean', '--from-stdin', '--debris', 'package'),
+    ):
+        pyclean.cli.main()
+
+    assert (tmp_path / 'build' / 'keep' / 'important.txt').exists()
+    assert (tmp_path / 'build' / 'lib' / 'mod.py').exists()
+    assert not (tmp_path / 'dist').exists()
+
+
+def test_from_stdin_debris_below_current_directory(tmp_path, monkeypatch):
+    """
+    Are only the parents below the current directory matched against the
+    debris rules, not a ``dist`` directory the project happens to be in?
+    """
+    project = tmp_path / 'dist' / 'myapp'
+    (project / 'src').mkdir(parents=True)
+    (project / 'src' / 'app.py').write_text('')
+    (project / 'README').write_text('')
+    paths = [project / 'src' / 'app.py', project / 'README', Path('README')]
+    stdin = io.TextIOWrapper(io.BytesIO(b'\0'.join(bytes(path) for path in paths)))
+    monkeypatch.chdir(project)
+
+    with (
+        patch('sys.stdin', stdin),
+        ArgvContext('pyclean', '--from-stdin', '-0', '--debris'),
+    ):
+        pyclean.cli.main()
+
+    assert (project / 'src' / 'app.py').exists()
+    assert (project / 'README').exists()
+
+
+@pytest.mark.parametrize(
+    ('path', 'expected'),
+    [
+        ('/work/dist/myapp/src/app.py', None),
+        ('/work/dist/myapp/dist/app.whl', CONTENT),
+        ('/elsewhere/dist/app.whl', None),
+        ('dist/app.whl', CONTENT),
+        ('../dist/app.whl', None),
+    ],
+)
+def test_classify_below_base(path, expected):
+    """
+    Are the debris rules applied to the part of a path below the base only?
+    """
+    classifier = PathClassifier(['package'], base=Path('/work/dist/myapp'))
+
+    assert classifier.classify(Path(path)) == expected
+
+
+@pytest.mark.parametrize(
+    'args',
+    [
+        ['--from-stdin', '.'],
+        ['--from-stdin', '--erase', '*.log'],
+        ['.', '--null'],
+        [],
+    ],
+)
+def test_from_stdin_invalid_usage(args):
+    """
+    Does the CLI abort when ``--from-stdin`` is combined with directories
+    or other cleanup options, and when no directory is given without it?
+    """
+    with ArgvContext('pyclean', *args), pytest.raises(SystemExit):
+        pyclean.cli.parse_arguments()
@@ -4,35 +4,51 @@
 
 """Tests for the traversal module."""
 
+import os
+import sys
 from argparse import Namespace
+from contextlib import nullcontext
 from pathlib import Path
 from tempfile import TemporaryDirectory
 from unittest.mock import call, patch
 
-from conftest import SymlinkMock
+import pytest
+from conftest import FilesystemObjectMock, SymlinkMock
 
 import pyclean.main
 from pyclean.bytecode import BYTECODE_DIRS, BYTECODE_FILES
-from pyclean.traversal import descend_and_clean
+from pyclean.debris import DebrisHandler
+from pyclean.folders import EmptyFolderHandler
+from pyclean.traversal import (
+    DIR_FD_SUPPORT,
+    BytecodeHandler,
+    Entry,
+    clean_tree,
+    descend_and_clean,
+)
 
 
+@pytest.mark.parametrize(
+    ('entry', 'message'),
+    [
+        (FilesystemObjectMock('a-socket'), 'Ignoring %s (neither a file nor a folder)'),
+        (SymlinkMock(), 'Skipping symlink %s'),
+    ],
+)
 @patch('pyclean.main.Runner.unlink')
 @patch('pyclean.main.Runner.rmdir')
 @patch('pyclean.traversal.log')
-@patch('os.scandir', return_value=[SymlinkMock()])
-def test_ignore_otherobjects(mock_scandir, mock_log, mock_rmdir, mock_unlink):
+def test_ignore_otherobjects(mock_log, mock_rmdir, mock_unlink, entry, message):
     """
-    Does descend_and_clean log unidentified file objects in verbose mode?
+    Does descend_and_clean log unidentified file objects and symlinks it
+    doesn't follow in verbose mode?
     """
-    expected_filename = SymlinkMock().path
-
-    descend_and_clean(Path(), BYTECODE_FILES, BYTECODE_DIRS)
+    with patch('os.scandir', return_value=nullcontext([entry])):
+        descend_and_clean(Path(), BYTECODE_FILES, BYTECODE_DIRS)
 
     assert not mock_unlink.called
     assert not mock_rmdir.called
-    assert mock_log.mock_calls == [
-        call.debug('Ignoring %s (neither a file nor a folder)', expected_filename),
-    ]
+    assert mock_log.mock_calls == [call.debug(message, entry.path)]
 
 
 @patch('pyclean.traversal.log')
@@ -96,3 +112,229 @@ def test_ignore_with_path_pattern():
         # Only foo/bar should be ignored, baz/bar should be cleaned
         assert (directory / 'foo' / 'bar' / 'test.pyc').exists()
         assert not (directory / 'baz' / 'bar' / 'test.pyc').exists()
+
+
+def build_tree(directory):
+    """Create a tree with bytecode, debris and ignored folders in it."""
+    for i in range(5):
+        for j in range(4):
+            package = directory / ('pkg%d' % i) / ('sub%d' % j)
+            (package / '__pycache__').mkdir(parents=True)
+            (package / '__pycache__' / 'mod.cpython-311.pyc').write_text('')
+            (package / 'mod.py').write_text('')
+            (package / 'empty' / 'deeper').mkdir(parents=True)
+    (directory / 'pkg0' / '.tox' / 'py311').mkdir(parents=True)
+    (directory / 'pkg0' / '.tox' / 'py311' / 'log.txt').write_text('')
+    (directory / '.git' / 'objects').mkdir(parents=True)
+    (directory / '.git' / 'objects' / 'keep.pyc').write_text('')
+
+
+def test_parallel_walk(tmp_path):
+    """
+    Does walking a tree with many threads leave the same result behind as
+    walking it sequentially, including removal of emptied folders?
+    """
+    results = []
+    for jobs in (1, 8):
+        directory = tmp_path / ('jobs%d' % jobs)
+        build_tree(directory)
+        args = Namespace(dry_run=False, ignore=['.git'], jobs=jobs)
+        pyclean.main.Runner.configure(args)
+        handlers = [
+            BytecodeHandler(BYTECODE_FILES, BYTECODE_DIRS),
+            DebrisHandler(topics=['tox']),
+            EmptyFolderHandler(),
+        ]
+
+        clean_tree(directory, handlers, jobs=jobs)
+        pyclean.main.Runner.finish()
+
+        results.append(
+            (
+                sorted(path.relative_to(directory) for path in directory.rglob('*')),
+                pyclean.main.Runner.unlink_count,
+                pyclean.main.Runner.rmdir_count,
+            ),
+        )
+
+    assert results[0] == results[1]
+    assert results[0][0] == [
+        Path('.git'),
+        Path('.git/objects'),
+        Path('.git/objects/keep.pyc'),
+        *sorted(
+            path
+            for i in range(5)
+            for path in (
+                Path('pkg%d' % i),
+                *(Path('pkg%d/sub%d' % (i, j)) for j in range(4)),
+                *(Path('pkg%d/sub%d/mod.py' % (i, j)) for j in range(4)),
+            )
+        ),
+    ]
+
+
+def test_parallel_walk_error(tmp_path):
+    """
+    Is an unexpected error in a worker thread raised by the parallel walk?
+    """
+    build_tree(tmp_path)
+    pyclean.main.Runner.configure(Namespace(dry_run=False, ignore=[], jobs=4))
+
+    handler = BytecodeHandler(BYTECODE_FILES, BYTECODE_DIRS)
+    with patch.object(handler, 'clean_file', side_effect=PermissionError):  # noqa: SIM117
+        with pytest.raises(PermissionError):
+            clean_tree(tmp_path, [handler], jobs=4)
+    pyclean.main.Runner.finish()
+
+
+@pytest.mark.parametrize('jobs', [1, 4])
+def test_unreadable_directories(tmp_path, jobs):
+    """
+    Is a subdirectory that cannot be read skipped, while an error is raised
+    for a root that cannot be read?
+    """
+    (tmp_path / 'locked').mkdir()
+    (tmp_path / 'locked' / 'mod.pyc').write_text('')
+    (tmp_path / 'mod.pyc').write_text('')
+    pyclean.main.Runner.configure(Namespace(dry_run=False, ignore=[], jobs=jobs))
+    handlers = [BytecodeHandler(BYTECODE_FILES, BYTECODE_DIRS)]
+    entry_open = Entry.open
+
+    def open_unless_locked(entry):
+        if entry.name == 'locked':
+            raise PermissionError(entry.path)
+        return entry_open(entry)
+
+    with patch.object(Entry, 'open', open_unless_locked):
+        clean_tree(tmp_path, handlers, jobs=jobs)
+    pyclean.main.Runner.finish()
+
+    assert (tmp_path / 'locked' / 'mod.pyc').exists()
+    assert not (tmp_path / 'mod.pyc').exists()
+    with pytest.raises(FileNotFoundError):
+        clean_tree(tmp_path / 'missing', handlers, jobs=jobs)
+
+
+def test_deep_tree(tmp_path):
+    """
+    Is a tree deeper than the interpreter's recursion limit cleaned entirely?
+    """
+    args = Namespace(dry_run=False, ignore=[])
+    pyclean.main.Runner.configure(args)
+    depth = sys.getrecursionlimit() + 100
+    deepest = tmp_path
+    for _ in range(depth):
+        deepest /= 'd'
+        deepest.mkdir()
+    (deepest / 'mod.pyc').write_text('')
+
+    handlers = [BytecodeHandler(BYTECODE_FILES, BYTECODE_DIRS), EmptyFolderHandler()]
+    clean_tree(tmp_path, handlers)
+
+    assert not list(tmp_path.iterdir())
+
+
+def test_symlinked_directories_not_followed(tmp_path):
+    """
+    Is the content of a symlinked directory left alone, as it's not part of
+    the tree that is cleaned?
+    """
+    args = Namespace(dry_run=False, ignore=[])
+    pyclean.main.Runner.configure(args)
+    outside = tmp_path / 'outside'
+    (outside / '__pycache__').mkdir(parents=True)
+    (outside / '__pycache__' / 'mod.cpython-311.pyc').write_text('')
+    (tmp_path / 'tree').mkdir()
+    (tmp_path / 'tree' / 'link').symlink_to(outside, target_is_directory=True)
+
+    descend_and_clean(tmp_path / 'tree', BYTECODE_FILES, BYTECODE_DIRS)
+
+    assert (outside / '__pycache__' / 'mod.cpython-311.pyc').exists()
+    assert (tmp_path / 'tree' / 'link').is_symlink()
+
+
+@pytest.mark.skipif(not DIR_FD_SUPPORT, reason='Requires dir_fd support')
+def test_deletes_relative_to_directory(tmp_path):
+    """
+    Are files deleted by name, relative to their open parent directory?
+    """
+    args = Namespace(dry_run=False, ignore=[])
+    pyclean.main.Runner.configure(args)
+    (tmp_path / 'pkg').mkdir()
+    (tmp_path / 'pkg' / 'mod.pyc').write_text('')
+
+    with patch('os.unlink', wraps=os.unlink) as mock_unlink:
+        descend_and_clean(tmp_path, BYTECODE_FILES, BYTECODE_DIRS)
+
+    assert mock_unlink.call_args.args == ('mod.pyc',)
+    assert isinstance(mock_unlink.call_args.kwargs['dir_fd'], int)
+    assert not (tmp_path / 'pkg' / 'mod.pyc').exists()
+
+
+@pytest.mark.parametrize('dry_run', [False, True])
+def test_remove_subtree(tmp_path, dry_run):
+    """
+    Is a bytecode cache removed with everything inside, counting every file
+    system object, also in a dry run?
+    """
+    args = Namespace(dry_run=dry_run, ignore=[])
+    pyclean.main.Runner.configure(args)
+    cache = tmp_path / 'pkg' / '__pycache__'
+    (cache / 'nested').mkdir(parents=True)
+    (cache / 'mod.cpython-311.pyc').write_text('')
+    (cache / 'mod.cpython-311.pyc.12345').write_text('')  # stale temp file
+    (cache / 'nested' / 'other.txt').write_text('')
+
+    descend_and_clean(tmp_path, BYTECODE_FILES, BYTECODE_DIRS)
+
+    assert cache.exists() == dry_run
+    assert pyclean.main.Runner.unlink_count == 3  # noqa: PLR2004
+    assert pyclean.main.Runner.rmdir_count == 2  # noqa: PLR2004
+
+
+def test_remove_subtree_respects_ignore(tmp_path):
+    """
+    Does the removal of a bytecode cache leave ignored content alone?
+    """
+    args = Namespace(dry_run=False, ignore=['keep'])
+    pyclean.main.Runner.configure(args)
+    cache = tmp_path / '__pycache__'
+    (cache / 'keep').mkdir(parents=True)
+    (cache / 'keep' / 'mod.pyc').write_text('')
+    (cache / 'mod.pyc').write_text('')
+
+    descend_and_clean(tmp_path, BYTECODE_FILES, BYTECODE_DIRS)
+
+    assert (cache / 'keep' / 'mod.pyc').exists()
+    assert not (cache / 'mod.pyc').exists()
+    assert pyclean.main.Runner.rmdir_failed == 1
+
+
+@pytest.mark.parametrize(('dry_run', 'ordered'), [(False, False), (True, True)])
+def test_entries_streamed_unless_ordered(tmp_path, dry_run, ordered):
+    """
+    Are the files of a directory, and of a bytecode cache removed as a
+    whole, handled in the order ``scandir`` yields them, and only sorted by
+    name for the listing of a dry run?
+    """
+    pyclean.main.Runner.configure(Namespace(dry_run=dry_run, ignore=[]))
+    names = ['a.pyc', 'b.pyc', 'c.pyc']
+    (tmp_path / '__pycache__').mkdir()
+    for name in names:
+        (tmp_path / name).write_text('')
+        (tmp_path / '__pycache__' / name).write_text('')
+    scandir = os.scandir
+
+    def scandir_backwards(target):
+        with scandir(target) as children:
+            return nullcontext(sorted(children, key=lambda e: e.name, reverse=True))
+
+    with (
+        patch('os.scandir', side_effect=scandir_backwards),
+        patch('pyclean.main.Runner.unlink') as mock_unlink,
+    ):
+        descend_and_clean(tmp_path, BYTECODE_FILES, BYTECODE_DIRS)
+
+    handled = [fileobj.name for (fileobj,), _ in mock_unlink.call_args_list]
+    assert handled == 2 * (names if ordered else names[::-1])